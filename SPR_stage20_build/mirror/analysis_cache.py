@@ -0,0 +1,219 @@
+"""
+本地分析缓存 (Content-Addressed Analysis Cache)
+以「上传文件内容哈希 + 解析选项 + 引擎版本」为键，把解析后的 prompts、
+token store 和全部指标以列式格式 (Parquet) 落盘。
+同一份导出文件再次打开时直接读盘，跳过解析与分词。
+目录超过上限时按最近使用时间 (LRU) 淘汰。
+缓存里是用户上传的原始 prompt：只有显式设置 SPR_CACHE_DIR 时才启用
+(公开部署时所有会话共用同一个目录)。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import ENGINE_VERSION, TIMEZONE, TOKEN_ID_DTYPE, AnalysisResult, TokenStore, Vocab
+from ingest import INGEST_VERSION
+
+try:
+    import pyarrow  # noqa: F401  (pandas Parquet engine)
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
+
+# 未设置 SPR_CACHE_DIR = 不落盘
+CACHE_CONFIGURED = bool(os.environ.get("SPR_CACHE_DIR"))
+CACHE_DIR = os.path.expanduser(os.environ.get("SPR_CACHE_DIR") or "~/.cache/spr_mirror")
+CACHE_MAX_MB = float(os.environ.get("SPR_CACHE_MAX_MB", "1024"))  # 0 = 关闭缓存
+
+META_FILE = "meta.json"
+HASH_CHUNK = 1 << 20
+
+
+def cache_enabled():
+    return CACHE_AVAILABLE and CACHE_CONFIGURED and CACHE_MAX_MB > 0
+
+
+def content_key(up, name, **options):
+    """sha256 of the upload bytes plus everything that changes the parse / analysis output."""
+    h = hashlib.sha256()
+    up.seek(0)
+    for chunk in iter(lambda: up.read(HASH_CHUNK), b""):
+        h.update(chunk)
+    up.seek(0)
+    ext = os.path.splitext(name)[1].lower()  # 解析分支只取决于扩展名
+    # 时区决定 hour / date 等派生列，换时区即换缓存条目
+    salt = json.dumps([ext, sorted(options.items()), INGEST_VERSION, ENGINE_VERSION, TIMEZONE])
+    h.update(salt.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _entry_dir(key):
+    return os.path.join(CACHE_DIR, key)
+
+
+# --- Write ---
+def _padded(values, n):
+    return list(values) + [None] * (n - len(values))
+
+
+def store(key, name, lines, timestamps, sources, result):
+    """Persist one parsed + analyzed upload. Failures only cost the cache, never the page."""
+    if not cache_enabled():
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=CACHE_DIR)
+        n = len(lines)
+        # timestamps 与 lines 等长 (epoch 秒，NaN = 无时间)；sources 可能更短，补 None 对齐，长度记在 meta 里
+        pd.DataFrame({
+            "prompt": pd.Series(lines, dtype=object),
+            "ts": np.asarray(timestamps, dtype=np.float64),
+            "src": pd.Series(_padded(sources, n), dtype=object),
+        }).to_parquet(os.path.join(tmp, "prompts.parquet"), index=False)
+        result.df.to_parquet(os.path.join(tmp, "frame.parquet"))
+
+        # 语料只存 int32 id + offsets，词表每个词一行
+        token_store = result.token_store
+        pd.DataFrame({"token": pd.Series(token_store.vocab.tokens, dtype=object)}).to_parquet(
+            os.path.join(tmp, "vocab.parquet"), index=False)
+        np.save(os.path.join(tmp, "ids.npy"), np.asarray(token_store.ids, dtype=TOKEN_ID_DTYPE))
+        np.save(os.path.join(tmp, "offsets.npy"), np.asarray(token_store.offsets, dtype=np.int64))
+
+        if result.evolution_df is not None:
+            result.evolution_df.to_parquet(os.path.join(tmp, "evolution.parquet"))
+
+        meta = {
+            "name": name,
+            "created": time.time(),
+            "n_prompts": n,
+            "n_sources": len(sources),
+            "has_time": result.has_time,
+            "category_scores": result.category_scores,
+            "top_bigrams": result.top_bigrams,
+            "soul": result.soul,
+        }
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        dest = _entry_dir(key)
+        if os.path.exists(dest):
+            shutil.rmtree(dest, ignore_errors=True)
+        os.replace(tmp, dest)
+    except Exception as e:
+        print(f"⚠️  Analysis cache write failed: {e}")
+        if 'tmp' in locals():
+            shutil.rmtree(tmp, ignore_errors=True)
+        return
+    evict(keep=key)
+
+
+# --- Read ---
+def load(key):
+    """Return (lines, timestamps, sources, AnalysisResult) for a cached upload, or None."""
+    if not cache_enabled():
+        return None
+    path = _entry_dir(key)
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        prompts = pd.read_parquet(os.path.join(path, "prompts.parquet"))
+        lines = prompts["prompt"].tolist()
+        timestamps = prompts["ts"].to_numpy(dtype=np.float64)
+        sources = prompts["src"].iloc[:meta["n_sources"]].tolist()
+
+        vocab = Vocab(pd.read_parquet(os.path.join(path, "vocab.parquet"))["token"].tolist())
+        token_store = TokenStore(np.load(os.path.join(path, "ids.npy")),
+                                 np.load(os.path.join(path, "offsets.npy")), vocab)
+
+        result = AnalysisResult(
+            df=pd.read_parquet(os.path.join(path, "frame.parquet")),
+            has_time=meta["has_time"],
+            word_counts=token_store.counts(),
+            category_scores=meta["category_scores"],
+            top_bigrams=[tuple(b) for b in meta["top_bigrams"]],
+            soul=meta["soul"],
+            token_store=token_store,
+            sources=list(sources),
+        )
+        if meta["has_time"]:
+            result.evolution_df = pd.read_parquet(os.path.join(path, "evolution.parquet"))
+    except Exception as e:
+        # 损坏 / 半写入的条目直接丢弃，下次重新计算
+        print(f"⚠️  Analysis cache entry {key[:12]} unreadable, dropping: {e}")
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+
+    os.utime(meta_path)  # LRU: 命中即刷新最近使用时间
+    return lines, timestamps, sources, result
+
+
+def list_entries(keys=None):
+    """
+    Cached uploads, most recently used first: [(key, meta)].
+    keys: only these entries (e.g. the ones one browser session created), None = all.
+    """
+    if not cache_enabled() or not os.path.isdir(CACHE_DIR):
+        return []
+    entries = []
+    for key in (os.listdir(CACHE_DIR) if keys is None else keys):
+        meta_path = os.path.join(CACHE_DIR, key, META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            meta["last_used"] = os.path.getmtime(meta_path)
+        except (OSError, ValueError):
+            continue
+        entries.append((key, meta))
+    entries.sort(key=lambda e: e[1]["last_used"], reverse=True)
+    return entries
+
+
+# --- LRU Eviction ---
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for fn in files:
+            try:
+                total += os.path.getsize(os.path.join(root, fn))
+            except OSError:
+                pass
+    return total
+
+
+def evict(keep=None, max_mb=None):
+    """Drop least recently used entries until the cache fits in max_mb (never drops `keep`)."""
+    limit = (CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    for key in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, key)
+        if not os.path.isdir(path):
+            continue
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            last_used = os.path.getmtime(meta_path)
+        elif time.time() - os.path.getmtime(path) > 3600:
+            last_used = 0  # 写入中断留下的临时目录，优先清理
+        else:
+            continue  # 可能是另一个会话正在写入
+        entries.append((last_used, key, _dir_size(path)))
+
+    total = sum(size for _, _, size in entries)
+    for last_used, key, size in sorted(entries):
+        if total <= limit:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(CACHE_DIR, key), ignore_errors=True)
+        total -= size
@@ -0,0 +1,1362 @@
+"""
+Prompt Mirror 分析引擎 (Headless Analysis Engine)
+把 prompt_mirror.py 中的全部指标计算抽离为可导入模块：
+Streamlit 页面只负责渲染，离线批处理 / 基准测试可直接调用 analyze()。
+"""
+
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import jieba
+import nltk
+import numpy as np
+import pandas as pd
+
+from keyword_matcher import KeywordMatcher
+from profiling import StageTimer
+
+# 指标算法 / 词表变更时递增，磁盘缓存 (analysis_cache) 以此判断结果是否过期
+ENGINE_VERSION = "4"
+
+# --- NLTK Setup (Fail-safe) ---
+try:
+    nltk.data.find('tokenizers/punkt')
+except LookupError:
+    try:
+        nltk.download('punkt', quiet=True)
+    except: pass
+
+try:
+    nltk.data.find('corpora/stopwords')
+    from nltk.corpus import stopwords
+    english_stops = set(stopwords.words('english'))
+except (LookupError, ImportError):
+    english_stops = set()
+
+# Enhanced Stopwords (De-noising)
+english_stops.update({
+    "the", "a", "an", "in", "on", "at", "for", "to", "of", "is", "are", "was", "were", 
+    "be", "been", "being", "have", "has", "had", "do", "does", "did", "it", "that", 
+    "this", "these", "those", "i", "you", "he", "she", "we", "they", "my", "your", 
+    "his", "her", "our", "their", "what", "which", "who", "whom", "whose", "where", 
+    "when", "why", "how", "can", "could", "will", "would", "shall", "should", "may", 
+    "might", "must", "and", "but", "or", "so", "not", "no", "yes", "please", "help", 
+    "me", "thanks", "thank", "write", "create", "make", "use", "using", "code",
+    "want", "need", "like", "just", "get", "go", "know", "think", "see", "say",
+    "tell", "ask", "try", "look", "take", "give", "find", "use", "way", "new",
+    "good", "great", "well", "much", "many", "lot", "little", "big", "small",
+    # Prompt Engineering Boilerplate (Noise for WordCloud)
+    "act", "role", "assume", "step", "context", "instruction", "output", "format",
+    "generate", "rewrite", "revise", "optimize", "check", "verify", "explain",
+    "translation", "translate", "english", "chinese", "text", "sentence", "paragraph",
+    "based", "following", "provided", "below", "above", "result", "answer", "question",
+    "style", "tone", "ensure", "make", "sure", "include", "example", "list", "none",
+    "response", "assistant", "user", "input", "task", "description", "detail", "analysis"
+})
+
+# 中文停用词 (De-noising)
+chinese_stops = {
+    "的", "了", "是", "我", "你", "他", "在", "和", "有", "就", "不", "人", "都", "一", "一个", "上", "也", "很", "到", "说", "要", "去", "能", "会", "着", "没有", "看", "怎么", "什么", "这", "那", "这个", "那个", "请", "帮我", "给我", "可以", "吗",
+    "个", "只", "次", "把", "被", "让", "给", "但", "因为", "所以", "如果", "虽然", "但是", "或者", "还是", "以及", "除了", "为了", "关于", "对于", "通过", "根据", "按照", "作为", "随着",
+    # Prompt Engineering Boilerplate (Chinese)
+    "扮演", "角色", "生成", "输出", "格式", "要求", "上下文", "步骤", "解释", "翻译",
+    "英文", "中文", "代码", "文章", "内容", "以下", "以上", "提供", "基于", "使用",
+    "不仅", "而且", "能够", "需要", "帮忙", "修改", "润色", "优化", "检查", "写一个",
+    "帮我写", "帮我看", "怎么写", "怎么做", "分析", "设计", "实现", "回复", "助手", "用户"
+}
+
+# Objectivity Filter Stopwords (Technial Noise + Conversational Filler + Pronouns)
+OBJECTIVITY_STOPWORDS = {
+    # 1. Technical / Boilerplate Noise
+    "json", "api", "html", "return", "self", "const", "string", "true", "false", "null", "undefined",
+    "class", "function", "var", "let", "import", "export", "from", "main", "void", "args", "kwargs",
+    "http", "https", "url", "uri", "request", "response", "header", "body", "params", "query",
+    "file", "path", "dir", "folder", "open", "close", "read", "write", "print", "log", "console",
+    "error", "exception", "try", "catch", "finally", "throw", "raise", "async", "await", "promise",
+    "list", "dict", "set", "tuple", "array", "object", "number", "boolean", "int", "float", "str",
+    "prompt", "data", "model", "code", "generate", "using", "use", "make", "create", "based", "text",
+    "input", "output", "context", "description", "detail", "analysis", "example", "following", "question",
+    "answer", "result", "content", "system", "message", "role", "user", "assistant", "ai", "bot", "gpt",
+    "openai", "chatgpt", "spec", "backend", "frontend", "server", "client", "app", "application", "project",
+    "key", "value", "name", "type", "id", "uuid", "token", "auth", "password", "email", "username",
+    "github", "git", "commit", "branch", "repo", "repository", "clone", "push", "pull", "merge",
+    "python", "javascript", "java", "c", "cpp", "go", "rust", "ruby", "php", "swift", "kotlin", "scala",
+    "humanizer", "agent", "core", "important", "background", "mode", "status", "year", "month", "day",
+
+    # 2. Common Verbs / Adverbs / Filler
+    "know", "see", "want", "just", "now", "time", "first", "one", "two", "three", "new", "good", "great",
+    "well", "much", "many", "lot", "little", "big", "small", "way", "thing", "go", "get", "come", "take",
+    "give", "find", "say", "tell", "ask", "try", "look", "need", "like", "love", "hate", "think", "feel",
+    "believe", "hope", "wish", "maybe", "perhaps", "probably", "possibly", "sure", "certain", "really",
+    "very", "quite", "too", "so", "such", "more", "most", "less", "least", "better", "best", "worse",
+    "worst", "please", "thanks", "thank", "hello", "hi", "hey", "bye", "goodbye", "yes", "no", "ok", "okay",
+    "sure", "right", "correct", "wrong", "false", "true", "check", "verify", "test", "debug", "fix", "solve",
+
+    # 3. Pronouns / Self-Referential
+    "i", "me", "my", "mine", "we", "us", "our", "ours", "you", "your", "yours", "he", "him", "his",
+    "she", "her", "hers", "it", "its", "they", "them", "their", "theirs", "self", "myself", "yourself",
+    "himself", "herself", "itself", "ourselves", "yourselves", "themselves",
+
+    # 4. Chinese Noise (Technical + Conversational)
+    "自己", "我们", "他们", "你们", "它们", "咱们", "大家", "我", "你", "他", "她", "它",
+    "现在", "刚刚", "刚才", "以前", "以后", "之后", "之前", "时候", "时间", "问题", "东西", "事情", "情况",
+    "觉得", "认为", "感觉", "以为", "知道", "明白", "了解", "理解", "希望", "想要", "需要", "喜欢", "讨厌",
+    "真的", "非常", "很多", "许多", "一些", "有些", "这种", "那种", "这样", "那样", "这么", "那么",
+    "因为", "所以", "但是", "如果", "虽然", "或者", "还是", "以及", "除了", "为了", "关于", "对于",
+    "通过", "根据", "按照", "作为", "随着", "并且", "而且", "其实", "事实上", "实际上", "反而",
+    "也就是", "也就是说", "换句话说", "总之", "综上所述", "顺便", "另外", "此外", "还有",
+    "比如", "例如", "像是", "就像", "同样", "一般", "通常", "经常", "总是", "一直", "甚至", "尤其", "特别",
+    "可能", "已经", "可以", "能够", "应该", "必须", "不得不", "一定", "确定", "肯定",
+    "生成", "输出", "格式", "要求", "上下文", "步骤", "解释", "翻译", "代码", "文章", "内容",
+    "扮演", "角色", "助手", "回复", "建议", "意见", "想法", "看法", "观点", "结果", "原因", "理由", "目的", "目标",
+    "任务", "工作", "学习", "生活", "日", "月", "年", "个", "只", "次", "把", "被", "让", "给", "但",
+    "就", "见", "是", "的", "了", "在", "和", "有", "不", "人", "都", "一", "上", "也", "很", "到", "说", "要", "去"
+}
+
+
+# --- 关键词库 (Data Layer) ---
+# Category Radar / Category Evolution
+CATEGORY_DEFS = {
+    "coding": {
+        "keywords": [
+            "代码", "code", "函数", "报错", "bug", "python", "js", "react", "sql", "api", "写一个", "实现", "function", "class", "error", "接口",
+            "java", "c++", "golang", "rust", "node", "css", "html", "docker", "k8s", "aws", "git", "github", "merge", "branch", "commit",
+            "database", "db", "mongo", "redis", "query", "request", "response", "json", "xml", "yaml", "config", "deploy", "build", "run",
+            "script", "algorithm", "loop", "variable", "import", "package", "install", "pip", "npm", "yarn", "compile", "debug", "stack",
+            "overflow", "exception", "try", "catch", "async", "await", "promise", "thread", "process", "linux", "shell", "bash", "terminal",
+            "fix", "issue", "crash", "stacktrace", "ci/cd", "pipeline", "jenkins", "azure", "gcp", "server", "client", "frontend", "backend",
+            "fullstack", "devops", "sre", "unit test", "integration test", "e2e", "selenium", "cypress", "playwright", "jest", "mocha",
+            "typescript", "ts", "vue", "angular", "svelte", "nextjs", "nuxtjs", "flask", "django", "fastapi", "spring", "hibernate",
+            "refactor", "optimize", "performance", "memory", "cpu", "leak", "profiling", "benchmark", "logging", "monitoring", "alerting",
+            "rest", "graphql", "grpc", "websocket", "socket", "tcp", "udp", "http", "https", "ssl", "tls", "certificate", "key", "token",
+            "auth", "jwt", "oauth", "sso", "ldap", "encryption", "hashing", "salt", "uuid", "guid", "regex", "regular expression"
+        ],
+        "label_en": "Coding",
+        "label_zh": "💻 编程开发"
+    },
+    "writing": {
+        "keywords": [
+            "文案", "文章", "周报", "总结", "扩写", "润色", "大纲", "标题", "翻译", "邮件", "write", "email", "article", "summary", "translate", "outline", "title",
+            "essay", "blog", "post", "copy", "copywriting", "intro", "introduction", "conclusion", "paragraph", "sentence", "grammar", "spelling",
+            "tone", "style", "formal", "casual", "academic", "professional", "rewrite", "revise", "edit", "proofread", "check", "draft",
+            "report", "memo", "letter", "proposal", "statement", "bio", "description", "caption", "slogan", "tagline", "keyword", "seo",
+            "story", "narrative", "plot", "character", "dialogue", "script", "screenplay", "poem", "lyrics", "rhyme", "verse"
+        ],
+        "label_en": "Writing",
+        "label_zh": "📝 内容创作"
+    },
+    "logic": {
+        "keywords": [
+            "分析", "原因", "区别", "比较", "评价", "优缺点", "建议", "方案", "思维导图", "analyze", "reason", "compare", "difference", "pros", "cons", "plan",
+            "strategy", "tactic", "method", "approach", "framework", "model", "theory", "hypothesis", "assumption", "premise", "conclusion",
+            "argument", "debate", "critique", "review", "evaluate", "assess", "audit", "investigate", "research", "study", "survey", "data",
+            "evidence", "proof", "logic", "logical", "fallacy", "bias", "cognitive", "psychology", "philosophy", "ethics", "moral", "value",
+            "principle", "rule", "law", "regulation", "policy", "guideline", "standard", "criteria", "metric", "kpi", "okr", "goal", "objective"
+        ],
+        "label_en": "Logic",
+        "label_zh": "🧠 逻辑分析"
+    },
+    "learning": {
+        "keywords": [
+            "解释", "介绍", "是什么", "含义", "原理", "教程", "学习", "如何", "explain", "what", "how", "meaning", "tutorial", "principle", "learn",
+            "teach", "guide", "lesson", "course", "class", "lecture", "study", "exam", "test", "quiz", "question", "answer", "solution",
+            "definition", "define", "concept", "term", "vocabulary", "grammar", "history", "geography", "science", "math", "physics", "chemistry",
+            "biology", "art", "music", "literature", "culture", "language", "skill", "technique", "tip", "trick", "hack", "advice", "suggestion",
+            "recommendation", "resource", "book", "paper", "article", "video", "podcast", "website", "tool", "software", "app",
+            "roadmap", "path", "curriculum", "syllabus", "beginner", "intermediate", "advanced", "expert", "master", "pro", "101", "basics",
+            "fundamentals", "overview", "introduction", "background", "context", "history", "origin", "evolution", "development", "trend",
+            "future", "prediction", "forecast", "insight", "knowledge", "wisdom", "experience", "expertise", "mastery", "proficiency",
+            "competence", "capability", "ability", "talent", "gift", "aptitude", "potential", "growth", "development", "progress"
+        ],
+        "label_en": "Learning",
+        "label_zh": "🎓 知识学习"
+    },
+    "creative": {
+        "keywords": [
+            "创意", "点子", "故事", "设想", "如果", "生成", "设计", "idea", "story", "design", "imagine", "generate", "create",
+            "brainstorm", "concept", "inspiration", "vision", "dream", "fantasy", "fiction", "novel", "game", "play", "fun", "joke", "humor",
+            "comedy", "satire", "parody", "meme", "logo", "icon", "image", "picture", "photo", "video", "audio", "music", "song", "sound",
+            "color", "palette", "font", "typography", "layout", "ui", "ux", "wireframe", "prototype", "mockup", "sketch", "drawing", "painting",
+            "character", "role", "persona", "profile", "background", "backstory", "plot", "setting", "scene", "dialogue", "script", "screenplay",
+            "poem", "haiku", "limerick", "sonnet", "lyrics", "verse", "rhyme", "rhythm", "melody", "harmony", "chord", "scale", "key",
+            "style", "genre", "mood", "atmosphere", "vibe", "tone", "voice", "narrator", "perspective", "viewpoint", "theme", "motif",
+            "symbol", "metaphor", "simile", "analogy", "allegory", "fable", "myth", "legend", "folklore", "fairy tale", "fantasy", "sci-fi"
+        ],
+        "label_en": "Creative",
+        "label_zh": "🎨 创意脑暴"
+    }
+}
+
+# Stopwords for Bigrams (Less aggressive)
+BIGRAM_STOPS = {
+    "the", "a", "an", "in", "on", "at", "for", "to", "of", "is", "are", "was", "were", 
+    "be", "been", "being", "have", "has", "had", "do", "does", "did", "it", "that", 
+    "this", "these", "those", "i", "you", "he", "she", "we", "they", "my", "your", 
+    "his", "her", "our", "their", "and", "but", "or", "so", "not", "no", "yes", "please", 
+    "me", "thanks", "thank", "want", "need", "like", "just", "get", "go", "know", "think", 
+    "see", "say", "tell", "ask", "try", "look", "take", "give", "find", "use", "way", "new",
+    "good", "great", "well", "much", "many", "lot", "little", "big", "small",
+    "的", "了", "是", "我", "你", "他", "在", "和", "有", "就", "不", "人", "都", "一", "一个", "上", "也", "很", "到", "说", "要", "去", "能", "会", "着", "没有", "看", "怎么", "什么", "这", "那", "这个", "那个", "请", "帮我", "给我", "可以", "吗",
+    "个", "只", "次", "把", "被", "让", "给", "但", "因为", "所以", "如果", "虽然", "但是", "或者", "还是", "以及", "除了", "为了", "关于", "对于", "通过", "根据", "按照", "作为", "随着"
+}
+
+# SoulPrint - Full 6 Models + 16 Emotions
+PSYCH_KEYWORDS = {
+    # 1. Big Five (OCEAN)
+    'Openness': ['imagine', 'create', 'new', 'idea', 'design', 'concept', 'art', 'style', 'music', 'story', 'novel', 'curious', 'explore', 'dream', 'fantasy', '创意', '设计', '想象', '风格', '好奇', '探索', '梦'],
+    'Conscientiousness': ['plan', 'structure', 'organize', 'schedule', 'goal', 'task', 'list', 'check', 'verify', 'rule', 'standard', 'discipline', 'focus', 'duty', 'order', '计划', '结构', '目标', '任务', '自律', '专注', '秩序'],
+    'Extraversion': ['team', 'share', 'talk', 'discuss', 'meet', 'social', 'party', 'group', 'friend', 'connect', 'communicate', 'express', 'active', 'energy', 'outgoing', '分享', '讨论', '社交', '沟通', '表达', '活跃', '外向'],
+    'Agreeableness': ['help', 'please', 'thanks', 'kind', 'care', 'love', 'support', 'agree', 'team', 'cooperate', 'empathy', 'trust', 'forgive', 'soft', 'gentle', '感谢', '请', '帮助', '支持', '合作', '共情', '信任'],
+    'Neuroticism': ['worry', 'fear', 'anxious', 'stress', 'fail', 'error', 'bug', 'crash', 'urgent', 'help', 'panic', 'broken', 'nervous', 'moody', 'upset', '焦虑', '担心', '错误', '紧急', '恐慌', '紧张', '情绪'],
+
+    # 2. MBTI Dimensions
+    'MBTI_E': ['talk', 'discuss', 'group', 'social', 'meeting', 'speak', 'say', 'party', 'public', '讨论', '群', '社交', '会议', '说'],
+    'MBTI_I': ['think', 'read', 'write', 'alone', 'quiet', 'reflect', 'private', 'self', 'internal', '思考', '读', '写', '独自', '安静', '反思'],
+    'MBTI_S': ['fact', 'data', 'detail', 'real', 'practical', 'step', 'history', 'experience', 'sense', '事实', '数据', '细节', '现实', '实用', '步骤'],
+    'MBTI_N': ['idea', 'concept', 'future', 'theory', 'meaning', 'pattern', 'vision', 'possibility', 'abstract', '想法', '概念', '未来', '理论', '意义', '模式'],
+    'MBTI_T': ['logic', 'reason', 'analyze', 'critique', 'objective', 'principle', 'rule', 'justice', 'truth', '逻辑', '分析', '批判', '客观', '原则', '真相'],
+    'MBTI_F': ['feel', 'value', 'harmony', 'empathy', 'compassion', 'care', 'people', 'subjective', 'moral', '感受', '价值', '和谐', '同情', '关心', '人', '道德'],
+    'MBTI_J': ['plan', 'decide', 'close', 'finish', 'order', 'schedule', 'deadline', 'control', 'structure', '计划', '决定', '完成', '秩序', '日程', '截止'],
+    'MBTI_P': ['open', 'adapt', 'change', 'flow', 'option', 'flexible', 'spontaneous', 'wait', 'explore', '开放', '适应', '变化', '选项', '灵活', '等待'],
+
+    # 3. Enneagram (9 Types Triggers)
+    'Enneagram_1_Reformer': ['perfect', 'correct', 'right', 'improve', 'standard', 'error', 'fix', 'best', '完美', '正确', '改进', '标准', '错误', '修复'],
+    'Enneagram_2_Helper': ['help', 'give', 'care', 'support', 'need', 'love', 'service', 'friend', '帮助', '给予', '关心', '支持', '需要', '爱', '服务'],
+    'Enneagram_3_Achiever': ['success', 'goal', 'win', 'achieve', 'result', 'efficient', 'image', 'status', '成功', '目标', '赢', '成就', '结果', '效率'],
+    'Enneagram_4_Individualist': ['unique', 'special', 'feeling', 'express', 'deep', 'meaning', 'authentic', 'self', '独特', '特别', '感觉', '表达', '深', '意义'],
+    'Enneagram_5_Investigator': ['know', 'learn', 'understand', 'analyze', 'observe', 'knowledge', 'why', 'how', '知道', '学习', '理解', '分析', '观察', '知识'],
+    'Enneagram_6_Loyalist': ['safe', 'secure', 'trust', 'rule', 'plan', 'worry', 'prepare', 'guide', '安全', '信任', '规则', '计划', '担心', '准备'],
+    'Enneagram_7_Enthusiast': ['fun', 'happy', 'new', 'excited', 'experience', 'freedom', 'option', 'plan', '有趣', '快乐', '新', '兴奋', '体验', '自由'],
+    'Enneagram_8_Challenger': ['control', 'power', 'strong', 'lead', 'fight', 'protect', 'justice', 'direct', '控制', '力量', '强', '领导', '战斗', '保护'],
+    'Enneagram_9_Peacemaker': ['peace', 'calm', 'harmony', 'agree', 'relax', 'easy', 'avoid', 'quiet', '和平', '平静', '和谐', '同意', '放松', '简单'],
+
+    # 4. Jungian Archetypes
+    'Archetype_Hero': ['hero', 'save', 'win', 'brave', 'courage', 'fight', 'overcome', 'champion', '英雄', '拯救', '赢', '勇敢', '勇气', '战斗'],
+    'Archetype_Sage': ['truth', 'wisdom', 'knowledge', 'understand', 'teach', 'learn', 'expert', 'guide', '真理', '智慧', '知识', '理解', '教', '学'],
+    'Archetype_Lover': ['love', 'passion', 'beauty', 'desire', 'intimacy', 'connect', 'relationship', 'romance', '爱', '激情', '美', '渴望', '亲密', '关系'],
+    'Archetype_Creator': ['create', 'make', 'build', 'invent', 'design', 'vision', 'art', 'innovate', '创造', '制造', '建立', '发明', '设计', '愿景'],
+    'Archetype_Rebel': ['break', 'change', 'free', 'rule', 'disrupt', 'revolution', 'different', 'shock', '打破', '改变', '自由', '规则', '颠覆', '革命'],
+
+    # 5. DISC
+    'DISC_D': ['lead', 'control', 'power', 'win', 'result', 'goal', 'challenge', 'direct', 'fast', 'action', 'now', '领导', '控制', '结果', '挑战'],
+    'DISC_I': ['persuade', 'inspire', 'talk', 'fun', 'story', 'people', 'social', 'network', 'express', 'idea', '影响', '说服', '有趣', '故事'],
+    'DISC_S': ['stable', 'calm', 'support', 'listen', 'patient', 'team', 'loyal', 'process', 'step', 'slow', '稳定', '耐心', '支持', '流程'],
+    'DISC_C': ['rule', 'standard', 'detail', 'fact', 'data', 'analyze', 'check', 'correct', 'system', 'procedure', '规则', '细节', '数据', '准确'],
+
+    # 6. HEXACO (Honesty-Humility)
+    'Honesty-Humility': ['truth', 'honest', 'fair', 'sincere', 'humble', 'modest', 'greed', 'cheat', 'fake', 'lie', 'moral', 'ethical', '诚实', '公平', '谦虚', '真相', '道德']
+}
+
+EMOTION_KEYWORDS = {
+    # A组：内耗类
+    'Shame': ['shame', 'embarrassed', 'humiliated', 'sorry', 'bad', 'stupid', 'hide', 'disgrace', '羞耻', '丢人', '不好意思', '笨', '躲', '耻辱'],
+    'Anxiety': ['anxious', 'worry', 'nervous', 'stress', 'tense', 'panic', 'urgent', 'deadline', 'afraid', 'uneasy', '焦虑', '紧张', '压力', '慌', '急'],
+    'Guilt': ['guilt', 'regret', 'sorry', 'fault', 'blame', 'mistake', 'wrong', 'apologize', 'remorse', 'bad', '内疚', '后悔', '对不起', '错', '怪我'],
+    'Fear': ['fear', 'scared', 'afraid', 'terrified', 'danger', 'threat', 'risk', 'safe', 'horror', 'dread', '恐惧', '害怕', '危险', '不敢', '恐怖'],
+    'Disgust': ['disgust', 'hate', 'gross', 'sick', 'nasty', 'ugly', 'awful', 'bad', 'repulsive', 'revolt', '讨厌', '恶心', '烂', '差', '反感'],
+
+    # B组：外攻类
+    'Envy': ['envy', 'jealous', 'unfair', 'why him', 'wish', 'better', 'compare', 'covet', 'resent', 'rival', '嫉妒', '羡慕', '不公', '凭什么', '攀比'],
+    'Anger': ['angry', 'mad', 'furious', 'rage', 'hate', 'stupid', 'idiot', 'annoy', 'hostile', 'fight', '愤怒', '生气', '火大', '混蛋', '仇恨'],
+    'Frustration': ['frustrated', 'annoyed', 'stuck', 'hard', 'difficult', 'fail', 'slow', 'block', 'irritate', 'bother', '烦躁', '不爽', '卡住', '难', '烦'],
+
+    # C组：情感回响类
+    'Nostalgia': ['remember', 'memory', 'past', 'old', 'time', 'miss', 'back', 'childhood', 'retro', 'recall', '怀旧', '回忆', '过去', '想念', '童年'],
+    'Moved': ['moved', 'touching', 'cry', 'tear', 'warm', 'heart', 'kind', 'sweet', 'inspire', 'emotion', '感动', '泪', '暖心', '温情', '触动'],
+
+    # D组：平和稳定类
+    'Calm': ['calm', 'peace', 'relax', 'quiet', 'still', 'meditate', 'breath', 'zen', 'stable', 'balance', '平静', '安宁', '放松', '安静', '稳定'],
+    'Satisfaction': ['satisfy', 'content', 'good', 'enough', 'done', 'finish', 'complete', 'ok', 'fulfill', 'pleased', '满足', '够了', '完成', '舒服', '满意'],
+
+    # E组：正向能量类
+    'Surprise': ['wow', 'surprise', 'amazing', 'shock', 'unexpected', 'sudden', 'boom', 'cool', 'wonder', 'astonish', '惊喜', '哇', '意外', '酷', '震惊'],
+    'Joy': ['happy', 'joy', 'fun', 'laugh', 'smile', 'glad', 'great', 'awesome', 'delight', 'cheer', '快乐', '开心', '笑', '棒', '喜悦'],
+    'Pride': ['proud', 'best', 'win', 'success', 'achieve', 'master', 'top', 'strong', 'confident', 'glory', '自豪', '骄傲', '成功', '强', '自信'],
+    'Love': ['love', 'like', 'care', 'adore', 'passion', 'heart', 'dear', 'friend', 'romance', 'affection', '爱', '喜欢', '关心', '情', '浪漫']
+}
+
+BIG5_KEYS = ['Openness', 'Conscientiousness', 'Extraversion', 'Agreeableness', 'Neuroticism']
+MBTI_PAIRS = [('MBTI_E', 'MBTI_I'), ('MBTI_S', 'MBTI_N'), ('MBTI_T', 'MBTI_F'), ('MBTI_J', 'MBTI_P')]
+DISC_KEYS = ['DISC_D', 'DISC_I', 'DISC_S', 'DISC_C']
+
+
+# --- 倒排关键词索引 (Inverted Keyword Index) ---
+class KeywordIndex:
+    """
+    Compiled view of a {dimension: [keywords]} dictionary.
+    Most keywords go into a token -> dimension ids map so scoring is one pass over a
+    token Counter. Keywords no single token can equal -- several tokens ("unit test",
+    "思维导图"), symbols ("c++", "ci/cd") or short Latin words ("js", "k8s") -- are
+    matched against the raw prompt text by a shared KeywordMatcher automaton, see
+    is_phrase_keyword(). Single CJK characters and stopwords stay on the token path.
+    """
+
+    def __init__(self, groups):
+        self.dims = list(groups.keys())
+        token_dims = {}
+        phrase_dims = {}
+        for dim_id, keywords in enumerate(groups.values()):
+            for kw in keywords:
+                kw = kw.lower().strip()
+                target = phrase_dims if is_phrase_keyword(kw) else token_dims
+                dims = target.setdefault(kw, [])
+                if dim_id not in dims:  # duplicate keywords inside one list count once
+                    dims.append(dim_id)
+        self.token_index = {k: tuple(v) for k, v in token_dims.items()}
+        self.phrase_index = {' '.join(k.split()): tuple(v) for k, v in phrase_dims.items()}
+        # Latin phrases must not start/end inside a word
+        self.phrase_matcher = KeywordMatcher(self.phrase_index, whole_word=True)
+        self._phrase_dims = [self.phrase_index[p] for p in self.phrase_matcher.patterns]
+
+    def score(self, counts, texts=()):
+        """Hits per dimension from a token Counter plus phrase matches in raw texts."""
+        scores = [0] * len(self.dims)
+        for tok, n in counts.items():
+            for d in self.token_index.get(tok, ()):
+                scores[d] += n
+        if self.phrase_index:
+            for text in texts:
+                # Collapse whitespace so "unit\n  test" still matches "unit test"
+                for _, _, pid in self.phrase_matcher.iter_hits(' '.join(str(text).lower().split())):
+                    for d in self._phrase_dims[pid]:
+                        scores[d] += 1
+        return dict(zip(self.dims, scores))
+
+    def prompt_hits(self, store, texts, indices=None, drop="word"):
+        """
+        (prompts, dims) int32 hit matrix, one row per prompt: token hits from the token
+        store ids (stopwords dropped like store.counts()) plus phrase hits in `texts`.
+        Column sums equal score() over the same prompts.
+        """
+        vocab = store.vocab
+        if indices is None:
+            ids, lengths = store.ids, store.lengths()
+        else:
+            ids, lengths = store.subset(indices)
+        n, n_dims = len(lengths), len(self.dims)
+        hits = np.zeros((n, n_dims), dtype=np.int32)
+
+        # vocab id -> 维度命中 (0/1)，停用词整行清零
+        token_dims = np.zeros((len(vocab), n_dims), dtype=np.int32)
+        for tok, dims in self.token_index.items():
+            i = vocab.index.get(tok)
+            if i is not None:
+                token_dims[i, list(dims)] = 1
+        if drop is not None:
+            token_dims[vocab.stop_mask(drop)] = 0
+        pos = np.flatnonzero(token_dims.any(axis=1)[ids]) if len(vocab) else np.zeros(0, dtype=np.int64)
+        rows = np.repeat(np.arange(n, dtype=np.int64), lengths)[pos]
+        for d in range(n_dims):
+            hits[:, d] = np.bincount(rows, weights=token_dims[ids[pos], d], minlength=n)
+
+        if self.phrase_index:
+            for i, text in enumerate(texts):
+                for _, _, pid in self.phrase_matcher.iter_hits(' '.join(str(text).lower().split())):
+                    hits[i, list(self._phrase_dims[pid])] += 1
+        return hits
+
+
+# --- 核心算法：复杂度评分 (Complexity Score 2.0) ---
+# 2. Logical Depth
+LOGICAL_WORDS = [
+    'if', 'because', 'however', 'therefore', 'although', 'compare', 'difference',
+    '如果', '因为', '但是', '所以', '虽然', '比较', '区别', '原理', '分析', 'why', 'how',
+    'strategy', 'plan', 'method', 'approach', 'framework', 'model', 'theory'
+]
+# 4. Cognitive Patterns (Role & CoT)
+ROLE_PATTERNS = ['act as', 'role', '扮演', '你是一个', 'you are a']
+COT_PATTERNS = ['step by step', 'chain of thought', 'reasoning', '一步步', '思维链']
+
+
+def calculate_complexity(text):
+    score = 0
+    text_lower = text.lower()
+    
+    # 1. Base Score (Length)
+    score += min(len(text) / 200, 1.0) * 30  # Reduced base weight
+    
+    # 2. Logical Depth
+    logic_hits = sum(1 for w in LOGICAL_WORDS if w in text_lower)
+    score += min(logic_hits / 5, 1.0) * 25
+    
+    # 3. Structural Bonus (Markdown)
+    structure_score = 0
+    if '```' in text: structure_score += 15  # Code block
+    if '\n-' in text or '\n*' in text: structure_score += 10  # List
+    if '\n1.' in text: structure_score += 10 # Ordered list
+    if '> ' in text: structure_score += 5    # Quote
+    score += min(structure_score, 30)
+    
+    # 4. Cognitive Patterns (Role & CoT)
+    cognitive_score = 0
+    # Role Prompting
+    if any(p in text_lower for p in ROLE_PATTERNS):
+        cognitive_score += 10
+    # Chain of Thought
+    if any(p in text_lower for p in COT_PATTERNS):
+        cognitive_score += 15
+    score += min(cognitive_score, 15)
+
+    return min(int(score), 100)
+
+
+# 所有复杂度标记编译为一个自动机: marker -> score component
+_STRUCTURE_MARKERS = {'```': 'code', '\n-': 'list', '\n*': 'list', '\n1.': 'ordered', '> ': 'quote'}
+COMPLEXITY_GROUPS = {
+    **{w: 'logic' for w in LOGICAL_WORDS},
+    **_STRUCTURE_MARKERS,
+    **{p: 'role' for p in ROLE_PATTERNS},
+    **{p: 'cot' for p in COT_PATTERNS},
+}
+COMPLEXITY_MATCHER = KeywordMatcher(COMPLEXITY_GROUPS)
+
+
+def score_complexity(prompts):
+    """
+    Batch version of calculate_complexity over a whole Series (same scores, bit for bit).
+    One Aho–Corasick pass over the lowercased corpus yields a prompt x marker
+    presence matrix; the four components are then combined with NumPy.
+    """
+    index = prompts.index if isinstance(prompts, pd.Series) else None
+    texts = [t if isinstance(t, str) else str(t) for t in (prompts.tolist() if index is not None else prompts)]
+    if not texts:
+        return pd.Series([], index=index, dtype=np.int64)
+
+    n = len(texts)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+    # Markdown markers ('```', '\\n-', '> ' ...) have no case, so all markers can be
+    # matched against the lowercased text in the same pass.
+    present = COMPLEXITY_MATCHER.presence_matrix([t.lower() for t in texts])
+    groups = np.array([COMPLEXITY_GROUPS[p] for p in COMPLEXITY_MATCHER.patterns])
+
+    def has(group):
+        return present[:, groups == group].any(axis=1)
+
+    # 1. Base Score (Length)
+    score = np.minimum(lengths / 200, 1.0) * 30
+
+    # 2. Logical Depth (distinct logical words present)
+    logic_hits = present[:, groups == 'logic'].sum(axis=1)
+    score += np.minimum(logic_hits / 5, 1.0) * 25
+
+    # 3. Structural Bonus (Markdown)
+    structure_score = 15 * has('code') + 10 * has('list') + 10 * has('ordered') + 5 * has('quote')
+    score += np.minimum(structure_score, 30)
+
+    # 4. Cognitive Patterns (Role & CoT)
+    score += np.minimum(10 * has('role') + 15 * has('cot'), 15)
+
+    return pd.Series(np.minimum(score.astype(np.int64), 100), index=index)
+
+
+# --- Strict Filter: 测试 / 打招呼类垃圾 prompt ---
+JUNK_WORDS = ["test", "hello", "hi", "你好", "测试", "demo"]
+JUNK_MATCHER = KeywordMatcher(JUNK_WORDS)
+
+
+# --- 核心算法：双语分词 (Bilingual NLP + De-noising) ---
+ZH_PATTERN = re.compile(r'[\u4e00-\u9fa5]+')
+EN_PATTERN = re.compile(r'[a-zA-Z]{2,}')
+
+# 词云 / 雷达 / SoulPrint 使用的停用词 (中英文字符集不相交，可合并判断)
+WORD_STOPS = chinese_stops | english_stops
+
+
+def segment_prompt(text):
+    """Segment one prompt: jieba Chinese words first, then lowercase English words."""
+    # 1. 中文分词 (jieba)
+    zh_words = [w for w in jieba.lcut(text) if len(w) > 1 and ZH_PATTERN.match(w)]
+    # 2. 英文分词 (简单正则) - Filter super short English words
+    en_words = [w for w in EN_PATTERN.findall(text.lower()) if len(w) > 2]
+    return zh_words + en_words
+
+
+def is_phrase_keyword(kw):
+    """
+    Whether a keyword must be matched in the raw text instead of as a token.
+    Only keywords that segment into several tokens, contain symbols, or are Latin words
+    the tokenizer drops; the matcher checks word edges for ASCII only, so a single CJK
+    character ("情") would hit inside other words (情况) and stays a token keyword.
+    Stopwords never score (the token path drops them too).
+    """
+    tokens = segment_prompt(kw)
+    if tokens == [kw] or kw in WORD_STOPS:
+        return False
+    if len(tokens) > 1 or not all(ch.isalnum() or ch.isspace() for ch in kw):
+        return True
+    return kw.isascii()
+
+
+# 关键词索引依赖 segment_prompt() 划分 token / 短语关键词
+CATEGORY_INDEX = KeywordIndex({k: v['keywords'] for k, v in CATEGORY_DEFS.items()})
+PSYCH_INDEX = KeywordIndex(PSYCH_KEYWORDS)
+EMOTION_INDEX = KeywordIndex(EMOTION_KEYWORDS)
+
+
+# --- 词表编码 (Vocabulary Interning) ---
+TOKEN_ID_DTYPE = np.int32
+
+# stop_mask() 按名字取词表；"custom" 等临时词表可直接传 stops
+STOP_LISTS = {
+    "word": WORD_STOPS,
+    "bigram": BIGRAM_STOPS,
+    "objectivity": OBJECTIVITY_STOPWORDS,
+}
+
+
+class Vocab:
+    """
+    Append-only token <-> int id table; ids stay stable as new prompts are appended.
+    Each distinct token string is stored once, the corpus itself is just ids.
+    """
+
+    def __init__(self, tokens=()):
+        self.index: Dict[str, int] = {}
+        self.tokens: List[str] = []
+        self._stop_masks: Dict[str, np.ndarray] = {}
+        self.encode(tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def encode(self, tokens):
+        if not len(tokens):
+            return np.zeros(0, dtype=TOKEN_ID_DTYPE)
+        # factorize 在 C 层做哈希去重，Python 循环只走不同的词
+        codes, uniques = pd.factorize(np.asarray(tokens, dtype=object))
+        index = self.index
+        mapped = np.empty(len(uniques), dtype=TOKEN_ID_DTYPE)
+        for j, tok in enumerate(uniques.tolist()):
+            i = index.get(tok)
+            if i is None:
+                i = index[tok] = len(self.tokens)
+                self.tokens.append(tok)
+            mapped[j] = i
+        return mapped[codes]
+
+    def decode(self, ids):
+        tokens = self.tokens
+        return [tokens[i] for i in ids.tolist()]
+
+    def stop_mask(self, name, stops=None):
+        """Boolean mask over ids (True = stopword), extended lazily as the vocab grows."""
+        mask = self._stop_masks.get(name, np.zeros(0, dtype=bool))
+        if len(mask) < len(self.tokens):
+            stops = STOP_LISTS[name] if stops is None else stops
+            # 词表里的英文词已是小写，中文无大小写，直接判断即可
+            extra = np.fromiter((tok in stops for tok in self.tokens[len(mask):]), dtype=bool)
+            mask = self._stop_masks[name] = np.concatenate([mask, extra])
+        return mask
+
+
+@dataclass
+class TokenStore:
+    """
+    Per-prompt token ids, segmented once per upload.
+    Ids of prompt i are ids[offsets[i]:offsets[i + 1]] (int32, decoded through vocab);
+    stopwords are NOT removed here -- every consumer applies its own stop mask.
+    """
+    ids: np.ndarray
+    offsets: np.ndarray
+    vocab: Vocab = field(default_factory=Vocab)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def _drop(self, drop):
+        # drop: stop list name, ready-made boolean mask over the vocab, or None
+        if drop is None or isinstance(drop, np.ndarray):
+            return drop
+        return self.vocab.stop_mask(drop)
+
+    def subset(self, indices):
+        """(ids, lengths) of a subset of prompts, gathered without a per-prompt loop."""
+        rows = np.asarray(sorted(indices), dtype=np.int64)
+        lengths = self.lengths()[rows]
+        starts = self.offsets[rows]
+        ends = np.cumsum(lengths)
+        pos = np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - lengths), lengths)
+        return self.ids[pos], lengths
+
+    def prompt_tokens(self, i, drop=None):
+        ids = self.ids[self.offsets[i]:self.offsets[i + 1]]
+        drop = self._drop(drop)
+        if drop is not None:
+            ids = ids[~drop[ids]]
+        return self.vocab.decode(ids)
+
+    def words(self, indices=None, drop="word"):
+        """Flat stopword-filtered token stream (decoded), optionally for a subset of prompts."""
+        ids = self.ids if indices is None else self.subset(indices)[0]
+        drop = self._drop(drop)
+        if drop is not None:
+            ids = ids[~drop[ids]]
+        return self.vocab.decode(ids)
+
+    def counts(self, indices=None, drop="word"):
+        """
+        Counter of stopword-filtered tokens. Built from a bincount over ids; keys come out
+        in id order, which is first-occurrence order, same as Counter(words()).
+        """
+        ids = self.ids if indices is None else self.subset(indices)[0]
+        n = np.bincount(ids, minlength=len(self.vocab))
+        drop = self._drop(drop)
+        if drop is not None:
+            n[:len(drop)][drop] = 0
+        nz = np.flatnonzero(n)
+        tokens = self.vocab.tokens
+        return Counter(dict(zip([tokens[i] for i in nz.tolist()], n[nz].tolist())))
+
+
+# --- 并行分词 (Multiprocess Segmentation for large uploads) ---
+PARALLEL_MIN_PROMPTS = 5000   # 小数据集进程池启动开销占主导，直接串行
+PARALLEL_CHUNK_SIZE = 2000    # 每个分片的 prompt 数
+MAX_SEGMENT_WORKERS = int(os.environ.get("SPR_MAX_WORKERS", "8"))
+
+
+def resolve_workers(n_prompts, max_workers=None):
+    """Pick a worker count for n prompts: 1 (serial) for small inputs, else capped CPU count."""
+    if n_prompts < PARALLEL_MIN_PROMPTS:
+        return 1
+    cap = max_workers if max_workers is not None else MAX_SEGMENT_WORKERS
+    n_chunks = -(-n_prompts // PARALLEL_CHUNK_SIZE)
+    return max(1, min(os.cpu_count() or 1, cap, n_chunks))
+
+
+def _segment_chunk(lines):
+    """Worker entry point: segment a shard, return its flat tokens and per-prompt lengths."""
+    tokens, lengths = [], []
+    for line in lines:
+        toks = segment_prompt(str(line))
+        tokens.extend(toks)
+        lengths.append(len(toks))
+    return tokens, lengths
+
+
+def build_token_store(lines, max_workers=None, vocab=None):
+    """Segment lines into a TokenStore; pass the existing vocab to keep ids consistent on append."""
+    vocab = vocab if vocab is not None else Vocab()
+    workers = resolve_workers(len(lines), max_workers)
+    chunks = [lines[i:i + PARALLEL_CHUNK_SIZE] for i in range(0, len(lines), PARALLEL_CHUNK_SIZE)]
+
+    results = None
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # map() yields shards in submission order, so offsets stay aligned with lines
+                results = list(pool.map(_segment_chunk, chunks))
+        except Exception as e:
+            # Pool unavailable (sandboxed host, pickling issue...) -> serial fallback
+            print(f"⚠️  Parallel segmentation failed, falling back to serial: {e}")
+            results = None
+    if results is None:
+        results = [_segment_chunk(chunk) for chunk in chunks]
+
+    # 分片按顺序编码，id 分配顺序即全语料首次出现顺序
+    ids = []
+    lengths = []
+    for chunk_tokens, chunk_lengths in results:
+        ids.append(vocab.encode(chunk_tokens))
+        lengths.extend(chunk_lengths)
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    ids = np.concatenate(ids) if ids else np.zeros(0, dtype=TOKEN_ID_DTYPE)
+    return TokenStore(ids=ids, offsets=offsets, vocab=vocab)
+
+
+# --- 数据预处理 ---
+# epoch 时间戳按此时区换算成钟点 (hour / date / weekday)；未设置时用本机时区
+TIMEZONE = os.environ.get("SPR_TIMEZONE") or None
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+@lru_cache(maxsize=1)
+def local_zone():
+    """
+    The machine's zone as an IANA name (from $TZ or the /etc/localtime link), so pandas
+    converts with vectorized tz rules; dateutil's tzlocal() (per-element, ~100x slower)
+    is only the fallback.
+    """
+    candidates = [os.environ.get("TZ", "").lstrip(":")]
+    try:
+        candidates.append(os.path.realpath("/etc/localtime").split("zoneinfo/", 1)[1])
+    except (OSError, IndexError):
+        pass
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            ZoneInfo(name)
+            return name
+        except (ValueError, ZoneInfoNotFoundError):
+            continue
+    from dateutil.tz import tzlocal
+    return tzlocal()
+
+
+def resolve_tz(tz=None):
+    """tz name (e.g. "Asia/Shanghai"), else SPR_TIMEZONE, else the machine's local zone."""
+    return tz or TIMEZONE or local_zone()
+
+
+def to_local_times(timestamps, tz=None):
+    """
+    Naive wall-clock datetime64 Series in `tz`, one vectorized pd.to_datetime call.
+    timestamps: epoch seconds (NaN / <= 0 -> NaT), or datetime objects taken as-is.
+    """
+    values = np.asarray(timestamps)
+    if values.dtype.kind in 'fiu':
+        secs = values.astype(np.float64)
+        secs[~(secs > 0)] = np.nan
+        # 取整到微秒 (与 datetime.fromtimestamp 一致)，避免浮点秒换算出 ...999 纳秒
+        times = pd.to_datetime(np.round(secs * 1e6), unit='us', utc=True).tz_convert(resolve_tz(tz)).tz_localize(None)
+    else:
+        times = pd.to_datetime(pd.Series(list(timestamps), dtype=object))
+    return pd.Series(times).reset_index(drop=True)
+
+
+def add_time_columns(df, times):
+    """time / hour / date / weekday / week_name, all derived from datetime64 (no per-row
+    Python objects). Returns True when any row has a time."""
+    df["time"] = times.to_numpy()
+    df["hour"] = df["time"].dt.hour
+    df["date"] = df["time"].dt.normalize()
+    df["weekday"] = df["time"].dt.weekday  # 0=Monday
+    df["week_name"] = pd.Categorical.from_codes(df["weekday"].fillna(-1).astype(np.int8), DAY_NAMES)
+    return bool(df["time"].notna().any())
+
+
+def build_prompt_frame(lines, timestamps=None, timer=None, tz=None):
+    """
+    Build the base prompt DataFrame. Returns (df, has_time).
+    timestamps must align 1:1 with lines (missing = NaN / NaT); has_time is True when
+    any prompt has a time, and the time columns are NaT / NaN for the rest.
+    """
+    timer = timer or StageTimer()
+    with timer.stage("prompt frame", items=len(lines)):
+        df = pd.DataFrame({"prompt": lines})
+        df["prompt"] = df["prompt"].astype(str) # Ensure string type
+        df["len"] = df["prompt"].str.len()
+
+        has_time = False
+        if timestamps is not None and len(timestamps) == len(lines):
+            has_time = add_time_columns(df, to_local_times(timestamps, tz))
+
+    with timer.stage("complexity", items=len(df)):
+        df['complexity'] = score_complexity(df['prompt'])
+    return df, has_time
+
+
+# --- Category Radar ---
+def score_categories(word_counts, texts=()):
+    """Keyword hits per category from a token Counter (+ phrase hits in texts)."""
+    return CATEGORY_INDEX.score(word_counts, texts)
+
+
+def category_matrix(store, texts, indices=None):
+    """Per-prompt category hits: (prompts, categories) int32, columns in CATEGORY_DEFS order."""
+    return CATEGORY_INDEX.prompt_hits(store, texts, indices)
+
+
+# --- Top Phrases (N-grams) ---
+def ngram_bits(n):
+    # n 个 id 打包进一个 int64：bigram 每个 id 31 bit，trigram 21 bit
+    return 63 // n
+
+
+def ngram_codes(ids, lengths, n, keep=None):
+    """
+    Integer codes of all n-grams (in corpus order) that stay inside one prompt.
+    ids: flat token ids, lengths: tokens per prompt, keep: optional mask of tokens to
+    keep (dropped tokens are removed before pairing, as with the old string loop).
+    """
+    pid = np.repeat(np.arange(len(lengths)), lengths)
+    if keep is not None:
+        ids, pid = ids[keep], pid[keep]
+    ids = ids.astype(np.int64)
+    m = len(ids) - n + 1
+    if m <= 0:
+        return np.zeros(0, dtype=np.int64)
+    bits = ngram_bits(n)
+    codes = ids[:m].copy()
+    for k in range(1, n):
+        codes = (codes << bits) | ids[k:k + m]
+    return codes[pid[:m] == pid[n - 1:]]
+
+
+@dataclass
+class NGramCounts:
+    """
+    Integer-coded n-gram counts as sorted NumPy arrays (no per-phrase Python objects).
+    `first` is the sequence number of the first occurrence, used to break count ties in
+    corpus order (same order as Counter.most_common on the old string Counter).
+    """
+    n: int
+    codes: np.ndarray
+    counts: np.ndarray
+    first: np.ndarray
+    seen: int = 0  # n-grams observed so far; next batch's sequence numbers start here
+
+    @classmethod
+    def from_codes(cls, codes, n):
+        uniq, first, counts = np.unique(codes, return_index=True, return_counts=True)
+        return cls(n, uniq, counts.astype(np.int64), first.astype(np.int64), len(codes))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def merge(self, other, sign=1):
+        """Add (sign=1) or subtract (sign=-1) another batch in place."""
+        if sign < 0:
+            # 被删的 n-gram 一定已存在：定位后相减，计数归零的条目删除
+            pos = np.searchsorted(self.codes, other.codes)
+            self.counts[pos] -= other.counts
+            alive = self.counts > 0
+            if not alive.all():
+                self.codes, self.counts, self.first = self.codes[alive], self.counts[alive], self.first[alive]
+            return self
+        codes = np.concatenate([self.codes, other.codes])
+        uniq, inv = np.unique(codes, return_inverse=True)
+        counts = np.zeros(len(uniq), dtype=np.int64)
+        np.add.at(counts, inv, np.concatenate([self.counts, other.counts]))
+        first = np.full(len(uniq), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, inv, np.concatenate([self.first, other.first + self.seen]))
+        self.codes, self.counts, self.first = uniq, counts, first
+        self.seen += other.seen
+        return self
+
+    def top(self, k):
+        """(code, count) of the k most frequent n-grams, ties in first-occurrence order."""
+        if k <= 0 or not len(self.codes):
+            return []
+        if len(self.counts) > k:
+            # 只对 >= 第 k 大计数的候选排序 (含边界上的全部并列项)
+            kth = np.partition(self.counts, len(self.counts) - k)[len(self.counts) - k]
+            cand = np.flatnonzero(self.counts >= kth)
+        else:
+            cand = np.arange(len(self.counts))
+        order = cand[np.lexsort((self.first[cand], -self.counts[cand]))][:k]
+        return list(zip(self.codes[order].tolist(), self.counts[order].tolist()))
+
+
+def count_ngrams(store, n=2, indices=None, drop="bigram"):
+    """N-gram counts over the token store (or a subset of prompts); decode codes with store.vocab."""
+    vocab = store.vocab
+    if indices is None:
+        ids, lengths = store.ids, store.lengths()
+    else:
+        ids, lengths = store.subset(indices)
+    if len(vocab) >= 1 << ngram_bits(n):
+        raise ValueError(f"Vocabulary too large for {n}-gram codes")
+    # Robust filter: drop bigram stopwords before pairing
+    keep = ~store._drop(drop)[ids] if drop is not None else None
+    return NGramCounts.from_codes(ngram_codes(ids, lengths, n, keep), n)
+
+
+def decode_ngram(code, n, vocab):
+    bits = ngram_bits(n)
+    mask = (1 << bits) - 1
+    return " ".join(vocab.tokens[(code >> (bits * (n - 1 - k))) & mask] for k in range(n))
+
+
+def top_ngrams(counts, vocab, top_k=12):
+    """Top-k phrases as [(text, count)]."""
+    return [(decode_ngram(code, counts.n, vocab), c) for code, c in counts.top(top_k)]
+
+
+def extract_bigrams(store, top_k=12):
+    return top_ngrams(count_ngrams(store, 2), store.vocab, top_k)
+
+
+# --- SoulPrint: 计算评分 (New Relative Dominance Algorithm) ---
+def calculate_soul_metrics(word_counts, texts=()):
+    # Raw Counts
+    psych_raw = PSYCH_INDEX.score(word_counts, texts)
+    emotion_raw = EMOTION_INDEX.score(word_counts, texts)
+    return soul_scores_from_raw(psych_raw, emotion_raw)
+
+
+def soul_scores_from_raw(psych_raw, emotion_raw):
+    """Normalize raw SoulPrint keyword hits into 0-100 scores."""
+    # Helper to normalize within a group
+    def normalize_group(raw_dict, keys):
+        group_vals = [raw_dict[k] for k in keys]
+        max_val = max(group_vals) if group_vals else 0
+        if max_val == 0: return {k: 0 for k in keys}
+        # Scale: Max becomes 95, others proportional
+        return {k: int((raw_dict[k] / max_val) * 95) for k in keys}
+
+    # 1. Big Five Normalization
+    b5_scores = normalize_group(psych_raw, BIG5_KEYS)
+    
+    # 2. MBTI Normalization (Per Pair)
+    mbti_scores = {}
+    for k1, k2 in MBTI_PAIRS:
+        raw1, raw2 = psych_raw[k1], psych_raw[k2]
+        total = raw1 + raw2
+        if total == 0:
+            mbti_scores[k1] = 0
+            mbti_scores[k2] = 0
+        else:
+            # Difference scaling
+            mbti_scores[k1] = int((raw1 / total) * 100)
+            mbti_scores[k2] = int((raw2 / total) * 100)
+
+    # 3. Enneagram Normalization
+    ennea_keys = [k for k in PSYCH_KEYWORDS if k.startswith('Enneagram')]
+    ennea_scores = normalize_group(psych_raw, ennea_keys)
+
+    # 4. Archetype Normalization
+    arch_keys = [k for k in PSYCH_KEYWORDS if k.startswith('Archetype')]
+    arch_scores = normalize_group(psych_raw, arch_keys)
+    
+    # 5. DISC Normalization
+    disc_scores = normalize_group(psych_raw, DISC_KEYS)
+    
+    # 6. HEXACO (Just H) - Normalize against global max to see if it's significant
+    max_global = max(psych_raw.values()) if psych_raw.values() else 1
+    hex_score = int((psych_raw['Honesty-Humility'] / max_global) * 100) if max_global else 0
+    
+    # Emotions
+    max_emo = max(emotion_raw.values()) if emotion_raw.values() else 1
+    emotion_scores = {k: int((v / max_emo) * 100) if max_emo else 0 for k, v in emotion_raw.items()}
+
+    # Merge all psych scores
+    final_psych = {**b5_scores, **mbti_scores, **ennea_scores, **arch_scores, **disc_scores, 'Honesty-Humility': hex_score}
+    
+    return {
+        'psych': final_psych,
+        'emotion': emotion_scores,
+        'raw_psych': psych_raw,
+        'raw_emotion': emotion_raw
+    }
+
+
+# --- 思维进化 (Time Travel) ---
+# 时间粒度：pandas period 频率 -> 每条 prompt 归到所在周期的起点
+EVOLUTION_FREQS = ("D", "W", "M")
+
+
+def prompt_periods(df, freq="W"):
+    """Start of the day / ISO week (Monday) / month each prompt falls in."""
+    return df['time'].dt.to_period(freq).dt.start_time
+
+
+def prompt_weeks(df):
+    """Start of the ISO week (Monday) each prompt falls in."""
+    return prompt_periods(df, "W")
+
+
+def _week_dtype(df):
+    return prompt_weeks(df.iloc[:1]).dtype
+
+
+def period_sums(df, hits, freq="W", indices=None):
+    """
+    count / complexity_sum / category hits per period: one grouped sum over the
+    per-prompt hit matrix (rows of `hits` follow `indices`, or all prompts), indexed by period start.
+    """
+    rows = np.arange(len(df)) if indices is None else np.asarray(sorted(indices), dtype=np.int64)
+    frame = pd.DataFrame(hits, columns=list(CATEGORY_DEFS.keys()))
+    frame.insert(0, 'complexity_sum', df['complexity'].to_numpy()[rows])
+    frame.insert(0, 'count', 1)
+    return frame.groupby(prompt_periods(df, freq).to_numpy()[rows]).sum()
+
+
+def weekly_buckets(df, hits, indices=None):
+    """
+    Additive per-week sums: {week: Counter(count, complexity_sum, <category raw hits>)}.
+    Every field is a plain sum over prompts, so buckets can be added / subtracted.
+    """
+    sums = period_sums(df, hits, "W", indices)
+    return {pd.Timestamp(week): Counter(rec) for week, rec in zip(sums.index, sums.to_dict('records'))}
+
+
+def category_shares(sums, date_col='date'):
+    """Normalized category shares per period from period_sums() (periods without any hit are dropped)."""
+    cat_cols = list(CATEGORY_DEFS.keys())
+    cat_evo_df = pd.DataFrame({date_col: sums.index})
+    for c in cat_cols:
+        cat_evo_df[c] = sums[c].to_numpy(dtype=np.int64)
+
+    # 归一化处理 (显示占比)
+    cat_evo_df['total'] = cat_evo_df[cat_cols].sum(axis=1)
+    # Avoid division by zero
+    cat_evo_df = cat_evo_df[cat_evo_df['total'] > 0].copy()
+    for c in cat_cols:
+        cat_evo_df[c] = cat_evo_df[c] / cat_evo_df['total']
+    return cat_evo_df
+
+
+def evolution_frame(buckets, week_dtype):
+    """Weekly count / avg complexity from weekly_buckets()."""
+    weeks = sorted(w for w, b in buckets.items() if b['count'] > 0)
+    return pd.DataFrame({
+        'date_week': pd.Series(pd.to_datetime(weeks), dtype=week_dtype),
+        'count': np.array([buckets[w]['count'] for w in weeks], dtype=np.int64),
+        'complexity': np.array([buckets[w]['complexity_sum'] / buckets[w]['count'] for w in weeks], dtype=float),
+    })
+
+
+def compute_evolution(df, store):
+    """Weekly count / avg complexity plus normalized category shares."""
+    hits = category_matrix(store, df['prompt'].tolist())
+    return (evolution_frame(weekly_buckets(df, hits), _week_dtype(df)),
+            category_shares(period_sums(df, hits, "W"), 'date_week'))
+
+
+# --- 增量聚合 (Incremental Aggregates) ---
+@dataclass
+class Aggregates:
+    """
+    Corpus-level sums behind every metric. All fields are additive over prompts,
+    so deleting (or appending) prompts only touches the affected prompts' contributions.
+    """
+    word_counts: Counter
+    bigram_counts: NGramCounts  # decoded through vocab
+    category_raw: Dict[str, int]
+    psych_raw: Dict[str, int]
+    emotion_raw: Dict[str, int]
+    vocab: Vocab = field(default_factory=Vocab)  # the token store's vocab (shared, not a copy)
+    weekly: Dict[pd.Timestamp, Counter] = field(default_factory=dict)
+
+
+def aggregate_prompts(df, store, indices, has_time, hits=None):
+    """
+    Aggregates for a subset of prompts (row positions in df / store).
+    `hits`: their rows of the category matrix, if already known.
+    """
+    indices = sorted(indices)
+    prompts = df['prompt'].tolist()
+    texts = [prompts[i] for i in indices]
+    word_counts = store.counts(indices)
+    if hits is None:
+        hits = category_matrix(store, texts, indices)
+    return Aggregates(
+        word_counts=word_counts,
+        bigram_counts=count_ngrams(store, 2, indices),
+        vocab=store.vocab,
+        category_raw=dict(zip(CATEGORY_INDEX.dims, hits.sum(axis=0).tolist())),
+        psych_raw=PSYCH_INDEX.score(word_counts, texts),
+        emotion_raw=EMOTION_INDEX.score(word_counts, texts),
+        weekly=weekly_buckets(df, hits, indices) if has_time and indices else {},
+    )
+
+
+def _merge_counter(total, delta, sign):
+    """total += sign * delta in place; keys that drop to zero are removed (O(len(delta)))."""
+    for k, v in delta.items():
+        n = total.get(k, 0) + sign * v
+        if n > 0:
+            total[k] = n
+        else:
+            total.pop(k, None)
+
+
+def _merge_raw(total, delta, sign):
+    # 维度固定 (dims 全部保留，包括 0)
+    for k, v in delta.items():
+        total[k] = total[k] + sign * v
+
+
+def merge_aggregates(aggs, delta, sign=1):
+    """Add (sign=1) or subtract (sign=-1) a delta in place. Returns aggs."""
+    _merge_counter(aggs.word_counts, delta.word_counts, sign)
+    aggs.bigram_counts.merge(delta.bigram_counts, sign)
+    _merge_raw(aggs.category_raw, delta.category_raw, sign)
+    _merge_raw(aggs.psych_raw, delta.psych_raw, sign)
+    _merge_raw(aggs.emotion_raw, delta.emotion_raw, sign)
+    for week, bucket in delta.weekly.items():
+        merged = aggs.weekly.setdefault(week, Counter())
+        for k, v in bucket.items():
+            merged[k] += sign * v
+        if merged['count'] <= 0:
+            del aggs.weekly[week]
+    return aggs
+
+
+@dataclass
+class AnalysisResult:
+    """Everything the Mind Cockpit renders for one dataset."""
+    df: pd.DataFrame
+    has_time: bool
+    word_counts: Counter
+    category_scores: Dict[str, int]
+    top_bigrams: List[Tuple[str, int]]
+    soul: Dict[str, dict]
+    evolution_df: Optional[pd.DataFrame] = None  # category shares: category_evolution(), on demand
+    token_store: Optional[TokenStore] = None
+    sources: List[str] = field(default_factory=list)
+    timings: List[dict] = field(default_factory=list)  # profiling.StageTimer records
+    aggregates: Optional[Aggregates] = None
+    ngram_cache: Dict[int, NGramCounts] = field(default_factory=dict)  # n>2, computed on demand
+    freq_cache: Dict[str, tuple] = field(default_factory=dict)  # filter_frequencies() memo: mode -> (custom, freqs)
+    category_hits: Optional[np.ndarray] = None  # (prompts, categories) category_matrix()
+
+
+def align_sources(sources, n):
+    """sources padded with None (or cut) to exactly n entries, one per prompt."""
+    sources = list(sources or [])[:n]
+    return sources + [None] * (n - len(sources))
+
+
+def concat_sources(a, n_a, b, n_b):
+    """
+    Sources of two prompt lists of lengths n_a / n_b, concatenated. Formats without
+    sources (txt / jsonl) give []; when only one side has them the other is padded
+    with None, so the result stays aligned 1:1 with the merged prompts.
+    """
+    if not a and not b:
+        return []
+    return align_sources(a, n_a) + align_sources(b, n_b)
+
+
+def analyze(lines, timestamps=None, sources=None, max_workers=None, timer=None, tz=None):
+    """Run the full pipeline on a list of prompts (no Streamlit required)."""
+    timer = timer or StageTimer()
+    first = len(timer.records)
+    n = len(lines)
+    df, has_time = build_prompt_frame(lines, timestamps, timer, tz)
+    with timer.stage("segmentation (jieba)", items=n):
+        store = build_token_store(lines, max_workers)
+    with timer.stage("word counts", items=len(store.ids)):
+        word_counts = store.counts()
+    with timer.stage("category radar", items=n):
+        category_hits = category_matrix(store, lines)
+        category_scores = dict(zip(CATEGORY_INDEX.dims, category_hits.sum(axis=0).tolist()))
+    with timer.stage("bigrams", items=n):
+        vocab = store.vocab
+        bigram_counts = count_ngrams(store, 2)
+    with timer.stage("soulprint", items=n):
+        soul = calculate_soul_metrics(word_counts, lines)
+    aggregates = Aggregates(
+        word_counts=word_counts,  # 与 result.word_counts 共用同一个 Counter
+        bigram_counts=bigram_counts,
+        vocab=vocab,
+        category_raw=dict(category_scores),
+        psych_raw=dict(soul['raw_psych']),
+        emotion_raw=dict(soul['raw_emotion']),
+    )
+    result = AnalysisResult(
+        df=df,
+        has_time=has_time,
+        word_counts=word_counts,
+        category_scores=category_scores,
+        top_bigrams=top_ngrams(bigram_counts, vocab, 12),
+        soul=soul,
+        token_store=store,
+        sources=list(sources or []),
+        aggregates=aggregates,
+        category_hits=category_hits,
+    )
+    if has_time:
+        with timer.stage("category evolution", items=n):
+            aggregates.weekly = weekly_buckets(df, category_hits)
+            result.evolution_df = evolution_frame(aggregates.weekly, _week_dtype(df))
+    result.timings = timer.records[first:]
+    return result
+
+
+def ensure_aggregates(result):
+    """Aggregates for results that predate them (e.g. loaded from the disk cache): one
+    counting pass over the stored tokens, no segmentation."""
+    if result.aggregates is None:
+        result.aggregates = aggregate_prompts(result.df, result.token_store, range(len(result.df)), result.has_time,
+                                              ensure_category_hits(result))
+    return result.aggregates
+
+
+def ensure_category_hits(result):
+    """Per-prompt category matrix, computed once per result (cached results don't store it)."""
+    if result.category_hits is None:
+        result.category_hits = category_matrix(result.token_store, result.df['prompt'].tolist())
+    return result.category_hits
+
+
+def category_evolution(result, freq="W", date_col='date'):
+    """
+    Category shares per day / week / month ("D" / "W" / "M"): one grouped sum over the
+    per-prompt hit matrix. Columns: <date_col>, <categories>, total.
+    """
+    return category_shares(period_sums(result.df, ensure_category_hits(result), freq), date_col)
+
+
+def top_phrases(result, n=2, top_k=12):
+    """Top-k n-gram phrases. Bigrams come from the aggregates; other n are counted once
+    per result and memoized (a new result after delete / append starts fresh)."""
+    aggs = ensure_aggregates(result)
+    if n == 2:
+        counts = aggs.bigram_counts
+    else:
+        counts = result.ngram_cache.get(n)
+        if counts is None:
+            counts = result.ngram_cache[n] = count_ngrams(result.token_store, n)
+    return top_ngrams(counts, aggs.vocab, top_k)
+
+
+# --- 词云过滤模式 (Filter Mode Frequency Tables) ---
+# 每个模式 = 叠加的 stop list 名字 (见 STOP_LISTS)
+FILTER_MODES = {
+    "default": ("word",),
+    "objectivity": ("word", "objectivity"),
+}
+
+
+def filter_frequencies(result, mode="default", custom=()):
+    """
+    {token: count} for a filter mode plus optional custom stopwords, derived from
+    result.word_counts with vocab masks: O(vocab), the token stream is never scanned.
+    Memoized per mode for the most recent custom set only, so edits to the
+    custom stopword box replace the entry instead of accumulating.
+    """
+    custom = frozenset(w.lower().strip() for w in custom if w and w.strip())
+    cached = result.freq_cache.get(mode)
+    if cached is not None and cached[0] == custom:
+        return cached[1]
+    vocab = result.token_store.vocab
+    drop = np.zeros(len(vocab), dtype=bool)
+    for name in FILTER_MODES[mode]:
+        drop |= vocab.stop_mask(name)
+    # 自定义词表每次都不同，不进 stop_mask 缓存，直接按 index 置位
+    custom_ids = [vocab.index[w] for w in custom if w in vocab.index]
+    drop[custom_ids] = True
+    index = vocab.index
+    freqs = {w: n for w, n in result.word_counts.items() if not drop[index[w]]}
+    result.freq_cache[mode] = (custom, freqs)
+    return freqs
+
+
+def _refresh_metrics(result):
+    """Re-derive every rendered metric from result.aggregates (no corpus scan)."""
+    aggs = result.aggregates
+    result.word_counts = aggs.word_counts
+    result.category_scores = dict(aggs.category_raw)
+    result.top_bigrams = top_ngrams(aggs.bigram_counts, aggs.vocab, 12)
+    result.soul = soul_scores_from_raw(dict(aggs.psych_raw), dict(aggs.emotion_raw))
+    if result.has_time:
+        result.evolution_df = evolution_frame(aggs.weekly, _week_dtype(result.df))
+    return result
+
+
+def rebuild_result(df, store, has_time, sources=(), category_hits=None, timer=None):
+    """
+    AnalysisResult from an already enriched prompt frame + token store (e.g. a saved
+    corpus): aggregates and metrics are re-derived by counting, with no segmentation
+    or complexity scoring.
+    """
+    timer = timer or StageTimer()
+    first = len(timer.records)
+    result = AnalysisResult(
+        df=df,
+        has_time=has_time,
+        word_counts=Counter(),
+        category_scores={},
+        top_bigrams=[],
+        soul={},
+        token_store=store,
+        sources=list(sources),
+        category_hits=category_hits,
+    )
+    with timer.stage("rebuild aggregates", items=len(df)):
+        ensure_aggregates(result)
+        _refresh_metrics(result)
+    result.timings = timer.records[first:]
+    return result
+
+
+def remove_prompts(result, indices, timer=None):
+    """
+    Drop prompts (row positions) from an analysis, subtracting their contributions from
+    the aggregates instead of re-running segmentation and scoring over the corpus.
+    Consumes `result` (its aggregates are updated in place) and returns the new result.
+    """
+    timer = timer or StageTimer()
+    first = len(timer.records)
+    n = len(result.df)
+    deleted = sorted({i for i in indices if 0 <= i < n})
+    store = result.token_store
+    aggs = ensure_aggregates(result)
+
+    with timer.stage("incremental delete: subtract", items=len(deleted)):
+        hits = result.category_hits
+        merge_aggregates(aggs, aggregate_prompts(result.df, store, deleted, result.has_time,
+                                                 None if hits is None else hits[deleted]), sign=-1)
+
+    with timer.stage("incremental delete: compact", items=n - len(deleted)):
+        keep = np.ones(n, dtype=bool)
+        keep[deleted] = False
+        lengths = store.lengths()
+        offsets = np.zeros(int(keep.sum()) + 1, dtype=np.int64)
+        np.cumsum(lengths[keep], out=offsets[1:])
+        new_store = TokenStore(store.ids[np.repeat(keep, lengths)], offsets, store.vocab)
+        sources = result.sources
+        new_df = result.df[keep].reset_index(drop=True)
+        new = AnalysisResult(
+            df=new_df,
+            has_time=result.has_time and bool(new_df['time'].notna().any()),
+            word_counts=Counter(),
+            category_scores={},
+            top_bigrams=[],
+            soul={},
+            token_store=new_store,
+            sources=[src for i, src in enumerate(sources) if i >= n or keep[i]],
+            aggregates=aggs,
+            category_hits=None if hits is None else hits[keep],
+        )
+        _refresh_metrics(new)
+    new.timings = timer.records[first:]
+    return new
+
+
+def append_prompts(result, lines, timestamps=None, sources=None, max_workers=None, timer=None, tz=None):
+    """
+    Add new prompts to an analysis: only the new prompts are segmented and scored,
+    then merged into the aggregates. Consumes `result` and returns the merged result.
+    """
+    timer = timer or StageTimer()
+    first = len(timer.records)
+    n = len(lines)
+    delta_df, delta_has_time = build_prompt_frame(lines, timestamps, timer, tz)
+    base_df = result.df
+    # 只有一边带时间列时，另一边补 NaT 列 (缺失时间的 prompt 不进时间图表，其余照常合并)
+    if 'time' in base_df and 'time' not in delta_df:
+        add_time_columns(delta_df, to_local_times(np.full(n, np.nan)))
+    elif 'time' in delta_df and 'time' not in base_df:
+        base_df = base_df.copy()
+        add_time_columns(base_df, to_local_times(np.full(len(base_df), np.nan)))
+
+    aggs = ensure_aggregates(result)
+    store = result.token_store
+    with timer.stage("segmentation (jieba)", items=n):
+        # 共用同一个 vocab：新词追加 id，旧 id 不变
+        delta_store = build_token_store(lines, max_workers, vocab=store.vocab)
+    with timer.stage("incremental append: merge", items=n):
+        delta_hits = category_matrix(delta_store, delta_df['prompt'].tolist())
+        merge_aggregates(aggs, aggregate_prompts(delta_df, delta_store, range(n), delta_has_time, delta_hits))
+        hits = result.category_hits
+        ids = np.concatenate([store.ids, delta_store.ids])
+        offsets = np.concatenate([store.offsets, store.offsets[-1] + np.asarray(delta_store.offsets[1:], dtype=np.int64)])
+        new = AnalysisResult(
+            df=pd.concat([base_df, delta_df], ignore_index=True),
+            has_time=result.has_time or delta_has_time,
+            word_counts=Counter(),
+            category_scores={},
+            top_bigrams=[],
+            soul={},
+            token_store=TokenStore(ids, offsets, store.vocab),
+            sources=concat_sources(result.sources, len(base_df), sources, n),
+            aggregates=aggs,
+            category_hits=None if hits is None else np.concatenate([hits, delta_hits]),
+        )
+        _refresh_metrics(new)
+    new.timings = timer.records[first:]
+    return new
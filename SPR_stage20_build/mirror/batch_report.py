@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Title: SPR Batch Reports – Headless CLI
+Description: 不经过 Streamlit 页面，批量分析多个导出文件 (每个文件视为一位用户)。
+文件在进程池中并行解析 + 分析，每位用户输出一份 JSON 报告 (与页面相同的指标：概览、
+高频词、词组、类别雷达、SoulPrint、思维进化)，可选 Parquet 明细表；最后打印吞吐。
+
+Usage:
+  python mirror/batch_report.py exports/*.json --out reports
+  python mirror/batch_report.py team/ --workers 4 --parquet         # 目录下所有 .json/.jsonl/.txt
+  python mirror/batch_report.py a.json b.txt --dedup 0.85 --tz Asia/Shanghai
+
+Outputs (--out):
+  <user>.json            overview / top_words / top_bigrams / category_scores / soul / evolution
+  <user>/*.parquet       prompts, word_counts, evolution, category_evolution (--parquet)
+  batch_summary.json     每个文件的状态、条数、耗时、解析警告，以及整体吞吐
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from analysis_engine import analyze, category_evolution  # noqa: E402
+from ingest import collapse_near_duplicates, parse_upload  # noqa: E402
+
+EXPORT_EXTS = (".json", ".jsonl", ".txt")
+TOP_WORDS = 100
+TOP_BIGRAMS = 12
+
+
+# --- Inputs ---
+def collect_files(paths):
+    """Expand directories / globs into export files, in a stable order without duplicates."""
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(EXPORT_EXTS))
+        else:
+            files.extend(sorted(glob.glob(p)))
+    return list(dict.fromkeys(os.path.abspath(f) for f in files))
+
+
+def report_names(files):
+    """One report name per file: the file stem, prefixed with its folder when stems collide
+    (e.g. several users' conversations.json)."""
+    names, taken = {}, Counter()
+    stems = Counter(os.path.splitext(os.path.basename(f))[0] for f in files)
+    for f in files:
+        stem = os.path.splitext(os.path.basename(f))[0]
+        name = stem if stems[stem] == 1 else f"{os.path.basename(os.path.dirname(f))}-{stem}"
+        taken[name] += 1
+        names[f] = name if taken[name] == 1 else f"{name}-{taken[name]}"
+    return names
+
+
+# --- Report ---
+def _frame_records(frame, date_col):
+    if frame is None:
+        return []
+    return frame.assign(**{date_col: frame[date_col].dt.strftime("%Y-%m-%d")}).to_dict("records")
+
+
+def build_report(name, path, result, sources, warnings, top_words=TOP_WORDS):
+    """The dashboard's metrics for one user as a JSON-serializable dict."""
+    df = result.df
+    word_counts = result.word_counts
+    overview = {
+        "prompts": len(df),
+        "avg_complexity": round(float(df["complexity"].mean()), 2),
+        "vocab_size": len(word_counts),
+        "avg_length": round(float(df["len"].mean()), 2),
+        "top_word": word_counts.most_common(1)[0][0] if word_counts else None,
+        "has_time": result.has_time,
+        "sources": dict(Counter(sources)),
+    }
+    if result.has_time:
+        times = df["time"].dropna()
+        overview.update(first=times.min().isoformat(), last=times.max().isoformat(),
+                        active_days=int(df["date"].nunique()), timed_prompts=len(times))
+    return {
+        "user": name,
+        "file": path,
+        "overview": overview,
+        "category_scores": result.category_scores,
+        "top_words": word_counts.most_common(top_words),
+        "top_bigrams": result.top_bigrams,
+        "soul": result.soul,
+        "evolution": _frame_records(result.evolution_df, "date_week"),
+        "category_evolution": _frame_records(category_evolution(result, "W", "date_week"), "date_week") if result.has_time else [],
+        "category_evolution_monthly": _frame_records(category_evolution(result, "M"), "date") if result.has_time else [],
+        "warnings": warnings,
+        "timings": result.timings,
+    }
+
+
+def write_parquet(out_dir, result, timestamps, sources):
+    import pandas as pd
+    os.makedirs(out_dir, exist_ok=True)
+    df = result.df
+    pd.DataFrame({
+        "prompt": df["prompt"],
+        "ts": timestamps,
+        "src": pd.Series(list(sources) + [None] * (len(df) - len(sources)), dtype=object),
+        "len": df["len"],
+        "complexity": df["complexity"],
+    }).to_parquet(os.path.join(out_dir, "prompts.parquet"), index=False)
+    pd.DataFrame(result.word_counts.most_common(), columns=["token", "count"]).to_parquet(
+        os.path.join(out_dir, "word_counts.parquet"), index=False)
+    if result.has_time:
+        result.evolution_df.to_parquet(os.path.join(out_dir, "evolution.parquet"), index=False)
+        category_evolution(result, "W", "date_week").to_parquet(os.path.join(out_dir, "category_evolution.parquet"), index=False)
+
+
+# --- Worker (runs in the process pool) ---
+def process_file(path, name, out, options):
+    """Parse + analyze one export and write its reports. Returns a summary row (never raises)."""
+    t0 = time.perf_counter()
+    warnings = []
+    row = {"user": name, "file": path, "status": "ok", "prompts": 0, "seconds": None, "error": None,
+           "warnings": warnings}
+    try:
+        with open(path, "rb") as f:
+            lines, timestamps, sources = parse_upload(f, os.path.basename(path).lower(),
+                                                      exclude_short=options["exclude_short"],
+                                                      strict_filter=options["strict_filter"],
+                                                      warn=warnings.append)
+        if not lines and warnings:
+            # 一条都没保留且有原因 (截断 / 损坏 / 不认识的 JSON，或记录全被过滤)：算失败并带上原因，不是空文件
+            row.update(status="error", error=warnings[0], seconds=round(time.perf_counter() - t0, 3))
+            return row
+        if options["dedup"] is not None and lines:
+            lines, timestamps, sources, n_dropped = collapse_near_duplicates(lines, timestamps, sources, options["dedup"])
+            warnings.append(f"collapsed {n_dropped} near-duplicate prompts")
+        if not lines:
+            row.update(status="empty", seconds=round(time.perf_counter() - t0, 3))
+            return row
+
+        # 文件之间已经并行：单个文件内不再开分词进程池
+        result = analyze(lines, timestamps, sources, max_workers=1, tz=options["tz"])
+        report = build_report(name, path, result, sources, warnings, options["top_words"])
+        with open(os.path.join(out, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1, default=str)
+        if options["parquet"]:
+            write_parquet(os.path.join(out, name), result, timestamps, sources)
+        row["prompts"] = len(lines)
+    except Exception as e:
+        row.update(status="error", error=f"{type(e).__name__}: {e}")
+    row["seconds"] = round(time.perf_counter() - t0, 3)
+    return row
+
+
+# --- Runner ---
+def run(files, out, options, workers=None):
+    names = report_names(files)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    os.makedirs(out, exist_ok=True)
+    rows = []
+    t0 = time.perf_counter()
+    print(f"{'user':<28} {'status':<7} {'prompts':>9} {'seconds':>8} {'prompts/sec':>12}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_file, f, names[f], out, options) for f in files]
+        for fut in as_completed(futures):
+            row = fut.result()
+            rows.append(row)
+            rate = round(row["prompts"] / row["seconds"]) if row["seconds"] else 0
+            print(f"{row['user'][:28]:<28} {row['status']:<7} {row['prompts']:>9,} {row['seconds']:>8.2f} {rate:>12,}"
+                  + (f"  {' '.join(row['error'].split())}" if row["error"] else ""), flush=True)
+    wall = time.perf_counter() - t0
+
+    total = sum(r["prompts"] for r in rows)
+    summary = {
+        "files": len(files),
+        "ok": sum(r["status"] == "ok" for r in rows),
+        "failed": sum(r["status"] == "error" for r in rows),
+        "prompts": total,
+        "workers": workers,
+        "wall_seconds": round(wall, 3),
+        "prompts_per_sec": round(total / wall) if wall else None,
+        "files_per_sec": round(len(files) / wall, 2) if wall else None,
+        "results": sorted(rows, key=lambda r: files.index(r["file"])),
+    }
+    with open(os.path.join(out, "batch_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=1)
+    print(f"\n{summary['ok']}/{len(files)} files · {total:,} prompts · {wall:.2f}s wall · "
+          f"{summary['prompts_per_sec'] or 0:,} prompts/sec · {summary['files_per_sec'] or 0} files/sec "
+          f"({workers} workers)")
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Analyze many Prompt Mirror exports without the Streamlit page")
+    ap.add_argument("paths", nargs="+", help="export files, globs or directories")
+    ap.add_argument("--out", default="reports", help="output directory (default: ./reports)")
+    ap.add_argument("--workers", type=int, help="parallel files (default: CPU count)")
+    ap.add_argument("--parquet", action="store_true", help="also write per-user Parquet tables")
+    ap.add_argument("--keep-short", action="store_true", help="keep very short prompts (the page filters them by default)")
+    ap.add_argument("--strict", action="store_true", help="strict junk filter (same as the page option)")
+    ap.add_argument("--dedup", type=float, metavar="THRESHOLD", help="collapse near-duplicate prompts (e.g. 0.85)")
+    ap.add_argument("--tz", help="timezone for hour / day metrics (default: SPR_TIMEZONE or local)")
+    ap.add_argument("--top-words", type=int, default=TOP_WORDS, help="words kept in each report")
+    args = ap.parse_args()
+
+    missing = [p for p in args.paths if not os.path.exists(p) and not glob.glob(p)]
+    if missing:
+        ap.error(f"not found: {', '.join(missing)}")
+    files = collect_files(args.paths)
+    if not files:
+        ap.error("no export files found")
+    if args.parquet:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            ap.error("--parquet needs pyarrow (pip install pyarrow)")
+    options = {
+        "exclude_short": not args.keep_short,
+        "strict_filter": args.strict,
+        "dedup": args.dedup,
+        "tz": args.tz,
+        "top_words": args.top_words,
+        "parquet": args.parquet,
+    }
+    summary = run(files, args.out, options, args.workers)
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
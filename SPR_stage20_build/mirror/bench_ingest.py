@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Title: SPR Benchmark – Upload Ingestion
+Description: 为四种上传格式生成合成导出文件 (中英文混排)，测量 ingest.parse_upload
+的解析耗时、吞吐 (prompts/sec) 和峰值内存，并与旧版「整文件 json.loads」兜底路径对比。
+
+Usage:
+  python mirror/bench_ingest.py                          # 1k / 10k / 100k，全部格式
+  python mirror/bench_ingest.py --sizes 1000000 --formats official extension
+  python mirror/bench_ingest.py --keep --out bench.json  # 保留生成的文件并导出结果
+
+Formats:
+  official   ChatGPT conversations.json (mapping 节点 + metadata)
+  extension  插件导出 my_prompts.json [{"text", "ts", "src"}]
+  jsonl      {"messages": [{"role": "user", "content": ...}]} 每行一条
+  text       ===SPLIT=== 分隔的纯文本
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ingest import parse_upload  # noqa: E402
+
+FORMATS = {
+    "official": "conversations.json",
+    "extension": "my_prompts.json",
+    "jsonl": "prompts.jsonl",
+    "text": "prompts.txt",
+}
+
+LATIN_WORDS = (
+    "python code function error debug explain why how because however compare "
+    "analyze design strategy story email write summary translate step by step "
+    "act as role example list table react data model optimize test plan"
+).split()
+CJK_WORDS = [
+    "代码", "函数", "分析", "如果", "因为", "设计", "故事", "学习", "计划", "总结",
+    "翻译", "你是一个", "一步步", "优化", "数据", "模型", "焦虑", "快乐", "解释", "比较",
+]
+
+
+# --- Synthetic Export Generator ---
+def synth_prompt(rng, cjk_ratio):
+    n = rng.randint(6, 60)
+    return " ".join(rng.choice(CJK_WORDS) if rng.random() < cjk_ratio else rng.choice(LATIN_WORDS)
+                    for _ in range(n))
+
+
+def _official_conversation(rng, prompts, t0):
+    """One conversation: user / assistant node pairs with realistic metadata noise."""
+    mapping = {}
+    root = str(uuid.UUID(int=rng.getrandbits(128)))
+    mapping[root] = {"id": root, "message": None, "parent": None, "children": []}
+    parent = root
+    for i, text in enumerate(prompts):
+        for role, content in (("user", text), ("assistant", text[::-1] * 2)):
+            node_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            mapping[node_id] = {
+                "id": node_id,
+                "message": {
+                    "id": node_id,
+                    "author": {"role": role, "name": None, "metadata": {}},
+                    "create_time": t0 + i * 60.5,
+                    "update_time": None,
+                    "content": {"content_type": "text", "parts": [content]},
+                    "status": "finished_successfully",
+                    "end_turn": role == "assistant",
+                    "weight": 1.0,
+                    "metadata": {"model_slug": "gpt-4o", "citations": [], "request_id": node_id[:8]},
+                    "recipient": "all",
+                },
+                "parent": parent,
+                "children": [],
+            }
+            mapping[parent]["children"].append(node_id)
+            parent = node_id
+    return {"title": prompts[0][:20], "create_time": t0, "update_time": t0,
+            "mapping": mapping, "current_node": parent, "moderation_results": []}
+
+
+def generate_export(path, fmt, n_prompts, cjk_ratio=0.5, seed=0):
+    """Write a synthetic export with n_prompts user prompts. Streams to disk (1M prompts stays cheap)."""
+    rng = random.Random(seed)
+    t0 = datetime(2024, 1, 1).timestamp()
+    with open(path, "w", encoding="utf-8") as f:
+        if fmt == "official":
+            f.write("[")
+            written = 0
+            while written < n_prompts:
+                k = min(rng.randint(1, 12), n_prompts - written)
+                conv = _official_conversation(rng, [synth_prompt(rng, cjk_ratio) for _ in range(k)],
+                                              t0 + written * 300)
+                f.write(("," if written else "") + json.dumps(conv, ensure_ascii=False))
+                written += k
+            f.write("]")
+        elif fmt == "extension":
+            f.write("[")
+            for i in range(n_prompts):
+                rec = {"text": synth_prompt(rng, cjk_ratio), "ts": int((t0 + i * 300) * 1000),
+                       "src": rng.choice(["chatgpt", "claude", "gemini"])}
+                f.write(("," if i else "") + json.dumps(rec, ensure_ascii=False))
+            f.write("]")
+        elif fmt == "jsonl":
+            for _ in range(n_prompts):
+                rec = {"messages": [{"role": "user", "content": synth_prompt(rng, cjk_ratio)}]}
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        elif fmt == "text":
+            f.write("\n===SPLIT===\n".join(synth_prompt(rng, cjk_ratio) for _ in range(n_prompts)))
+        else:
+            raise ValueError(f"unknown format: {fmt}")
+
+
+# --- Legacy Baseline (整文件 json.loads 加载，即流式解析之前的兜底路径) ---
+def legacy_parse(f):
+    content = f.read().decode("utf-8", errors="ignore")
+    data = json.loads(content)
+    lines, timestamps = [], []
+    if isinstance(data, list) and len(data) > 0:
+        if "text" in data[0]:
+            for item in data:
+                lines.append(item.get("text", ""))
+                ts = item.get("ts", 0)
+                if ts > 0: timestamps.append(datetime.fromtimestamp(ts / 1000))
+        elif "mapping" in data[0]:
+            for conv in data:
+                for k, v in conv.get("mapping", {}).items():
+                    if v["message"] and v["message"]["author"]["role"] == "user":
+                        content = v["message"].get("content")
+                        parts = content.get("parts") if isinstance(content, dict) else None
+                        if parts and isinstance(parts[0], str):
+                            lines.append(parts[0])
+                            ct = v["message"].get("create_time")
+                            if ct: timestamps.append(datetime.fromtimestamp(float(ct)))
+    return lines, timestamps, []
+
+
+# --- Runner ---
+def _measure(fn, path):
+    """(seconds, prompts, peak_mb). Timing and peak memory come from separate runs,
+    since tracemalloc itself slows allocation-heavy code down."""
+    gc.collect()
+    with open(path, "rb") as f:
+        t = time.perf_counter()
+        n = len(fn(f)[0])
+        seconds = time.perf_counter() - t
+    gc.collect()
+    tracemalloc.start()
+    with open(path, "rb") as f:
+        fn(f)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, n, peak / 1e6
+
+
+def run(sizes, formats, cjk_ratio=0.5, legacy=True, workdir=None):
+    results = []
+    for fmt in formats:
+        name = FORMATS[fmt]
+        for n in sizes:
+            path = os.path.join(workdir, f"{n}_{name}")
+            if not os.path.exists(path):
+                generate_export(path, fmt, n, cjk_ratio)
+            size_mb = os.path.getsize(path) / 1e6
+
+            modes = [("streaming", lambda f: parse_upload(f, name, exclude_short=False, warn=lambda m: None))]
+            if legacy and name.endswith(".json"):
+                modes.append(("legacy", legacy_parse))
+            for mode, fn in modes:
+                seconds, parsed, peak_mb = _measure(fn, path)
+                row = {"format": fmt, "prompts": n, "file_mb": round(size_mb, 1), "mode": mode,
+                       "parsed": parsed, "seconds": round(seconds, 3),
+                       "prompts_per_sec": round(parsed / seconds) if seconds else None,
+                       "peak_mb": round(peak_mb, 1)}
+                results.append(row)
+                print(f"{fmt:<10} {n:>9,} {size_mb:>9.1f} {mode:<10} {seconds:>8.2f} "
+                      f"{row['prompts_per_sec'] or 0:>12,} {peak_mb:>9.1f}", flush=True)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark prompt_mirror upload ingestion")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="prompts per export")
+    ap.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    ap.add_argument("--cjk-ratio", type=float, default=0.5, help="share of CJK words in generated prompts")
+    ap.add_argument("--no-legacy", action="store_true", help="skip the full json.loads baseline")
+    ap.add_argument("--workdir", help="where to write generated exports (default: temp dir)")
+    ap.add_argument("--keep", action="store_true", help="keep generated exports")
+    ap.add_argument("--out", help="write results as JSON")
+    args = ap.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="spr-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    print(f"{'format':<10} {'prompts':>9} {'file MB':>9} {'mode':<10} {'seconds':>8} {'prompts/sec':>12} {'peak MB':>9}")
+    try:
+        results = run(args.sizes, args.formats, args.cjk_ratio, not args.no_legacy, workdir)
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+分区语料库 (Month-Partitioned Parquet Corpus Store)
+把解析 + 分析后的语料 (prompt, ts, src, len, complexity, token ids, category hits)
+按月份分区写成 Parquet 数据集 (hive 目录 prompts/month=YYYY-MM/)，词表单独一个文件。
+读回时时间范围只打开对应月份的分区、来源过滤下推到扫描层、只读需要的列，
+多年的历史不必整体加载；重建分析结果只做计数，不重新分词 / 打分。
+语料库是单个共享目录 (公开部署时所有会话可见)：只有显式设置 SPR_CORPUS_DIR 时页面才启用。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import (CATEGORY_DEFS, TOKEN_ID_DTYPE, TokenStore, Vocab, add_time_columns,
+                             ensure_category_hits, rebuild_result, to_local_times)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    CORPUS_AVAILABLE = True
+except ImportError:
+    pa = pc = ds = None
+    CORPUS_AVAILABLE = False
+
+# 未设置 SPR_CORPUS_DIR = 页面不显示语料库 (脚本仍可显式传 path)
+CORPUS_CONFIGURED = bool(os.environ.get("SPR_CORPUS_DIR"))
+CORPUS_DIR = os.path.expanduser(os.environ.get("SPR_CORPUS_DIR") or "~/.local/share/spr_mirror/corpus")
+
+# 存储格式变更时递增，旧版本的语料库不再读取
+CORPUS_VERSION = "1"
+
+META_FILE = "corpus.json"
+VOCAB_FILE = "vocab.parquet"
+DATA_DIR = "prompts"
+NO_TIME = "none"  # 没有时间戳的 prompt 所在分区
+CATEGORY_COLUMNS = [f"cat_{c}" for c in CATEGORY_DEFS]
+
+
+def corpus_enabled():
+    return CORPUS_AVAILABLE and CORPUS_CONFIGURED
+
+
+def month_key(value):
+    """'YYYY-MM' for anything pd.Timestamp accepts ('2024-03', datetime, ...)."""
+    return pd.Timestamp(value).strftime("%Y-%m")
+
+
+def _partitioning():
+    return ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+
+
+# --- Write ---
+def save(result, timestamps, sources, name="", path=None):
+    """
+    Write an analyzed corpus as a month-partitioned dataset, replacing the previous one
+    (written to a temp dir, then swapped in). timestamps: epoch seconds aligned with
+    the prompts (NaN = no time). Returns the corpus meta.
+    """
+    path = path or CORPUS_DIR
+    df = result.df
+    store = result.token_store
+    n = len(df)
+    ts = np.asarray(timestamps, dtype=np.float64)
+    if len(ts) != n:
+        ts = np.full(n, np.nan)
+    src = list(sources) + [None] * (n - len(sources)) if len(sources) <= n else list(sources)[:n]
+
+    # 分区键按本地时区的月份 (与页面上的时间轴一致)
+    if 'time' in df:
+        month = df['time'].dt.strftime("%Y-%m").fillna(NO_TIME).to_numpy(dtype=object)
+    else:
+        month = np.full(n, NO_TIME, dtype=object)
+    hits = ensure_category_hits(result)
+
+    columns = {
+        "row": pa.array(np.arange(n, dtype=np.int64)),  # 原始顺序，读回后按它排序
+        "prompt": pa.array(df['prompt'].tolist(), pa.string()),
+        "ts": pa.array(ts, from_pandas=True),
+        "src": pa.array(src, pa.string()),
+        "len": pa.array(df['len'].to_numpy()),
+        "complexity": pa.array(df['complexity'].to_numpy()),
+        # token ids 零拷贝包成 list 列：offsets 直接复用 token store
+        "tokens": pa.LargeListArray.from_arrays(pa.array(np.asarray(store.offsets, dtype=np.int64)),
+                                                pa.array(np.asarray(store.ids, dtype=TOKEN_ID_DTYPE))),
+    }
+    for j, col in enumerate(CATEGORY_COLUMNS):
+        columns[col] = pa.array(np.ascontiguousarray(hits[:, j]))
+    columns["month"] = pa.array(month, pa.string())
+    table = pa.table(columns)
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-corpus-", dir=parent)
+    try:
+        ds.write_dataset(table, os.path.join(tmp, DATA_DIR), format="parquet", partitioning=_partitioning(),
+                         basename_template="part-{i}.parquet")
+        pd.DataFrame({"token": pd.Series(store.vocab.tokens, dtype=object)}).to_parquet(
+            os.path.join(tmp, VOCAB_FILE), index=False)
+        months, counts = np.unique(month.astype(str), return_counts=True)
+        meta = {
+            "version": CORPUS_VERSION,
+            "name": name,
+            "created": time.time(),
+            "n_prompts": n,
+            "months": dict(zip(months.tolist(), counts.tolist())),
+            "sources": sorted({s for s in src if s is not None}),
+        }
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        old = None
+        if os.path.exists(path):
+            old = path + ".old-" + os.path.basename(tmp)
+            os.replace(path, old)
+        os.replace(tmp, path)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return meta
+
+
+# --- Read ---
+def load_meta(path=None):
+    """Corpus meta (months with prompt counts, sources, size), or None when there is none."""
+    path = path or CORPUS_DIR
+    try:
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == CORPUS_VERSION else None
+
+
+def _filter(start=None, end=None, sources=None):
+    expr = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if start is not None or end is not None:
+        # 有时间范围时 "none" 分区 (无时间戳) 不参与
+        expr = both(expr, ds.field("month") != NO_TIME)
+    if start is not None:
+        expr = both(expr, ds.field("month") >= month_key(start))
+    if end is not None:
+        expr = both(expr, ds.field("month") <= month_key(end))
+    if sources is not None:
+        expr = both(expr, ds.field("src").isin(list(sources)))
+    return expr
+
+
+def scan(path=None, start=None, end=None, sources=None, columns=None):
+    """
+    Arrow table of the prompts in months [start, end] (inclusive, month granularity)
+    and the given sources, in original order. Only the matching month partitions are
+    opened and only `columns` (default: all) are read.
+    """
+    path = path or CORPUS_DIR
+    dataset = ds.dataset(os.path.join(path, DATA_DIR), format="parquet", partitioning=_partitioning())
+    cols = None if columns is None else list(dict.fromkeys(["row", *columns]))
+    table = dataset.to_table(columns=cols, filter=_filter(start, end, sources))
+    return table.sort_by("row")
+
+
+def load_analysis(path=None, start=None, end=None, sources=None, tz=None, timer=None):
+    """
+    (lines, timestamps, sources, AnalysisResult) for a filtered slice of the corpus.
+    Token ids and category hits come from the store: no segmentation, no scoring.
+    """
+    path = path or CORPUS_DIR
+    columns = ["prompt", "ts", "src", "len", "complexity", "tokens", *CATEGORY_COLUMNS]
+    table = scan(path, start, end, sources, columns)
+
+    vocab = Vocab(pd.read_parquet(os.path.join(path, VOCAB_FILE))["token"].tolist())
+    tokens = table.column("tokens").combine_chunks()
+    lengths = pc.list_value_length(tokens).to_numpy(zero_copy_only=False).astype(np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    ids = pc.list_flatten(tokens).to_numpy(zero_copy_only=False).astype(TOKEN_ID_DTYPE, copy=False)
+    store = TokenStore(ids, offsets, vocab)
+
+    lines = table.column("prompt").to_pylist()
+    timestamps = table.column("ts").to_numpy(zero_copy_only=False).astype(np.float64)
+    src = table.column("src").to_pylist()
+    if all(s is None for s in src):
+        src = []  # 纯文本导出本来就没有来源
+
+    # 与 build_prompt_frame() 相同的列与顺序
+    df = pd.DataFrame({"prompt": lines})
+    df["prompt"] = df["prompt"].astype(str)
+    df["len"] = table.column("len").to_numpy()
+    has_time = add_time_columns(df, to_local_times(timestamps, tz))
+    df["complexity"] = table.column("complexity").to_numpy()
+    hits = np.column_stack([table.column(c).to_numpy() for c in CATEGORY_COLUMNS]) if len(df) else \
+        np.zeros((0, len(CATEGORY_COLUMNS)), dtype=np.int32)
+
+    result = rebuild_result(df, store, has_time, src, hits, timer)
+    return lines, timestamps, src, result
@@ -0,0 +1,207 @@
+"""
+近似重复检测 (Near-Duplicate Detection: Shingling + MinHash + LSH)
+导出里常有重试 / 小改的 prompt，会虚增计数、词云和复杂度分布。
+字符 shingle -> MinHash 签名 -> LSH 分桶找候选对 -> 签名相似度校验 -> 连通分量聚类，
+全程 NumPy 向量化，不做两两比较 (几十万条也是近线性)。
+"""
+
+import zlib
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.85   # 估计 Jaccard 相似度 >= 此值视为近似重复
+SHINGLE_SIZE = 5           # 字符 shingle 长度 (中英文统一按 Unicode 字符)
+NUM_PERM = 128             # MinHash 签名长度 (bin 数，需为 2 的幂)
+CHUNK_CHARS = 1 << 20      # 每批处理的字符数：码点 / 哈希等中间数组按批分配，峰值内存与语料总长无关
+
+
+def normalize(text):
+    """Lowercase and collapse whitespace, so re-indented / re-wrapped retries still match."""
+    return ' '.join(str(text).lower().split())
+
+
+def _mix(h):
+    # splitmix64 finalizer：打散多项式哈希的低熵位
+    h = h ^ (h >> np.uint64(33))
+    h = h * np.uint64(0xFF51AFD7ED558CCD)
+    h = h ^ (h >> np.uint64(33))
+    h = h * np.uint64(0xC4CEB9FE1A85EC53)
+    return h ^ (h >> np.uint64(33))
+
+
+def _chunk_bounds(lengths, budget=CHUNK_CHARS):
+    """[start, end) prompt ranges of about `budget` characters each (at least one prompt)."""
+    ends = np.cumsum(lengths + 1)
+    start, n = 0, len(lengths)
+    while start < n:
+        base = ends[start - 1] if start else 0
+        end = max(int(np.searchsorted(ends, base + budget, side='right')), start + 1)
+        yield start, end
+        start = end
+
+
+def _chunk_shingles(texts, lengths, k):
+    """shingle_hashes() for one chunk of prompts, owners local to the chunk."""
+    n = len(texts)
+    joined = '\0'.join(texts)
+    cp = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+
+    # 每个字符属于哪条 prompt，分隔符 NUL 记为 -1
+    owner = np.repeat(np.arange(n, dtype=np.int64), lengths + 1)[:len(cp)]
+    owner[np.cumsum(lengths + 1)[:-1] - 1] = -1
+
+    m = len(cp) - k + 1
+    if m > 0:
+        h = np.zeros(m, dtype=np.uint64)
+        base = np.uint64(1000003)
+        with np.errstate(over='ignore'):
+            for j in range(k):
+                h = h * base + cp[j:j + m]
+        valid = (owner[:m] >= 0) & (owner[:m] == owner[k - 1:])
+        hashes, owners = h[valid], owner[:m][valid]
+    else:
+        hashes, owners = np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+
+    short = np.flatnonzero(lengths < k)
+    if len(short):
+        extra = np.fromiter((zlib.crc32(texts[i].encode('utf-8')) for i in short), dtype=np.uint64, count=len(short))
+        hashes = np.concatenate([hashes, extra])
+        owners = np.concatenate([owners, short])
+        order = np.argsort(owners, kind='stable')
+        hashes, owners = hashes[order], owners[order]
+    with np.errstate(over='ignore'):
+        return _mix(hashes), owners
+
+
+def iter_shingle_hashes(texts, k=SHINGLE_SIZE, chunk_chars=CHUNK_CHARS):
+    """shingle_hashes() one chunk of prompts at a time: (hashes, global owner rows) per chunk."""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    for start, end in _chunk_bounds(lengths, chunk_chars):
+        hashes, owners = _chunk_shingles(texts[start:end], lengths[start:end], k)
+        yield hashes, owners + start
+
+
+def shingle_hashes(texts, k=SHINGLE_SIZE):
+    """
+    64-bit hashes of every k-character shingle: (hashes, owner row), in corpus order.
+    Rolling polynomial hash over the NUL-joined prompts, CHUNK_CHARS characters at a
+    time; windows that cross a prompt boundary are dropped. Prompts shorter than k
+    contribute one whole-text shingle.
+    """
+    parts = list(iter_shingle_hashes(texts, k))
+    if not parts:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+    return np.concatenate([h for h, _ in parts]), np.concatenate([o for _, o in parts])
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, k=SHINGLE_SIZE):
+    """
+    (n, num_perm) uint32 MinHash signatures via one-permutation hashing: each shingle
+    hash is hashed once, its top bits pick a bin and the low 32 bits are the value,
+    each bin keeps its minimum. Cost is O(shingles), independent of num_perm.
+    Empty bins (short prompts) are densified by rotation: they borrow the next
+    non-empty bin to the right, offset by the distance, so they still compare consistently.
+    """
+    if num_perm & (num_perm - 1):
+        raise ValueError("num_perm must be a power of two")
+    n = len(texts)
+    empty = np.iinfo(np.uint32).max
+    sig = np.full(n * num_perm, empty, dtype=np.uint32)
+    bits = num_perm.bit_length() - 1
+    # 逐批累加到签名矩阵，不保留整个语料的 shingle 哈希
+    for hashes, owners in iter_shingle_hashes(texts, k):
+        bins = (hashes >> np.uint64(64 - bits)).astype(np.int64) if bits else np.zeros(len(hashes), dtype=np.int64)
+        values = np.minimum(hashes & np.uint64(0xFFFFFFFF), np.uint64(empty - 1)).astype(np.uint32)
+        np.minimum.at(sig, owners * num_perm + bins, values)
+    sig = sig.reshape(n, num_perm)
+
+    # Rotation densification (环形向右找最近的非空 bin)，按行分块：中间数组每行 2 * num_perm 个 int64
+    rows = max(1, CHUNK_CHARS // (2 * num_perm))
+    for r0 in range(0, n, rows):
+        block = sig[r0:r0 + rows]
+        filled = block != empty
+        if filled.all():
+            continue
+        idx = np.where(np.concatenate([filled, filled], axis=1), np.arange(2 * num_perm), 2 * num_perm)
+        nxt = np.minimum.accumulate(idx[:, ::-1], axis=1)[:, ::-1][:, :num_perm]
+        nxt = np.minimum(nxt, 2 * num_perm - 1)
+        src = np.concatenate([block, block], axis=1)[np.arange(len(block))[:, None], nxt]
+        dist = (nxt - np.arange(num_perm)).astype(np.uint32)
+        with np.errstate(over='ignore'):
+            sig[r0:r0 + rows] = np.where(filled, block, src + dist * np.uint32(0x9E3779B1))
+    return sig
+
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    """
+    (bands, rows) with bands * rows == num_perm. Picks the most selective banding whose
+    S-curve midpoint (1/b)^(1/r) stays at or below the threshold, so true near-duplicates
+    rarely miss a shared bucket; false candidates are removed by signature verification.
+    """
+    best = (num_perm, 1)
+    for r in range(1, num_perm + 1):
+        if num_perm % r:
+            continue
+        b = num_perm // r
+        if (1 / b) ** (1 / r) <= threshold:
+            best = (b, r)
+    return best
+
+
+def _components(n, u, v):
+    """Connected component label (smallest member row) for each of n nodes."""
+    labels = np.arange(n, dtype=np.int64)
+    while True:
+        m = np.minimum(labels[u], labels[v])
+        new = labels.copy()
+        np.minimum.at(new, u, m)
+        np.minimum.at(new, v, m)
+        new = new[new]  # pointer jumping
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def near_duplicate_clusters(texts, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, k=SHINGLE_SIZE):
+    """
+    Cluster id per prompt: the row of the cluster's first (earliest) prompt, so a prompt
+    is a near-duplicate exactly when cluster[i] != i. Singletons are their own cluster.
+    """
+    n = len(texts)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    sig = minhash_signatures([normalize(t) for t in texts], num_perm, k)
+    bands, rows = lsh_params(threshold, num_perm)
+
+    u_parts, v_parts = [], []
+    prime = np.uint64(0x9E3779B97F4A7C15)
+    with np.errstate(over='ignore'):
+        for band in range(bands):
+            block = sig[:, band * rows:(band + 1) * rows].astype(np.uint64)
+            key = np.zeros(n, dtype=np.uint64)
+            for col in range(rows):
+                key = key * prime + block[:, col]
+            # 同桶成员只和桶内第一条 (行号最小) 配对：每个 band 最多 n 对候选
+            order = np.argsort(key, kind='stable')
+            ks = key[order]
+            is_start = np.ones(n, dtype=bool)
+            is_start[1:] = ks[1:] != ks[:-1]
+            head = order[np.maximum.accumulate(np.where(is_start, np.arange(n), 0))]
+            dup = ~is_start
+            u_parts.append(head[dup])
+            v_parts.append(order[dup])
+
+    u = np.concatenate(u_parts)
+    v = np.concatenate(v_parts)
+    if len(u):
+        pairs = np.unique(np.stack([u, v], axis=1), axis=0)
+        u, v = pairs[:, 0], pairs[:, 1]
+        # 候选对校验：签名一致位比例 = Jaccard 估计值
+        sim = (sig[u] == sig[v]).mean(axis=1)
+        u, v = u[sim >= threshold], v[sim >= threshold]
+    return _components(n, u, v)
+
+
+def collapse_mask(clusters):
+    """Keep-mask that retains the first prompt of each cluster."""
+    return clusters == np.arange(len(clusters))
@@ -0,0 +1,197 @@
+"""
+词云字体解析 (CJK Font Resolution)
+查找支持中日韩 + Latin 的字体路径，供 WordCloud 使用。
+每个进程只解析一次 (Streamlit 每次 rerun 直接命中内存)，找到的字体落盘到缓存目录，
+键为平台 + 各字体目录的 mtime：字体目录没变就不再逐个 stat 候选路径，也不再递归搜索。
+没找到字体不落盘 (新装的字体可能在子目录里，顶层目录 mtime 不变)，下次启动重新查找。
+SPR_FONT_PATH 可直接指定字体文件，跳过全部查找；SPR_CACHE_MAX_MB=0 时不写磁盘。
+"""
+
+import json
+import os
+import platform
+import tempfile
+from functools import lru_cache
+
+from analysis_cache import CACHE_DIR, CACHE_MAX_MB
+
+FONT_PATH = os.environ.get("SPR_FONT_PATH") or None
+FONT_CACHE_FILE = os.path.join(CACHE_DIR, "fonts.json")
+# 只存字体路径 (不含用户数据)，跟随缓存总开关
+FONT_CACHE_ENABLED = CACHE_MAX_MB > 0
+
+# 查找规则变更时递增，旧的磁盘结果随之失效
+FONT_CACHE_VERSION = "1"
+
+FONT_EXTS = ('.ttf', '.ttc', '.otf')
+
+# 0. 项目内嵌字体 (Project Embedded Font) - 解决容器环境缺失字体问题
+LOCAL_FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+LOCAL_FONTS = [
+    os.path.join(LOCAL_FONT_DIR, "ZCOOLXiaoWei-Regular.ttf"), # Auto-downloaded
+    os.path.join(LOCAL_FONT_DIR, "NotoSansSC-Regular.ttf"),
+    os.path.join(LOCAL_FONT_DIR, "wqy-microhei.ttc")
+]
+
+# 常见字体路径库 (Priority: Universal -> CJK -> Specific)
+SYSTEM_FONTS = {
+    "Darwin": [
+        # Universal / Broad Support (Best for mixed content)
+        "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+        "/Library/Fonts/Arial Unicode.ttf",
+
+        # Japanese (Hiragino is excellent on Mac)
+        "/System/Library/Fonts/Hiragino Sans.ttc",
+        "/System/Library/Fonts/Hiragino Sans GB.ttc",
+
+        # Chinese (PingFang)
+        "/System/Library/Fonts/PingFang.ttc",
+        "/System/Library/Fonts/STHeiti Medium.ttc",
+        "/System/Library/Fonts/STHeiti Light.ttc",
+
+        # Korean
+        "/System/Library/Fonts/AppleGothic.ttf",
+    ],
+    "Windows": [
+        # Universal
+        "C:\\Windows\\Fonts\\Arial Unicode.ttf",
+
+        # Chinese (Microsoft YaHei)
+        "C:\\Windows\\Fonts\\msyh.ttc",
+        "C:\\Windows\\Fonts\\simhei.ttf",
+
+        # Japanese (Meiryo, Yu Gothic)
+        "C:\\Windows\\Fonts\\meiryo.ttc",
+        "C:\\Windows\\Fonts\\yugothr.ttc",
+
+        # Korean (Malgun Gothic)
+        "C:\\Windows\\Fonts\\malgun.ttf",
+    ],
+    "Linux": [
+        # Noto Sans CJK (Standard for modern Linux)
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+
+        # Fallbacks
+        "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+        "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    ],
+}
+
+# 通用 Fallback (如果系统检测失败，或特定系统字体不存在，尝试所有可能路径)
+COMMON_FONTS = [
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    "C:\\Windows\\Fonts\\msyh.ttc"
+]
+
+# 暴力搜索 (Last Resort)：字体目录 + 文件名关键词
+SEARCH_DIRS = {
+    "Darwin": (["/System/Library/Fonts", "/Library/Fonts"],
+               ["Arial Unicode", "PingFang", "Hiragino", "STHeiti", "Heiti"]),
+    "Linux": (["/usr/share/fonts", "/usr/local/share/fonts", "~/.fonts"],
+              ["NotoSansCJK", "WenQuanYi", "DroidSansFallback"]),
+    "Windows": (["C:\\Windows\\Fonts"],
+                ["msyh", "simhei", "simkai", "meiryo", "malgun"]),
+}
+
+
+def search_font(system=None):
+    """Full lookup (no caches): embedded fonts, known system paths, then a recursive search."""
+    for f in LOCAL_FONTS:
+        if os.path.exists(f):
+            return f
+
+    # 合并列表，优先系统特定
+    system = system or platform.system()
+    search_list = SYSTEM_FONTS.get(system, []) + COMMON_FONTS
+
+    # 1. 精确匹配
+    for f in search_list:
+        if os.path.exists(f):
+            return f
+
+    # 2. 暴力搜索 (Recursive Search)：标准路径都没找到时在字体目录里按关键词找
+    search_dirs, target_names = SEARCH_DIRS.get(system, ([], []))
+    targets = [t.lower() for t in target_names]
+    for d in search_dirs:
+        d = os.path.expanduser(d)
+        if not os.path.exists(d): continue
+
+        for root, dirs, files in os.walk(d):
+            for file in files:
+                name = file.lower()
+                if name.endswith(FONT_EXTS) and any(t in name for t in targets):
+                    return os.path.join(root, file)
+
+    return None
+
+
+# --- Disk Cache ---
+def _cache_key(system):
+    # 字体目录增删文件会改变目录 mtime；目录不存在记 None
+    dirs = [LOCAL_FONT_DIR] + [os.path.expanduser(d) for d in SEARCH_DIRS.get(system, ([], []))[0]]
+    mtimes = []
+    for d in dirs:
+        try:
+            mtimes.append(os.stat(d).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return [FONT_CACHE_VERSION, system, platform.machine(), dirs, mtimes]
+
+
+def _read_cache(key):
+    if not FONT_CACHE_ENABLED:
+        return None
+    try:
+        with open(FONT_CACHE_FILE, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get("key") != key:
+        return None
+    path = entry.get("path")
+    # 记下的字体被删了也算失效
+    if not isinstance(path, str) or not os.path.exists(path):
+        return None
+    return path
+
+
+def _write_cache(key, path):
+    # 写失败只影响下次启动的速度，不影响页面
+    if not FONT_CACHE_ENABLED:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-fonts-", dir=CACHE_DIR)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "path": path}, f, ensure_ascii=False)
+        os.replace(tmp, FONT_CACHE_FILE)
+    except OSError:
+        pass
+
+
+@lru_cache(maxsize=None)
+def get_supporting_font():
+    """
+    获取支持多语言（中日韩 CJK + Latin）的字体路径。
+    解决 WordCloud 默认字体不支持非 ASCII 字符导致的乱码问题。
+    Resolved once per process: SPR_FONT_PATH, then the disk cache, then search_font().
+    Only a found font is persisted; "none found" is searched again in the next process.
+    """
+    if FONT_PATH:
+        if os.path.exists(FONT_PATH):
+            return FONT_PATH
+        print(f"⚠️  SPR_FONT_PATH not found, searching system fonts: {FONT_PATH}")
+
+    system = platform.system()
+    key = _cache_key(system)
+    path = _read_cache(key)
+    if path:
+        return path
+    path = search_font(system)
+    if path:
+        _write_cache(key, path)
+    return path
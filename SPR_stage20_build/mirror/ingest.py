@@ -0,0 +1,217 @@
+"""
+上传文件解析 (Upload Ingestion)
+把 prompt_mirror.py 里的 JSON / JSONL / TXT 解析逻辑抽离出来，
+页面、缓存层和离线脚本共用同一套规则。
+"""
+
+import json
+import re
+from collections import Counter
+
+import numpy as np
+
+from analysis_engine import JUNK_MATCHER
+from dedup import DEFAULT_THRESHOLD, collapse_mask, near_duplicate_clusters
+
+# 解析规则变更时递增，旧的磁盘缓存随之失效
+INGEST_VERSION = "4"
+
+# ijson 每次从文件读取的字节数：解析开销与导出文件大小无关
+STREAM_BUF_SIZE = 64 * 1024
+
+
+class StreamParseError(ValueError):
+    """The upload is not well-formed JSON (records before the error are kept)."""
+
+
+# text / ts / src 的值是对象或数组时记为无效 (不是合法字段值)，记录结束时当作缺失
+_NESTED = object()
+
+
+# --- Streaming JSON Extractor (prefix-level events) ---
+def iter_json_records(f):
+    """
+    Walk a JSON export as ijson prefix events and yield only what the mirror needs,
+    without materialising conversations or their `mapping` dicts:
+      ('chatgpt', text, create_time)  user node of an official conversations.json
+      ('extension', item)             {"text", "ts", "src"} record of my_prompts.json
+    Memory stays bounded by the largest single string, whatever the export size.
+    """
+    import ijson
+
+    node = None        # 当前 mapping 节点的 prefix: item.mapping.<node_id>
+    fields = {}        # 当前节点内关心的完整 prefix -> 字段名，每个事件只做一次 dict 查找
+    role = text = create_time = None
+    first_part = False
+    item = None        # 当前插件导出记录 (只收集 text / ts / src)
+
+    try:
+        for prefix, event, value in ijson.parse(f, buf_size=STREAM_BUF_SIZE, use_float=True):
+            # Case A: Official ChatGPT Export -- inside item.mapping.<node_id>
+            if node is not None:
+                field = fields.get(prefix)
+                if field is None:
+                    continue
+                if field == 'node':
+                    if event in ('end_map', 'null'):  # 节点结束 (或节点本身为 null)
+                        if role == 'user' and isinstance(text, str):
+                            yield 'chatgpt', text, create_time
+                        node = None
+                elif field == 'role':
+                    role = value
+                elif field == 'create_time':
+                    create_time = value
+                elif field == 'parts':
+                    if event == 'start_array':
+                        first_part = True
+                elif first_part and event not in ('end_map', 'end_array'):
+                    # 只取 parts[0]，且必须是字符串 (图片等多模态 part 是 dict)
+                    text = value if event == 'string' else None
+                    first_part = False
+                continue
+
+            if prefix == 'item.mapping' and event == 'map_key':
+                node = 'item.mapping.' + value
+                msg = node + '.message'
+                fields = {
+                    node: 'node',
+                    msg + '.author.role': 'role',
+                    msg + '.create_time': 'create_time',
+                    msg + '.content.parts': 'parts',
+                    msg + '.content.parts.item': 'part',
+                }
+                role = text = create_time = None
+                first_part = False
+            elif prefix == 'item':
+                if event == 'start_map':
+                    item = {}
+                elif event == 'map_key':
+                    if value == 'mapping':
+                        item['mapping'] = True
+                elif event == 'end_map':
+                    # Case B: Our Extension Export (my_prompts.json)
+                    if item and 'mapping' not in item:
+                        item = {k: v for k, v in item.items() if v is not _NESTED}
+                        if 'text' in item:
+                            yield 'extension', item
+                    item = None
+            elif item is not None and prefix in ('item.text', 'item.ts', 'item.src'):
+                # 只接受标量；嵌套对象的 map_key 等事件的 prefix 也是 item.<field>，不能当作值
+                if event in ('string', 'number', 'boolean', 'null'):
+                    item[prefix[5:]] = value
+                elif event in ('start_map', 'start_array'):
+                    item[prefix[5:]] = _NESTED
+    except ijson.JSONError as e:
+        raise StreamParseError(str(e)) from e
+
+
+def parse_upload(up, name, exclude_short=True, strict_filter=False, warn=print):
+    """
+    Parse an uploaded export (binary file-like object) into (lines, timestamps, sources).
+    timestamps is a float64 array of epoch seconds aligned 1:1 with lines (NaN = no time);
+    sources may be shorter than lines when the format has none. A .json that yields
+    no prompts always reports why through `warn`.
+    """
+    new_lines = []
+    new_timestamps = []  # epoch 秒，缺失记 NaN，始终与 new_lines 等长
+    new_sources = []
+
+    if name.endswith('.json'):
+        up.seek(0)
+        n_records = 0
+        try:
+            for record in iter_json_records(up):
+                n_records += 1
+                if record[0] == 'chatgpt':
+                    _, text, ct = record
+                    if exclude_short and len(text) < 8: continue
+                    new_lines.append(text)
+                    new_timestamps.append(float(ct) if ct else np.nan)
+                    new_sources.append('chatgpt_export')
+                else:
+                    item = record[1]
+                    text = item.get('text', '')
+                    if not isinstance(text, str): continue
+                    # Junk Filter
+                    if exclude_short and len(text) < 5: continue
+                    if re.match(r'^[\s\d\W]+$', text): continue
+
+                    # Strict Filter
+                    if strict_filter:
+                        if len(text) < 10: continue
+                        if JUNK_MATCHER.contains_any(text.lower()): continue
+
+                    if text.lower().strip() in ["hi", "hello", "test", "testing", "你好", "测试"]: continue
+
+                    new_lines.append(text)
+                    ts = item.get('ts', 0)
+                    new_timestamps.append(ts / 1000 if isinstance(ts, (int, float)) and ts > 0 else np.nan)
+                    new_sources.append(item.get('src', 'unknown'))
+        except StreamParseError as e:
+            # 不再整文件 json.loads 兜底：保留出错前已解析的记录
+            warn(f"JSON parsing stopped early, kept {len(new_lines)} prompts ({e})")
+            return new_lines, np.asarray(new_timestamps, dtype=np.float64), new_sources
+        if not new_lines:
+            # 一条都没解析出来时明确提示，否则页面直接回到引导页，用户不知道发生了什么
+            if n_records:
+                warn(f"No prompts left in this JSON after filtering ({n_records} records skipped)")
+            else:
+                warn("No prompts found in this JSON (expected conversations.json or a my_prompts.json export)")
+        return new_lines, np.asarray(new_timestamps, dtype=np.float64), new_sources
+
+    up.seek(0)
+    content = up.read().decode('utf-8', errors='ignore')
+    if name.endswith('.jsonl'):
+        for line in content.splitlines():
+            if line.strip():
+                try:
+                    msg = json.loads(line)
+                    if 'messages' in msg: new_lines.append(msg['messages'][0]['content'])
+                except: pass
+    else:
+        new_lines = [l.strip() for l in content.split('===SPLIT===') if l.strip()]
+        if len(new_lines) < 2:
+            new_lines = [l.strip() for l in content.splitlines() if l.strip()]
+
+    return new_lines, np.full(len(new_lines), np.nan), new_sources
+
+
+# --- Append / Merge Mode ---
+def _record_keys(lines, timestamps, sources):
+    # sources 与 lines 不对齐时无法逐条对应，只用文本比较；缺失时间 (NaN) 记为 None，才能互相匹配
+    ts = np.asarray(timestamps, dtype=np.float64)
+    ts = [None if t != t else t for t in ts.tolist()] if len(ts) == len(lines) else [None] * len(lines)
+    src_ok = len(sources) == len(lines)
+    return [(text, ts[i], sources[i] if src_ok else None)
+            for i, text in enumerate(lines)]
+
+
+def select_new_records(old_lines, old_timestamps, old_sources, lines, timestamps, sources):
+    """
+    Positions of records in a new upload that are not in the existing data, matched on
+    (text, ts, src) as a multiset: a record already present n times is skipped n times,
+    so genuine repeats inside one export survive a re-import.
+    """
+    seen = Counter(_record_keys(old_lines, old_timestamps, old_sources))
+    fresh = []
+    for i, key in enumerate(_record_keys(lines, timestamps, sources)):
+        if seen[key] > 0:
+            seen[key] -= 1
+        else:
+            fresh.append(i)
+    return fresh
+
+
+# --- Near-Duplicate Collapse ---
+def collapse_near_duplicates(lines, timestamps, sources, threshold=DEFAULT_THRESHOLD):
+    """
+    Drop retried / lightly edited prompts, keeping the first prompt of each MinHash
+    cluster. Returns (lines, timestamps, sources, n_dropped).
+    """
+    keep = np.flatnonzero(collapse_mask(near_duplicate_clusters(lines, threshold)))
+    # sources 与 lines 不对齐时无法逐条对应，保持原样
+    src_ok = len(sources) == len(lines)
+    return ([lines[i] for i in keep.tolist()],
+            np.asarray(timestamps, dtype=np.float64)[keep],
+            [sources[i] for i in keep.tolist()] if src_ok else sources,
+            len(lines) - len(keep))
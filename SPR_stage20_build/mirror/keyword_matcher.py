@@ -0,0 +1,147 @@
+"""
+多模式关键词匹配器 (Aho–Corasick Multi-Pattern Matcher)
+每个关键词集合在 import 时编译一次，对每段文本只做一次线性扫描即可报告全部命中，
+中英文混排 (CJK + Latin) 均按 Unicode 字符处理。
+"""
+
+from collections import deque
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+import numpy as np
+
+try:
+    import ahocorasick  # pyahocorasick (C extension)
+except ImportError:
+    ahocorasick = None
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class KeywordMatcher:
+    """
+    Compiled automaton over a fixed keyword list.
+    Hits are reported as (start, end, pattern_id) with end exclusive, including
+    overlapping ones ('if' inside 'difference'). With whole_word=True a Latin
+    keyword edge must not touch another Latin letter/digit; CJK edges are free,
+    since Chinese text has no word separators.
+    """
+
+    def __init__(self, patterns: Iterable[str], whole_word: bool = False):
+        self.patterns: List[str] = list(dict.fromkeys(p for p in patterns if p))
+        self.index: Dict[str, int] = {p: i for i, p in enumerate(self.patterns)}
+        self.whole_word = whole_word
+        if any('\0' in p for p in self.patterns):
+            raise ValueError("Keywords must not contain NUL (reserved as corpus separator)")
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pid, p in enumerate(self.patterns):
+                self._automaton.add_word(p, pid)
+            if self.patterns:
+                self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            self._build_fallback()
+
+    # --- Pure-Python automaton (used when pyahocorasick is not installed) ---
+    def _build_fallback(self):
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, p in enumerate(self.patterns):
+            node = 0
+            for ch in p:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append(pid)
+
+        # BFS for failure links; outputs inherit from their failure node
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())  # depth-1 nodes fail to the root
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def _raw_hits(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(end_inclusive, pattern_id) for every occurrence."""
+        if not self.patterns:
+            return
+        if self._automaton is not None:
+            yield from self._automaton.iter(text)
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pid in out[node]:
+                yield i, pid
+
+    def _on_boundary(self, text: str, start: int, end: int) -> bool:
+        if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def iter_hits(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        patterns = self.patterns
+        for end, pid in self._raw_hits(text):
+            start = end + 1 - len(patterns[pid])
+            if self.whole_word and not self._on_boundary(text, start, end + 1):
+                continue
+            yield start, end + 1, pid
+
+    def contains_any(self, text: str) -> bool:
+        for _ in self.iter_hits(text):
+            return True
+        return False
+
+    def present(self, text: str) -> Set[int]:
+        """Ids of the keywords that occur at least once."""
+        return {pid for _, _, pid in self.iter_hits(text)}
+
+    def count(self, text: str) -> List[int]:
+        """Occurrences per keyword id."""
+        counts = [0] * len(self.patterns)
+        for _, _, pid in self.iter_hits(text):
+            counts[pid] += 1
+        return counts
+
+    def presence_matrix(self, texts: List[str]) -> np.ndarray:
+        """
+        Boolean (len(texts), len(patterns)) matrix of which keywords each text
+        contains, from a single pass over the whole corpus. Texts are joined with
+        NUL separators, which no keyword contains, so a hit never straddles two rows.
+        """
+        matrix = np.zeros((len(texts), len(self.patterns)), dtype=bool)
+        if not texts or not self.patterns:
+            return matrix
+        joined = "\0".join(texts)
+        starts = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) + 1 for t in texts], out=starts[1:])
+
+        if self.whole_word:
+            hits = chain.from_iterable((end - 1, pid) for _, end, pid in self.iter_hits(joined))
+        else:
+            raw = self._automaton.iter(joined) if self._automaton is not None else self._raw_hits(joined)
+            hits = chain.from_iterable(raw)
+        flat = np.fromiter(hits, dtype=np.int64).reshape(-1, 2)  # (end_inclusive, pid)
+        rows = np.searchsorted(starts, flat[:, 0], side='right') - 1
+        matrix[rows, flat[:, 1]] = True
+        return matrix
@@ -0,0 +1,110 @@
+"""
+流水线分阶段计时 (Stage-Level Profiling)
+记录每个阶段的耗时、处理条数和内存变化，供页面 Debug 面板展示，
+设置 SPR_PROFILE=1 时同时以结构化日志 (每阶段一行 JSON) 输出到 stderr。
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_LOG = os.environ.get("SPR_PROFILE", "0") == "1"
+
+logger = logging.getLogger("spr.profile")
+if PROFILE_LOG and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where the current value is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1e6
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # macOS: bytes, Linux: KB
+    return None
+
+
+class StageTimer:
+    """
+    Collects one record per pipeline stage:
+    {"run", "stage", "seconds", "items", "mem_mb", "mem_delta_mb", "cached"}.
+    Use stage() around a block, or checkpoint() to close the span since the previous mark.
+    """
+
+    def __init__(self, run=None):
+        self.run = run or uuid.uuid4().hex[:8]
+        self.records = []
+        self._mark_t = time.perf_counter()
+        self._mark_mem = rss_mb()
+
+    def _add(self, record):
+        self.records.append(record)
+        self._mark_t = time.perf_counter()
+        self._mark_mem = record["mem_mb"]
+        if PROFILE_LOG:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+    def _record(self, name, seconds, items, mem_before, cached=False):
+        mem_after = rss_mb()
+        delta = None if mem_before is None or mem_after is None else round(mem_after - mem_before, 1)
+        return {
+            "run": self.run,
+            "stage": name,
+            "seconds": round(seconds, 4),
+            "items": items,
+            "mem_mb": None if mem_after is None else round(mem_after, 1),
+            "mem_delta_mb": delta,
+            "cached": cached,
+        }
+
+    @contextmanager
+    def stage(self, name, items=None):
+        """Time a block. The yielded dict accepts a late item count: `rec['items'] = n`."""
+        holder = {"items": items}
+        mem_before = rss_mb()
+        t0 = time.perf_counter()
+        try:
+            yield holder
+        finally:
+            self._add(self._record(name, time.perf_counter() - t0, holder["items"], mem_before))
+
+    def checkpoint(self, name, items=None):
+        """Record the span since the previous stage / checkpoint (for long page sections)."""
+        self._add(self._record(name, time.perf_counter() - self._mark_t, items, self._mark_mem))
+
+    def extend(self, records, cached=False):
+        """Attach records produced elsewhere (e.g. by analyze(), already logged there)."""
+        for rec in records:
+            self.records.append(dict(rec, cached=cached or rec.get("cached", False)))
+        # 外部记录已覆盖这段时间，下一个 checkpoint 从这里开始计
+        self._mark_t = time.perf_counter()
+        self._mark_mem = rss_mb()
+
+    def total_seconds(self, include_cached=False):
+        return sum(r["seconds"] for r in self.records if include_cached or not r["cached"])
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.records, columns=["stage", "seconds", "items", "mem_delta_mb", "mem_mb", "cached"])
@@ -1,14 +1,14 @@
 import streamlit as st
 import pandas as pd
-import jieba
+import numpy as np
 import re
+import io
 import json
-import numpy as np
-import nltk
-import random
-from wordcloud import WordCloud
-from collections import Counter
-from datetime import datetime, timedelta
+import hashlib
+import heapq
+import zlib
+from operator import itemgetter
+from wordcloud import WordCloud, STOPWORDS as WC_STOPWORDS
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit.components.v1 as components
@@ -27,6 +27,18 @@ except Exception as e:
     # 如果 keep-alive 失败，不影响应用运行
     print(f"⚠️  Keep-Alive 初始化失败: {e}")
 
+from analysis_engine import (analyze, append_prompts, remove_prompts, top_phrases, filter_frequencies,
+                             category_evolution, align_sources, concat_sources, CATEGORY_DEFS, EVOLUTION_FREQS)
+from ingest import parse_upload, select_new_records, collapse_near_duplicates
+from dedup import DEFAULT_THRESHOLD, near_duplicate_clusters
+import analysis_cache
+import corpus_store
+from search_index import SearchIndex, BM25Index, BM25_AVAILABLE
+from profiling import StageTimer
+
+# 每次脚本运行一个计时器：各阶段耗时 / 条数 / 内存变化 (Debug 面板 + SPR_PROFILE=1 日志)
+PROFILER = StageTimer()
+
 # --- Session State Management (Persistence) ---
 if 'lang' not in st.session_state:
     # Check query params for initial language
@@ -40,6 +52,10 @@ st.session_state.theme = 'dark'
 if 'cached_data' not in st.session_state:
     st.session_state.cached_data = None
 
+# 本会话写入 / 命中过的分析缓存条目：「打开最近的分析」只列出这些
+if 'cache_keys' not in st.session_state:
+    st.session_state.cache_keys = []
+
 # --- Translations Dictionary ---
 TRANSLATIONS = {
     'page_title': {
@@ -62,6 +78,98 @@ TRANSLATIONS = {
         'en': "Import Data",
         'zh': "导入数据"
     },
+    'recent_label': {
+        'en': "🕘 Reopen a recent analysis",
+        'zh': "🕘 打开最近的分析"
+    },
+    'corpus_header': {
+        'en': "📦 Saved corpus ({} prompts)",
+        'zh': "📦 已保存的语料库 ({} 条)"
+    },
+    'corpus_months': {
+        'en': "Months",
+        'zh': "月份范围"
+    },
+    'corpus_sources': {
+        'en': "Sources",
+        'zh': "来源"
+    },
+    'corpus_open': {
+        'en': "Open selection",
+        'zh': "打开所选范围"
+    },
+    'corpus_save': {
+        'en': "📦 Save as corpus",
+        'zh': "📦 保存为语料库"
+    },
+    'corpus_saved': {
+        'en': "Saved {} prompts in {} monthly partitions",
+        'zh': "已保存 {} 条 prompt，共 {} 个月份分区"
+    },
+    'corpus_overwrite': {
+        'en': "This replaces the saved corpus \"{}\" ({} prompts).",
+        'zh': "将覆盖已保存的语料库「{}」({} 条)。"
+    },
+    'corpus_overwrite_yes': {
+        'en': "Replace",
+        'zh': "覆盖"
+    },
+    'corpus_overwrite_no': {
+        'en': "Cancel",
+        'zh': "取消"
+    },
+    'append_mode': {
+        'en': "➕ Merge new uploads into current data",
+        'zh': "➕ 新上传与现有数据合并 (增量)"
+    },
+    'append_result': {
+        'en': "Merged {} new prompts ({} already present)",
+        'zh': "已合并 {} 条新 prompt ({} 条已存在)"
+    },
+    'dedup_mode': {
+        'en': "🧬 Near-duplicate prompts",
+        'zh': "🧬 近似重复 Prompt"
+    },
+    'dedup_off': {
+        'en': "Keep",
+        'zh': "保留"
+    },
+    'dedup_flag': {
+        'en': "Flag",
+        'zh': "标记"
+    },
+    'dedup_collapse': {
+        'en': "Collapse",
+        'zh': "折叠"
+    },
+    'dedup_threshold': {
+        'en': "Similarity threshold",
+        'zh': "相似度阈值"
+    },
+    'dedup_result': {
+        'en': "Collapsed {} near-duplicate prompts",
+        'zh': "已折叠 {} 条近似重复 prompt"
+    },
+    'dedup_found': {
+        'en': "{} near-duplicates in {} clusters",
+        'zh': "发现 {} 条近似重复，共 {} 个簇"
+    },
+    'dedup_select': {
+        'en': "Select all near-duplicates (keeps the earliest of each cluster)",
+        'zh': "选中全部近似重复 (每簇保留最早一条)"
+    },
+    'col_dup_cluster': {
+        'en': "Dup Cluster",
+        'zh': "重复簇"
+    },
+    'debug_profile': {
+        'en': "🛠️ Show stage timings (debug)",
+        'zh': "🛠️ 显示各阶段耗时 (调试)"
+    },
+    'profile_header': {
+        'en': "🛠️ Pipeline Profile",
+        'zh': "🛠️ 流水线耗时"
+    },
     'settings_header': {
         'en': "⚙️ Preferences",
         'zh': "⚙️ 偏好设置"
@@ -186,6 +294,10 @@ TRANSLATIONS = {
         'en': "Complexity Score",
         'zh': "复杂度评分"
     },
+    'phrase_len': {
+        'en': "Phrase length",
+        'zh': "短语长度"
+    },
     'phrases_header': {
         'en': "🔗 Top Phrases",
         'zh': "🔗 你最爱用的短语 (Top Phrases)"
@@ -230,6 +342,18 @@ TRANSLATIONS = {
         'en': "Search keywords...",
         'zh': "搜索关键词..."
     },
+    'search_ranked': {
+        'en': "Rank by relevance (BM25)",
+        'zh': "按相关度排序 (BM25)"
+    },
+    'search_page': {
+        'en': "Page",
+        'zh': "页码"
+    },
+    'search_hits': {
+        'en': "{} matches · page {} / {}",
+        'zh': "共 {} 条匹配 · 第 {} / {} 页"
+    },
     'min_score_label': {
         'en': "Min Complexity",
         'zh': "最低复杂度"
@@ -262,6 +386,22 @@ TRANSLATIONS = {
         'en': "Thinking Volume & Complexity Trend",
         'zh': "思维量与复杂度演变趋势"
     },
+    'evolution_period': {
+        'en': "Granularity",
+        'zh': "时间粒度"
+    },
+    'period_D': {
+        'en': "Daily",
+        'zh': "按天"
+    },
+    'period_W': {
+        'en': "Weekly",
+        'zh': "按周"
+    },
+    'period_M': {
+        'en': "Monthly",
+        'zh': "按月"
+    },
     'golden_header': {
         'en': "🏆 Golden Prompts Hall of Fame",
         'zh': "🏆 金牌提示词长廊"
@@ -277,101 +417,6 @@ def t(key):
     val = TRANSLATIONS.get(key, {}).get(st.session_state.lang, key)
     return str(val) if val is not None else ""
 
-# --- NLTK Setup (Fail-safe) ---
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    try:
-        nltk.download('punkt', quiet=True)
-    except: pass
-
-try:
-    nltk.data.find('corpora/stopwords')
-    from nltk.corpus import stopwords
-    english_stops = set(stopwords.words('english'))
-except (LookupError, ImportError):
-    english_stops = set()
-
-# Enhanced Stopwords (De-noising)
-english_stops.update({
-    "the", "a", "an", "in", "on", "at", "for", "to", "of", "is", "are", "was", "were", 
-    "be", "been", "being", "have", "has", "had", "do", "does", "did", "it", "that", 
-    "this", "these", "those", "i", "you", "he", "she", "we", "they", "my", "your", 
-    "his", "her", "our", "their", "what", "which", "who", "whom", "whose", "where", 
-    "when", "why", "how", "can", "could", "will", "would", "shall", "should", "may", 
-    "might", "must", "and", "but", "or", "so", "not", "no", "yes", "please", "help", 
-    "me", "thanks", "thank", "write", "create", "make", "use", "using", "code",
-    "want", "need", "like", "just", "get", "go", "know", "think", "see", "say",
-    "tell", "ask", "try", "look", "take", "give", "find", "use", "way", "new",
-    "good", "great", "well", "much", "many", "lot", "little", "big", "small",
-    # Prompt Engineering Boilerplate (Noise for WordCloud)
-    "act", "role", "assume", "step", "context", "instruction", "output", "format",
-    "generate", "rewrite", "revise", "optimize", "check", "verify", "explain",
-    "translation", "translate", "english", "chinese", "text", "sentence", "paragraph",
-    "based", "following", "provided", "below", "above", "result", "answer", "question",
-    "style", "tone", "ensure", "make", "sure", "include", "example", "list", "none",
-    "response", "assistant", "user", "input", "task", "description", "detail", "analysis"
-})
-
-# 中文停用词 (De-noising)
-chinese_stops = {
-    "的", "了", "是", "我", "你", "他", "在", "和", "有", "就", "不", "人", "都", "一", "一个", "上", "也", "很", "到", "说", "要", "去", "能", "会", "着", "没有", "看", "怎么", "什么", "这", "那", "这个", "那个", "请", "帮我", "给我", "可以", "吗",
-    "个", "只", "次", "把", "被", "让", "给", "但", "因为", "所以", "如果", "虽然", "但是", "或者", "还是", "以及", "除了", "为了", "关于", "对于", "通过", "根据", "按照", "作为", "随着",
-    # Prompt Engineering Boilerplate (Chinese)
-    "扮演", "角色", "生成", "输出", "格式", "要求", "上下文", "步骤", "解释", "翻译",
-    "英文", "中文", "代码", "文章", "内容", "以下", "以上", "提供", "基于", "使用",
-    "不仅", "而且", "能够", "需要", "帮忙", "修改", "润色", "优化", "检查", "写一个",
-    "帮我写", "帮我看", "怎么写", "怎么做", "分析", "设计", "实现", "回复", "助手", "用户"
-}
-
-# Objectivity Filter Stopwords (Technial Noise + Conversational Filler + Pronouns)
-OBJECTIVITY_STOPWORDS = {
-    # 1. Technical / Boilerplate Noise
-    "json", "api", "html", "return", "self", "const", "string", "true", "false", "null", "undefined",
-    "class", "function", "var", "let", "import", "export", "from", "main", "void", "args", "kwargs",
-    "http", "https", "url", "uri", "request", "response", "header", "body", "params", "query",
-    "file", "path", "dir", "folder", "open", "close", "read", "write", "print", "log", "console",
-    "error", "exception", "try", "catch", "finally", "throw", "raise", "async", "await", "promise",
-    "list", "dict", "set", "tuple", "array", "object", "number", "boolean", "int", "float", "str",
-    "prompt", "data", "model", "code", "generate", "using", "use", "make", "create", "based", "text",
-    "input", "output", "context", "description", "detail", "analysis", "example", "following", "question",
-    "answer", "result", "content", "system", "message", "role", "user", "assistant", "ai", "bot", "gpt",
-    "openai", "chatgpt", "spec", "backend", "frontend", "server", "client", "app", "application", "project",
-    "key", "value", "name", "type", "id", "uuid", "token", "auth", "password", "email", "username",
-    "github", "git", "commit", "branch", "repo", "repository", "clone", "push", "pull", "merge",
-    "python", "javascript", "java", "c", "cpp", "go", "rust", "ruby", "php", "swift", "kotlin", "scala",
-    "humanizer", "agent", "core", "important", "background", "mode", "status", "year", "month", "day",
-    
-    # 2. Common Verbs / Adverbs / Filler
-    "know", "see", "want", "just", "now", "time", "first", "one", "two", "three", "new", "good", "great",
-    "well", "much", "many", "lot", "little", "big", "small", "way", "thing", "go", "get", "come", "take",
-    "give", "find", "say", "tell", "ask", "try", "look", "need", "like", "love", "hate", "think", "feel",
-    "believe", "hope", "wish", "maybe", "perhaps", "probably", "possibly", "sure", "certain", "really",
-    "very", "quite", "too", "so", "such", "more", "most", "less", "least", "better", "best", "worse",
-    "worst", "please", "thanks", "thank", "hello", "hi", "hey", "bye", "goodbye", "yes", "no", "ok", "okay",
-    "sure", "right", "correct", "wrong", "false", "true", "check", "verify", "test", "debug", "fix", "solve",
-    
-    # 3. Pronouns / Self-Referential
-    "i", "me", "my", "mine", "we", "us", "our", "ours", "you", "your", "yours", "he", "him", "his",
-    "she", "her", "hers", "it", "its", "they", "them", "their", "theirs", "self", "myself", "yourself",
-    "himself", "herself", "itself", "ourselves", "yourselves", "themselves",
-    
-    # 4. Chinese Noise (Technical + Conversational)
-    "自己", "我们", "他们", "你们", "它们", "咱们", "大家", "我", "你", "他", "她", "它",
-    "现在", "刚刚", "刚才", "以前", "以后", "之后", "之前", "时候", "时间", "问题", "东西", "事情", "情况",
-    "觉得", "认为", "感觉", "以为", "知道", "明白", "了解", "理解", "希望", "想要", "需要", "喜欢", "讨厌",
-    "真的", "非常", "很多", "许多", "一些", "有些", "这种", "那种", "这样", "那样", "这么", "那么",
-    "因为", "所以", "但是", "如果", "虽然", "或者", "还是", "以及", "除了", "为了", "关于", "对于",
-    "通过", "根据", "按照", "作为", "随着", "并且", "而且", "其实", "事实上", "实际上", "反而",
-    "也就是", "也就是说", "换句话说", "总之", "综上所述", "顺便", "另外", "此外", "还有",
-    "比如", "例如", "像是", "就像", "同样", "一般", "通常", "经常", "总是", "一直", "甚至", "尤其", "特别",
-    "可能", "已经", "可以", "能够", "应该", "必须", "不得不", "一定", "确定", "肯定",
-    "生成", "输出", "格式", "要求", "上下文", "步骤", "解释", "翻译", "代码", "文章", "内容",
-    "扮演", "角色", "助手", "回复", "建议", "意见", "想法", "看法", "观点", "结果", "原因", "理由", "目的", "目标",
-    "任务", "工作", "学习", "生活", "日", "月", "年", "个", "只", "次", "把", "被", "让", "给", "但",
-    "就", "见", "是", "的", "了", "在", "和", "有", "不", "人", "都", "一", "上", "也", "很", "到", "说", "要", "去"
-}
-
 # 页面配置
 st.set_page_config(page_title="SPR Mind Cockpit", layout="wide", page_icon="🧠")
 
@@ -528,123 +573,39 @@ if st.query_params.get("page") == "privacy":
     st.stop() # Stop execution of the main app
 
 # --- 字体处理 (Mac/Linux/Windows 国际化通用版 - WordCloud用) ---
+# 每个进程只解析一次并落盘缓存 (fonts.py)，rerun 不再访问文件系统
 import platform
-import os
-
-def get_supporting_font():
-    """
-    获取支持多语言（中日韩 CJK + Latin）的字体路径。
-    解决 WordCloud 默认字体不支持非 ASCII 字符导致的乱码问题。
-    """
-    # 0. 优先使用项目内嵌字体 (Project Embedded Font) - 解决容器环境缺失字体问题
-    local_font_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
-    local_fonts = [
-        os.path.join(local_font_dir, "ZCOOLXiaoWei-Regular.ttf"), # Auto-downloaded
-        os.path.join(local_font_dir, "NotoSansSC-Regular.ttf"),
-        os.path.join(local_font_dir, "wqy-microhei.ttc")
-    ]
-    
-    for f in local_fonts:
-        if os.path.exists(f):
-            return f
-
-    # 优先根据系统推荐
-    system = platform.system()
-    
-    # 定义常见字体路径库 (Priority: Universal -> CJK -> Specific)
-    font_candidates = []
-    
-    if system == "Darwin": # Mac
-        font_candidates = [
-            # Universal / Broad Support (Best for mixed content)
-            "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
-            "/Library/Fonts/Arial Unicode.ttf",
-            
-            # Japanese (Hiragino is excellent on Mac)
-            "/System/Library/Fonts/Hiragino Sans.ttc",
-            "/System/Library/Fonts/Hiragino Sans GB.ttc",
-            
-            # Chinese (PingFang)
-            "/System/Library/Fonts/PingFang.ttc",
-            "/System/Library/Fonts/STHeiti Medium.ttc",
-            "/System/Library/Fonts/STHeiti Light.ttc",
-            
-            # Korean
-            "/System/Library/Fonts/AppleGothic.ttf",
-        ]
-    elif system == "Windows":
-        font_candidates = [
-            # Universal
-            "C:\\Windows\\Fonts\\Arial Unicode.ttf",
-            
-            # Chinese (Microsoft YaHei)
-            "C:\\Windows\\Fonts\\msyh.ttc",
-            "C:\\Windows\\Fonts\\simhei.ttf",
-            
-            # Japanese (Meiryo, Yu Gothic)
-            "C:\\Windows\\Fonts\\meiryo.ttc",
-            "C:\\Windows\\Fonts\\yugothr.ttc",
-            
-            # Korean (Malgun Gothic)
-            "C:\\Windows\\Fonts\\malgun.ttf",
-        ]
-    elif system == "Linux":
-        font_candidates = [
-            # Noto Sans CJK (Standard for modern Linux)
-            "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-            "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
-            
-            # Fallbacks
-            "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
-            "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
-        ]
-        
-    # 通用 Fallback (如果系统检测失败，或特定系统字体不存在，尝试所有可能路径)
-    common_fonts = [
-        "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
-        "/System/Library/Fonts/STHeiti Medium.ttc",
-        "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
-        "C:\\Windows\\Fonts\\msyh.ttc"
-    ]
-    
-    # 合并列表，优先系统特定
-    search_list = font_candidates + common_fonts
-    
-    # 1. 精确匹配
-    for f in search_list:
-        if os.path.exists(f):
-            return f
-
-    # 2. 暴力搜索 (Last Resort - Recursive Search)
-    # 如果系统标准路径都没找到，尝试在字体目录搜索关键词
-    if system == "Darwin":
-        search_dirs = ["/System/Library/Fonts", "/Library/Fonts"]
-        target_names = ["Arial Unicode", "PingFang", "Hiragino", "STHeiti", "Heiti"]
-    elif system == "Linux":
-        search_dirs = ["/usr/share/fonts", "/usr/local/share/fonts", "~/.fonts"]
-        target_names = ["NotoSansCJK", "WenQuanYi", "DroidSansFallback"]
-    elif system == "Windows":
-        search_dirs = ["C:\\Windows\\Fonts"]
-        target_names = ["msyh", "simhei", "simkai", "meiryo", "malgun"]
-    else:
-        search_dirs = []
-        target_names = []
-        
-    for d in search_dirs:
-        d = os.path.expanduser(d)
-        if not os.path.exists(d): continue
-        
-        for root, dirs, files in os.walk(d):
-            for file in files:
-                for target in target_names:
-                    if target.lower() in file.lower() and (file.endswith('.ttf') or file.endswith('.ttc') or file.endswith('.otf')):
-                        return os.path.join(root, file)
-            
-    return None 
+from fonts import get_supporting_font, FONT_PATH
 
 font_path = get_supporting_font()
 
+# --- 词云渲染缓存 (WordCloud PNG Cache) ---
+WORDCLOUD_SIZE = (800, 500)
+WORDCLOUD_MAX_WORDS = 80
+CLOUD_COLORS = ("hsl(46, 65%, 60%)", "hsl(245, 40%, 70%)")  # Champagne Gold / Lavender
+
+def luxury_color_func(word, font_size, position, orientation, random_state=None, **kwargs):
+    # 颜色只取决于词本身 (crc32)，同一个词每次渲染颜色一致
+    return CLOUD_COLORS[zlib.crc32(word.encode("utf-8")) & 1]
+
+def wordcloud_key(freqs, mode, font, size):
+    """Hash of everything the rendered cloud depends on. Only the top max_words entries
+    are laid out, so the rest of the frequency table does not enter the key."""
+    top = heapq.nlargest(WORDCLOUD_MAX_WORDS, freqs.items(), key=itemgetter(1))
+    payload = json.dumps([top, mode, font, list(size)], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_wordcloud_png(key, _freqs, font, width, height):
+    """Layout + rasterize once per key; `_freqs` is not hashed (key already covers it)."""
+    wc = WordCloud(font_path=font, width=width, height=height,
+                   background_color="rgba(0,0,0,0)", mode="RGBA", # Transparent
+                   max_words=WORDCLOUD_MAX_WORDS, collocations=False, random_state=0,
+                   color_func=luxury_color_func).generate_from_frequencies(_freqs)
+    buf = io.BytesIO()
+    wc.to_image().save(buf, format="PNG")
+    return buf.getvalue()
+
 # --- Luxury CSS Injection ---
 luxury_css = """
 <style>
@@ -812,11 +773,67 @@ with st.sidebar:
         st.success("File Loaded Successfully!", icon="✅")
     else:
         st.info(t('upload_info'), icon="ℹ️")
+        # 切换文件后无需重新上传：从本地分析缓存打开本会话处理过的文件 (不列出其他会话的)
+        recent = analysis_cache.list_entries(st.session_state.cache_keys) if st.session_state.cache_keys else []
+        if recent:
+            labels = {f"{meta['name']} · {meta['n_prompts']} prompts · {key[:8]}": key for key, meta in recent}
+            picked = labels.get(st.selectbox(t('recent_label'), ["—"] + list(labels)))
+            if picked and st.session_state.get('recent_pick') != picked:
+                st.session_state.recent_pick = picked
+                cached = analysis_cache.load(picked)
+                if cached:
+                    r_lines, r_timestamps, r_sources, r_analysis = cached
+                    st.session_state.cached_data = {
+                        'lines': r_lines,
+                        'timestamps': r_timestamps,
+                        'sources': r_sources,
+                        'analysis': r_analysis,
+                        'cache_key': picked,
+                        'name': dict(recent)[picked]['name'],
+                    }
+
+        # 分区语料库：按月份 / 来源只读取需要的分区，不重新分词
+        corpus_meta = corpus_store.load_meta() if corpus_store.corpus_enabled() else None
+        if corpus_meta:
+            with st.expander(t('corpus_header').format(corpus_meta['n_prompts'])):
+                months = sorted(m for m in corpus_meta['months'] if m != corpus_store.NO_TIME)
+                month_range = (None, None)
+                if len(months) > 1:
+                    month_range = st.select_slider(t('corpus_months'), months, value=(months[0], months[-1]))
+                    if month_range == (months[0], months[-1]):
+                        month_range = (None, None)  # 全部月份 = 不过滤 (包括没有时间戳的 prompt)
+                picked_sources = None
+                if len(corpus_meta['sources']) > 1:
+                    picked_sources = st.multiselect(t('corpus_sources'), corpus_meta['sources'])
+                if st.button(t('corpus_open')):
+                    with PROFILER.stage("corpus load") as rec:
+                        c_lines, c_timestamps, c_sources, c_analysis = corpus_store.load_analysis(
+                            start=month_range[0], end=month_range[1], sources=picked_sources or None)
+                        rec['items'] = len(c_lines)
+                    if c_lines:
+                        st.session_state.cached_data = {
+                            'lines': c_lines,
+                            'timestamps': c_timestamps,
+                            'sources': c_sources,
+                            'analysis': c_analysis,
+                            'cache_key': None,
+                            'name': corpus_meta['name'],
+                            # 只打开了一部分：不允许再「保存为语料库」覆盖完整历史
+                            'corpus_slice': month_range != (None, None) or bool(picked_sources),
+                        }
     
     st.divider()
     st.header(t('settings_header'))
     exclude_short = st.checkbox(t('filter_short'), value=True)
     strict_filter = st.checkbox(t('filter_strict'), value=False)
+    append_mode = st.checkbox(t('append_mode'), value=False,
+                              help="Re-export from the extension and upload again: only prompts not seen before (same text, time and source) are analyzed.")
+    dedup_mode = st.radio(t('dedup_mode'), ["off", "flag", "collapse"], horizontal=True,
+                          format_func=lambda m: t('dedup_' + m))
+    dedup_threshold = DEFAULT_THRESHOLD
+    if dedup_mode != "off":
+        dedup_threshold = st.slider(t('dedup_threshold'), 0.5, 1.0, DEFAULT_THRESHOLD, 0.05)
+    show_profile = st.checkbox(t('debug_profile'), value=st.query_params.get('debug') == '1')
     
     st.markdown("---")
     with st.expander(t('privacy_title')):
@@ -910,127 +927,79 @@ lines = []
 timestamps = []
 sources = []
 
+cache_key = None
+fresh_analysis = False  # 本次运行是否 (增量) 计算过分析结果
+
 if up:
-    with st.spinner("🧠 Decoding your mind palace... (Parsing JSON)"):
-        try:
-            new_lines = []
-            new_timestamps = []
-            new_sources = []
-            
-            if up.name.endswith('.json'):
-                import ijson
-                try:
-                    # Use ijson for streaming parsing to handle large files (e.g. 300MB+)
-                    # Check structure by reading first item or prefix
-                    # Heuristic: ChatGPT exports usually start with a list of conversations
-                    
-                    # We need to detect if it's a list of conversations (official export) 
-                    # or a simple list of prompts (our extension export)
-                    
-                    # Let's try to stream items. 
-                    # If it's a list, ijson.items(f, 'item') yields elements.
-                    
-                    # Rewind file pointer just in case
-                    up.seek(0)
-                    
-                    # Check first character to see if it's a list or dict
-                    first_char = up.read(1).decode('utf-8', errors='ignore').strip()
-                    up.seek(0)
-                    
-                    is_official_export = False
-                    # Official export is a list of conversation objects
-                    # Our extension export is a list of simple objects {"text": "...", "ts": ...}
-                    
-                    # We'll iterate and check the structure of the first item
-                    parser = ijson.items(up, 'item')
-                    
-                    for item in parser:
-                        # Case A: Official ChatGPT Export (conversations.json)
-                        if 'mapping' in item:
-                            is_official_export = True
-                            for k, v in item['mapping'].items():
-                                if v['message'] and v['message']['author']['role'] == 'user':
-                                    content = v['message'].get('content')
-                                    parts = content.get('parts') if isinstance(content, dict) else None
-                                    if parts and isinstance(parts[0], str):
-                                        text = parts[0]
-                                        if exclude_short and len(text) < 8: continue
-                                        new_lines.append(text)
-                                        ct = v['message'].get('create_time')
-                                        if ct: new_timestamps.append(datetime.fromtimestamp(float(ct)))
-                                        new_sources.append('chatgpt_export')
-                        
-                        # Case B: Our Extension Export (my_prompts.json)
-                        elif 'text' in item:
-                            text = item.get('text', '')
-                            # Junk Filter
-                            if exclude_short and len(text) < 5: continue
-                            if re.match(r'^[\s\d\W]+$', text): continue
-                            
-                            # Strict Filter
-                            if strict_filter:
-                                if len(text) < 10: continue
-                                if any(w in text.lower() for w in ["test", "hello", "hi", "你好", "测试", "demo"]): continue
-                            
-                            if text.lower().strip() in ["hi", "hello", "test", "testing", "你好", "测试"]: continue
-                            
-                            new_lines.append(text)
-                            ts = item.get('ts', 0)
-                            if ts > 0: new_timestamps.append(datetime.fromtimestamp(ts / 1000))
-                            new_sources.append(item.get('src', 'unknown'))
-                    
-                except Exception as e:
-                    # Fallback to standard json load if ijson fails or for small files structure mismatch
-                    st.warning(f"Stream parsing failed, trying legacy load... ({str(e)})")
-                    up.seek(0)
-                    content = up.read().decode('utf-8', errors='ignore')
-                    data = json.loads(content)
-                    # ... (Original Logic for fallback) ...
-                    if isinstance(data, list) and len(data) > 0:
-                        if 'text' in data[0]: 
-                            for item in data:
-                                text = item.get('text', '')
-                                if exclude_short and len(text) < 8: continue
-                                new_lines.append(text)
-                                ts = item.get('ts', 0)
-                                if ts > 0: new_timestamps.append(datetime.fromtimestamp(ts / 1000))
-                        elif 'mapping' in data[0]:
-                             for conv in data:
-                                if 'mapping' in conv:
-                                    for k, v in conv['mapping'].items():
-                                        if v['message'] and v['message']['author']['role'] == 'user':
-                                            content = v['message'].get('content')
-                                            parts = content.get('parts') if isinstance(content, dict) else None
-                                            if parts and isinstance(parts[0], str): 
-                                                text = parts[0]
-                                                if exclude_short and len(text) < 8: continue
-                                                new_lines.append(text)
-                                                ct = v['message'].get('create_time')
-                                                if ct: new_timestamps.append(datetime.fromtimestamp(float(ct)))
-
-            if not new_lines: 
-                 content = up.getvalue().decode('utf-8', errors='ignore') # Read only if not json or json failed
-                 if up.name.endswith('.jsonl'):
-                    for line in content.splitlines():
-                        if line.strip():
-                            try:
-                                msg = json.loads(line)
-                                if 'messages' in msg: new_lines.append(msg['messages'][0]['content'])
-                            except: pass
-                 else:
-                    new_lines = [l.strip() for l in content.split('===SPLIT===') if l.strip()]
-                    if len(new_lines) < 2:
-                         new_lines = [l.strip() for l in content.splitlines() if l.strip()]
-
-            if new_lines:
-                st.session_state.cached_data = {
-                    'lines': new_lines,
-                    'timestamps': new_timestamps,
-                    'sources': new_sources
-                }
-                
-        except Exception as e:
-            st.error(t('upload_error').format(e))
+    # 同一个上传文件 + 同样的过滤选项只处理一次 (每次交互都会重跑整个脚本)
+    collapse_threshold = dedup_threshold if dedup_mode == "collapse" else None
+    upload_sig = (getattr(up, 'file_id', up.name), up.size, exclude_short, strict_filter, collapse_threshold)
+    if st.session_state.get('upload_sig') != upload_sig:
+        with st.spinner("🧠 Decoding your mind palace... (Parsing JSON)"):
+            try:
+                cached = None
+                if analysis_cache.cache_enabled():
+                    with PROFILER.stage("cache lookup", items=up.size) as rec:
+                        cache_key = analysis_cache.content_key(up, up.name, exclude_short=exclude_short, strict_filter=strict_filter,
+                                                              dedup=collapse_threshold)
+                        cached = analysis_cache.load(cache_key)
+                        rec['items'] = len(cached[0]) if cached else 0
+                    if cache_key not in st.session_state.cache_keys:
+                        st.session_state.cache_keys.append(cache_key)
+
+                if cached:
+                    # 命中磁盘缓存：跳过解析与分词
+                    new_lines, new_timestamps, new_sources, cached_analysis = cached
+                else:
+                    with PROFILER.stage("parse upload") as rec:
+                        new_lines, new_timestamps, new_sources = parse_upload(
+                            up, up.name, exclude_short=exclude_short, strict_filter=strict_filter, warn=st.warning)
+                        rec['items'] = len(new_lines)
+                    if collapse_threshold is not None and new_lines:
+                        # 近似重复折叠：每个 MinHash 簇只保留最早的一条
+                        with PROFILER.stage("near-duplicate collapse", items=len(new_lines)):
+                            new_lines, new_timestamps, new_sources, n_dropped = collapse_near_duplicates(
+                                new_lines, new_timestamps, new_sources, collapse_threshold)
+                        st.toast(t('dedup_result').format(n_dropped), icon="🧬")
+                    cached_analysis = None
+
+                base = st.session_state.cached_data
+                if append_mode and base and new_lines:
+                    # 增量合并：按 (text, ts, src) 去重，只分析新增的记录
+                    # sources 补齐到与 lines 等长：只有一边带来源 (JSON + txt/jsonl) 时也能逐条对应
+                    fresh = select_new_records(base['lines'], base['timestamps'],
+                                               align_sources(base['sources'], len(base['lines'])),
+                                               new_lines, new_timestamps, align_sources(new_sources, len(new_lines)))
+                    add_lines = [new_lines[i] for i in fresh]
+                    add_timestamps = new_timestamps[fresh]
+                    add_sources = [new_sources[i] for i in fresh] if len(new_sources) == len(new_lines) else []
+                    if add_lines:
+                        merged_analysis = None
+                        if base.get('analysis') is not None:
+                            merged_analysis = append_prompts(base['analysis'], add_lines, add_timestamps, add_sources)
+                            fresh_analysis = True
+                        st.session_state.cached_data = {
+                            'lines': base['lines'] + add_lines,
+                            'timestamps': np.concatenate([base['timestamps'], add_timestamps]),
+                            'sources': concat_sources(base['sources'], len(base['lines']), add_sources, len(add_lines)),
+                            'analysis': merged_analysis,
+                            'cache_key': None,  # 合并后的数据不对应任何单个上传文件
+                            'name': up.name,
+                        }
+                    st.toast(t('append_result').format(len(add_lines), len(new_lines) - len(add_lines)), icon="➕")
+                elif new_lines:
+                    st.session_state.cached_data = {
+                        'lines': new_lines,
+                        'timestamps': new_timestamps,
+                        'sources': new_sources,
+                        'analysis': cached_analysis,
+                        'cache_key': cache_key,
+                        'name': up.name,
+                    }
+                st.session_state.upload_sig = upload_sig
+
+            except Exception as e:
+                st.error(t('upload_error').format(e))
 
 if st.session_state.cached_data:
     lines = st.session_state.cached_data['lines']
@@ -1041,78 +1010,54 @@ if not lines:
     show_onboarding_guide() # 👈 调用空状态指引
     st.stop()
 
-# --- 数据预处理 ---
-df = pd.DataFrame({"prompt": lines})
-df["prompt"] = df["prompt"].astype(str) # Ensure string type
-df["len"] = df["prompt"].str.len()
-
-if timestamps and len(timestamps) == len(lines):
-    df["time"] = timestamps
-    df["hour"] = df["time"].dt.hour
-    df["date"] = df["time"].dt.date
-    df["weekday"] = df["time"].dt.weekday  # 0=Monday
-    df["week_name"] = df["time"].dt.day_name()
-    has_time = True
+PROFILER.checkpoint("page setup")
+
+# --- 数据预处理 + 全量分析 (Headless Engine) ---
+@st.cache_data(show_spinner="🧠 Analyzing your prompts...")
+def run_analysis(lines, timestamps, sources):
+    return analyze(lines, timestamps, sources)
+
+analysis = st.session_state.cached_data.get('analysis')
+if analysis is None:
+    analysis = run_analysis(lines, timestamps, sources)
+    PROFILER.extend(analysis.timings)
+    st.session_state.cached_data['analysis'] = analysis
+    if st.session_state.cached_data.get('cache_key'):
+        with PROFILER.stage("cache store", items=len(lines)):
+            analysis_cache.store(st.session_state.cached_data['cache_key'], st.session_state.cached_data.get('name', ''),
+                                 lines, timestamps, sources, analysis)
 else:
-    has_time = False
-
-# --- 核心算法：复杂度评分 (Complexity Score 2.0) ---
-def calculate_complexity(text):
-    score = 0
-    text_lower = text.lower()
-    
-    # 1. Base Score (Length)
-    score += min(len(text) / 200, 1.0) * 30  # Reduced base weight
-    
-    # 2. Logical Depth
-    logical_words = [
-        'if', 'because', 'however', 'therefore', 'although', 'compare', 'difference',
-        '如果', '因为', '但是', '所以', '虽然', '比较', '区别', '原理', '分析', 'why', 'how',
-        'strategy', 'plan', 'method', 'approach', 'framework', 'model', 'theory'
-    ]
-    logic_hits = sum(1 for w in logical_words if w in text_lower)
-    score += min(logic_hits / 5, 1.0) * 25
-    
-    # 3. Structural Bonus (Markdown)
-    structure_score = 0
-    if '```' in text: structure_score += 15  # Code block
-    if '\n-' in text or '\n*' in text: structure_score += 10  # List
-    if '\n1.' in text: structure_score += 10 # Ordered list
-    if '> ' in text: structure_score += 5    # Quote
-    score += min(structure_score, 30)
-    
-    # 4. Cognitive Patterns (Role & CoT)
-    cognitive_score = 0
-    # Role Prompting
-    if any(p in text_lower for p in ['act as', 'role', '扮演', '你是一个', 'you are a']):
-        cognitive_score += 10
-    # Chain of Thought
-    if any(p in text_lower for p in ['step by step', 'chain of thought', 'reasoning', '一步步', '思维链']):
-        cognitive_score += 15
-    score += min(cognitive_score, 15)
-
-    return min(int(score), 100)
-
-df['complexity'] = df['prompt'].apply(calculate_complexity)
-
-# --- 核心算法：双语分词 (Bilingual NLP + De-noising) ---
-@st.cache_data
-def process_tokens(text_list):
-    all_text = " ".join(text_list)
-    
-    # 1. 中文分词 (jieba) + 去停用词
-    zh_pattern = re.compile(r'[\u4e00-\u9fa5]+')
-    zh_words = [w for w in jieba.lcut(all_text) if len(w) > 1 and zh_pattern.match(w) and w not in chinese_stops]
-    
-    # 2. 英文分词 (简单正则 + NLTK Stopwords)
-    en_pattern = re.compile(r'[a-zA-Z]{2,}')
-    en_words = en_pattern.findall(all_text.lower())
-    en_words = [w for w in en_words if w not in english_stops and len(w) > 2] # Filter super short English words
-    
-    return zh_words + en_words
-
-words = process_tokens(lines)
-word_counts = Counter(words)
+    # 复用本会话 / 磁盘缓存的结果：展示首次计算时的耗时，标记为 cached
+    PROFILER.extend(analysis.timings, cached=not fresh_analysis)
+df = analysis.df
+has_time = analysis.has_time
+word_counts = analysis.word_counts
+
+# --- 保存为分区语料库 (整体替换上一次保存的语料库，已有语料库时先确认) ---
+if corpus_store.corpus_enabled() and not st.session_state.cached_data.get('corpus_slice'):
+    def save_corpus():
+        with PROFILER.stage("corpus save", items=len(lines)):
+            saved = corpus_store.save(analysis, timestamps, sources, st.session_state.cached_data.get('name', ''))
+        st.toast(t('corpus_saved').format(saved['n_prompts'], len(set(saved['months']) - {corpus_store.NO_TIME})), icon="📦")
+
+    if st.sidebar.button(t('corpus_save')):
+        st.session_state.corpus_confirm = corpus_store.load_meta() is not None
+        if not st.session_state.corpus_confirm:
+            save_corpus()
+    if st.session_state.get('corpus_confirm'):
+        existing = corpus_store.load_meta()
+        confirm_box = st.sidebar.empty()
+        with confirm_box.container():
+            if existing:
+                st.warning(t('corpus_overwrite').format(existing['name'], existing['n_prompts']), icon="⚠️")
+            col_yes, col_no = st.columns(2)
+            overwrite = col_yes.button(t('corpus_overwrite_yes'), type="primary")
+            cancel = col_no.button(t('corpus_overwrite_no'))
+        if overwrite or cancel:
+            st.session_state.corpus_confirm = False
+            confirm_box.empty()
+            if overwrite:
+                save_corpus()
 
 # --- Luxury Chart Helper ---
 def luxury_chart(fig, title=None, show_median=False, df_col=None):
@@ -1199,270 +1144,188 @@ c4.metric(t('metric_top_word'), top_word)
 
 st.divider()
 
-# --- Tab 布局 ---
-tab_insight, tab_evolution, tab_soul, tab_habit, tab_data, tab_manage = st.tabs([t('tab_insight'), t('tab_evolution'), "🔮 SoulPrint", t('tab_habit'), t('tab_data'), t('tab_manage')])
+# --- Tab 布局 (Lazy Tabs) ---
+# on_change="rerun" 让 tab 带状态：只有当前选中的 tab (.open) 会执行计算和绘图，
+# 在搜索框里打字不会重建 SoulPrint / Evolution 的图表
+tab_insight, tab_evolution, tab_soul, tab_habit, tab_data, tab_manage = st.tabs(
+    [t('tab_insight'), t('tab_evolution'), "🔮 SoulPrint", t('tab_habit'), t('tab_data'), t('tab_manage')],
+    key="main_tab", on_change="rerun")
+
+def tab_memo(name, build):
+    """Derived data for a tab: built on first view, reused until the analysis object changes."""
+    memo = st.session_state.get('tab_memo')
+    if memo is None or memo['analysis'] is not analysis:
+        memo = st.session_state.tab_memo = {'analysis': analysis, 'data': {}}
+    if name not in memo['data']:
+        memo['data'][name] = build()
+    return memo['data'][name]
+
+SEARCH_PAGE_SIZE = 50  # BM25 结果每页条数
+
+def time_strings():
+    """Display timestamps for every row, formatted once (vectorized) per analysis."""
+    return tab_memo('time_str', lambda: df['time'].dt.strftime('%Y-%m-%d %H:%M').fillna(''))
 
 # === Tab 1: 思维洞察 ===
-with tab_insight:
-    col_radar, col_cloud = st.columns([1, 1.5])
+if tab_insight.open:
+    with tab_insight:
+        col_radar, col_cloud = st.columns([1, 1.5])
     
-    with col_radar:
-        st.subheader(t('radar_header'))
+        with col_radar:
+            st.subheader(t('radar_header'))
         
-        category_defs = {
-            "coding": {
-                "keywords": [
-                    "代码", "code", "函数", "报错", "bug", "python", "js", "react", "sql", "api", "写一个", "实现", "function", "class", "error", "接口",
-                    "java", "c++", "golang", "rust", "node", "css", "html", "docker", "k8s", "aws", "git", "github", "merge", "branch", "commit",
-                    "database", "db", "mongo", "redis", "query", "request", "response", "json", "xml", "yaml", "config", "deploy", "build", "run",
-                    "script", "algorithm", "loop", "variable", "import", "package", "install", "pip", "npm", "yarn", "compile", "debug", "stack",
-                    "overflow", "exception", "try", "catch", "async", "await", "promise", "thread", "process", "linux", "shell", "bash", "terminal",
-                    "fix", "issue", "crash", "stacktrace", "ci/cd", "pipeline", "jenkins", "azure", "gcp", "server", "client", "frontend", "backend",
-                    "fullstack", "devops", "sre", "unit test", "integration test", "e2e", "selenium", "cypress", "playwright", "jest", "mocha",
-                    "typescript", "ts", "vue", "angular", "svelte", "nextjs", "nuxtjs", "flask", "django", "fastapi", "spring", "hibernate",
-                    "refactor", "optimize", "performance", "memory", "cpu", "leak", "profiling", "benchmark", "logging", "monitoring", "alerting",
-                    "rest", "graphql", "grpc", "websocket", "socket", "tcp", "udp", "http", "https", "ssl", "tls", "certificate", "key", "token",
-                    "auth", "jwt", "oauth", "sso", "ldap", "encryption", "hashing", "salt", "uuid", "guid", "regex", "regular expression"
-                ],
-                "label_en": "Coding",
-                "label_zh": "💻 编程开发"
-            },
-            "writing": {
-                "keywords": [
-                    "文案", "文章", "周报", "总结", "扩写", "润色", "大纲", "标题", "翻译", "邮件", "write", "email", "article", "summary", "translate", "outline", "title",
-                    "essay", "blog", "post", "copy", "copywriting", "intro", "introduction", "conclusion", "paragraph", "sentence", "grammar", "spelling",
-                    "tone", "style", "formal", "casual", "academic", "professional", "rewrite", "revise", "edit", "proofread", "check", "draft",
-                    "report", "memo", "letter", "proposal", "statement", "bio", "description", "caption", "slogan", "tagline", "keyword", "seo",
-                    "story", "narrative", "plot", "character", "dialogue", "script", "screenplay", "poem", "lyrics", "rhyme", "verse"
-                ],
-                "label_en": "Writing",
-                "label_zh": "📝 内容创作"
-            },
-            "logic": {
-                "keywords": [
-                    "分析", "原因", "区别", "比较", "评价", "优缺点", "建议", "方案", "思维导图", "analyze", "reason", "compare", "difference", "pros", "cons", "plan",
-                    "strategy", "tactic", "method", "approach", "framework", "model", "theory", "hypothesis", "assumption", "premise", "conclusion",
-                    "argument", "debate", "critique", "review", "evaluate", "assess", "audit", "investigate", "research", "study", "survey", "data",
-                    "evidence", "proof", "logic", "logical", "fallacy", "bias", "cognitive", "psychology", "philosophy", "ethics", "moral", "value",
-                    "principle", "rule", "law", "regulation", "policy", "guideline", "standard", "criteria", "metric", "kpi", "okr", "goal", "objective"
-                ],
-                "label_en": "Logic",
-                "label_zh": "🧠 逻辑分析"
-            },
-            "learning": {
-                "keywords": [
-                    "解释", "介绍", "是什么", "含义", "原理", "教程", "学习", "如何", "explain", "what", "how", "meaning", "tutorial", "principle", "learn",
-                    "teach", "guide", "lesson", "course", "class", "lecture", "study", "exam", "test", "quiz", "question", "answer", "solution",
-                    "definition", "define", "concept", "term", "vocabulary", "grammar", "history", "geography", "science", "math", "physics", "chemistry",
-                    "biology", "art", "music", "literature", "culture", "language", "skill", "technique", "tip", "trick", "hack", "advice", "suggestion",
-                    "recommendation", "resource", "book", "paper", "article", "video", "podcast", "website", "tool", "software", "app",
-                    "roadmap", "path", "curriculum", "syllabus", "beginner", "intermediate", "advanced", "expert", "master", "pro", "101", "basics",
-                    "fundamentals", "overview", "introduction", "background", "context", "history", "origin", "evolution", "development", "trend",
-                    "future", "prediction", "forecast", "insight", "knowledge", "wisdom", "experience", "expertise", "mastery", "proficiency",
-                    "competence", "capability", "ability", "talent", "gift", "aptitude", "potential", "growth", "development", "progress"
-                ],
-                "label_en": "Learning",
-                "label_zh": "🎓 知识学习"
-            },
-            "creative": {
-                "keywords": [
-                    "创意", "点子", "故事", "设想", "如果", "生成", "设计", "idea", "story", "design", "imagine", "generate", "create",
-                    "brainstorm", "concept", "inspiration", "vision", "dream", "fantasy", "fiction", "novel", "game", "play", "fun", "joke", "humor",
-                    "comedy", "satire", "parody", "meme", "logo", "icon", "image", "picture", "photo", "video", "audio", "music", "song", "sound",
-                    "color", "palette", "font", "typography", "layout", "ui", "ux", "wireframe", "prototype", "mockup", "sketch", "drawing", "painting",
-                    "character", "role", "persona", "profile", "background", "backstory", "plot", "setting", "scene", "dialogue", "script", "screenplay",
-                    "poem", "haiku", "limerick", "sonnet", "lyrics", "verse", "rhyme", "rhythm", "melody", "harmony", "chord", "scale", "key",
-                    "style", "genre", "mood", "atmosphere", "vibe", "tone", "voice", "narrator", "perspective", "viewpoint", "theme", "motif",
-                    "symbol", "metaphor", "simile", "analogy", "allegory", "fable", "myth", "legend", "folklore", "fairy tale", "fantasy", "sci-fi"
-                ],
-                "label_en": "Creative",
-                "label_zh": "🎨 创意脑暴"
-            }
-        }
-        
-        cat_scores = {k: 0 for k in category_defs.keys()}
-        for w in words:
-            for cat_key, cat_data in category_defs.items():
-                if w in cat_data['keywords']:
-                    cat_scores[cat_key] += 1
+            cat_scores = analysis.category_scores
         
-        vals = list(cat_scores.values())
-        max_val = max(vals) if vals else 1
-        normalized_vals = [v/max_val for v in vals]
-        labels = [category_defs[k][f'label_{st.session_state.lang}'] for k in category_defs.keys()]
+            vals = list(cat_scores.values())
+            max_val = max(vals) if vals else 1
+            normalized_vals = [v/max_val for v in vals]
+            labels = [CATEGORY_DEFS[k][f'label_{st.session_state.lang}'] for k in CATEGORY_DEFS.keys()]
         
-        fig_radar = px.line_polar(r=normalized_vals, theta=labels, line_close=True, template="plotly_dark")
-        fig_radar.update_traces(fill='toself', line_color='#D4AF37') # Champagne Gold
-        fig_radar.update_layout(
-            polar=dict(
-                radialaxis=dict(visible=False),
-                bgcolor='rgba(0,0,0,0)'
-            ),
-            margin=dict(t=20, b=20, l=30, r=30),
-            height=350,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)'
-        )
-        st.plotly_chart(fig_radar, use_container_width=True)
+            fig_radar = px.line_polar(r=normalized_vals, theta=labels, line_close=True, template="plotly_dark")
+            fig_radar.update_traces(fill='toself', line_color='#D4AF37') # Champagne Gold
+            fig_radar.update_layout(
+                polar=dict(
+                    radialaxis=dict(visible=False),
+                    bgcolor='rgba(0,0,0,0)'
+                ),
+                margin=dict(t=20, b=20, l=30, r=30),
+                height=350,
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)'
+            )
+            st.plotly_chart(fig_radar, use_container_width=True)
 
-    with col_cloud:
-        st.subheader(t('cloud_header'))
+        with col_cloud:
+            st.subheader(t('cloud_header'))
         
-        # --- Objectivity Filter UI ---
-        objectivity_mode = st.checkbox(
-            "🛡️ 开启客观性过滤 (Objectivity Mode)", 
-            value=False,
-            help="过滤常用词、代词和技术噪声 (如 json, api, 我, 你, time, just)，专注于核心概念。"
-        )
+            # --- Objectivity Filter UI ---
+            objectivity_mode = st.checkbox(
+                "🛡️ 开启客观性过滤 (Objectivity Mode)", 
+                value=False,
+                help="过滤常用词、代词和技术噪声 (如 json, api, 我, 你, time, just)，专注于核心概念。"
+            )
         
-        # Apply Filter if enabled
-        display_words = words
-        if objectivity_mode:
-            display_words = [w for w in words if w.lower() not in OBJECTIVITY_STOPWORDS]
-            
-        if display_words:
-            # Check font status
-            if not font_path:
-                 st.warning("⚠️ 未找到支持 CJK (中日韩) 的字体，词云可能显示乱码 (CJK font not found)", icon="⚠️")
-                 with st.expander("调试信息 (Debug Info)"):
-                     st.write(f"System: {platform.system()}")
-                     st.write("Checked Local Path: mirror/fonts/ZCOOLXiaoWei-Regular.ttf (Not Found)")
-                     st.write("Checked System Paths: Standard System Fonts (Arial Unicode, PingFang, Hiragino, etc.)")
-                     st.write("Deep Search: Recursive search in /System/Library/Fonts failed.")
-
-            # WordCloud with Luxury Colors
-            def luxury_color_func(word, font_size, position, orientation, random_state=None, **kwargs):
-                return "hsl(46, 65%, 60%)" if random.randint(0, 1) else "hsl(245, 40%, 70%)"
-
-            wc = WordCloud(font_path=font_path, width=800, height=500, 
-                          background_color="rgba(0,0,0,0)", mode="RGBA", # Transparent
-                          max_words=80, collocations=False,
-                          color_func=luxury_color_func).generate(" ".join(display_words))
-            st.image(wc.to_array(), use_column_width=True)
-        else:
-            if objectivity_mode and words:
-                st.warning("⚠️ 过滤后没有剩余词汇。请尝试关闭客观性过滤。")
+            custom_stops = st.text_input(
+                "✂️ 自定义停用词 (Custom Stopwords)",
+                value="",
+                help="逗号或空格分隔，这些词不会出现在词云中 (e.g. python, 项目)。"
+            )
+
+            # Apply Filter: 频率表按模式预计算 (O(vocab))，切换模式不再扫描 token 流
+            # WordCloud.generate() 自带的英文停用词在频率输入下不生效，并入自定义词表
+            filter_mode = "objectivity" if objectivity_mode else "default"
+            display_freqs = filter_frequencies(
+                analysis,
+                filter_mode,
+                set(re.split(r'[\s,，]+', custom_stops)) | WC_STOPWORDS,
+            )
+
+            if display_freqs:
+                # Check font status
+                if not font_path:
+                     st.warning("⚠️ 未找到支持 CJK (中日韩) 的字体，词云可能显示乱码 (CJK font not found)", icon="⚠️")
+                     with st.expander("调试信息 (Debug Info)"):
+                         st.write(f"System: {platform.system()}")
+                         st.write(f"SPR_FONT_PATH: {FONT_PATH or '(not set)'}")
+                         st.write("Checked Local Path: mirror/fonts/ZCOOLXiaoWei-Regular.ttf (Not Found)")
+                         st.write("Checked System Paths: Standard System Fonts (Arial Unicode, PingFang, Hiragino, etc.)")
+                         st.write("Deep Search: Recursive search in /System/Library/Fonts failed.")
+
+                # WordCloud with Luxury Colors (确定性配色 + 布局，PNG 按内容缓存)
+                with PROFILER.stage("wordcloud.generate", items=len(display_freqs)):
+                    cloud_key = wordcloud_key(display_freqs, filter_mode, font_path, WORDCLOUD_SIZE)
+                    cloud_png = render_wordcloud_png(cloud_key, display_freqs, font_path, *WORDCLOUD_SIZE)
+                st.image(cloud_png, use_column_width=True)
             else:
-                st.warning(t('cloud_warning'))
+                if (objectivity_mode or custom_stops.strip()) and word_counts:
+                    st.warning("⚠️ 过滤后没有剩余词汇。请尝试关闭客观性过滤。")
+                else:
+                    st.warning(t('cloud_warning'))
 
-    st.subheader(t('dist_header'))
-    c_len, c_comp = st.columns(2)
+        st.subheader(t('dist_header'))
+        c_len, c_comp = st.columns(2)
     
-    with c_len:
-        fig_len = px.histogram(
-             df, x="len", nbins=30,
-             color_discrete_sequence=['#D4AF37'], # Champagne Gold
-             template="plotly_dark"
-        )
-        fig_len.update_traces(
-            marker=dict(line=dict(width=1, color='rgba(255,255,255,0.5)'), pattern=dict(shape="/")), # Glassy Edge + Texture
-            opacity=0.8
-        )
-        luxury_chart(fig_len, t('dist_len_title'), show_median=True, df_col=df['len'])
-        st.plotly_chart(fig_len, use_container_width=True)
-
-    with c_comp:
-        fig_comp = px.histogram(
-            df, x="complexity", nbins=20, 
-            color_discrete_sequence=['#6A5ACD'], # Royal Purple
-            template="plotly_dark"
-        )
-        fig_comp.update_traces(
-            marker=dict(line=dict(width=1, color='rgba(255,255,255,0.5)'), pattern=dict(shape="+")), # Glassy Edge + Texture
-            opacity=0.8
-        )
-        luxury_chart(fig_comp, t('dist_comp_title'), show_median=True, df_col=df['complexity'])
-        st.plotly_chart(fig_comp, use_container_width=True)
+        with c_len:
+            fig_len = px.histogram(
+                 df, x="len", nbins=30,
+                 color_discrete_sequence=['#D4AF37'], # Champagne Gold
+                 template="plotly_dark"
+            )
+            fig_len.update_traces(
+                marker=dict(line=dict(width=1, color='rgba(255,255,255,0.5)'), pattern=dict(shape="/")), # Glassy Edge + Texture
+                opacity=0.8
+            )
+            luxury_chart(fig_len, t('dist_len_title'), show_median=True, df_col=df['len'])
+            st.plotly_chart(fig_len, use_container_width=True)
+
+        with c_comp:
+            fig_comp = px.histogram(
+                df, x="complexity", nbins=20, 
+                color_discrete_sequence=['#6A5ACD'], # Royal Purple
+                template="plotly_dark"
+            )
+            fig_comp.update_traces(
+                marker=dict(line=dict(width=1, color='rgba(255,255,255,0.5)'), pattern=dict(shape="+")), # Glassy Edge + Texture
+                opacity=0.8
+            )
+            luxury_chart(fig_comp, t('dist_comp_title'), show_median=True, df_col=df['complexity'])
+            st.plotly_chart(fig_comp, use_container_width=True)
 
-    # 恢复高频词组 (Bigrams) 板块
-    st.divider()
-    st.subheader(t('phrases_header'))
+        # 恢复高频词组 (Bigrams) 板块
+        st.divider()
+        st.subheader(t('phrases_header'))
     
-    bigrams = []
-    # Advanced Bigram Filter
-    # Stopwords for Bigrams (Less aggressive)
-    bigram_stops = {
-        "the", "a", "an", "in", "on", "at", "for", "to", "of", "is", "are", "was", "were", 
-        "be", "been", "being", "have", "has", "had", "do", "does", "did", "it", "that", 
-        "this", "these", "those", "i", "you", "he", "she", "we", "they", "my", "your", 
-        "his", "her", "our", "their", "and", "but", "or", "so", "not", "no", "yes", "please", 
-        "me", "thanks", "thank", "want", "need", "like", "just", "get", "go", "know", "think", 
-        "see", "say", "tell", "ask", "try", "look", "take", "give", "find", "use", "way", "new",
-        "good", "great", "well", "much", "many", "lot", "little", "big", "small",
-        "的", "了", "是", "我", "你", "他", "在", "和", "有", "就", "不", "人", "都", "一", "一个", "上", "也", "很", "到", "说", "要", "去", "能", "会", "着", "没有", "看", "怎么", "什么", "这", "那", "这个", "那个", "请", "帮我", "给我", "可以", "吗",
-        "个", "只", "次", "把", "被", "让", "给", "但", "因为", "所以", "如果", "虽然", "但是", "或者", "还是", "以及", "除了", "为了", "关于", "对于", "通过", "根据", "按照", "作为", "随着"
-    }
-
-    for line in lines:
-        # Tokenize line again but use the robust filter
-        line_tokens = []
-        # Chinese
-        zh_pattern = re.compile(r'[\u4e00-\u9fa5]+')
-        for w in jieba.lcut(line):
-            if len(w) > 1 and zh_pattern.match(w) and w not in bigram_stops:
-                line_tokens.append(w)
-        # English
-        en_pattern = re.compile(r'[a-zA-Z]{2,}')
-        for w in en_pattern.findall(line.lower()):
-            if w not in bigram_stops and len(w) > 2:
-                line_tokens.append(w)
-        
-        if len(line_tokens) >= 2:
-            for i in range(len(line_tokens)-1):
-                # Filter meaningless bigrams
-                w1, w2 = line_tokens[i], line_tokens[i+1]
-                if w1 in bigram_stops or w2 in bigram_stops: continue
-                bigrams.append(f"{w1} {w2}")
-
-    top_bigrams = Counter(bigrams).most_common(12)
-
-    # HTML/CSS Visuals for Top Phrases
-    st.markdown("""
-    <style>
-    .phrase-tag {
-        display: inline-block;
-        padding: 6px 12px;
-        margin: 4px;
-        border-radius: 20px;
-        color: #fff;
-        font-size: 14px;
-        font-weight: 500;
-        backdrop-filter: blur(4px);
-        border: 1px solid rgba(255,255,255,0.1);
-        transition: transform 0.2s;
-    }
-    .phrase-tag:hover {
-        transform: scale(1.05);
-        border-color: #D4AF37;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+        phrase_len = st.radio(t('phrase_len'), ["2", "3"], horizontal=True,
+                              format_func=lambda n: f"{n}-gram")
+        # Bigrams 随分析结果一起算好；Trigrams 首次选择时计数一次并缓存在分析结果上
+        top_bigrams = analysis.top_bigrams if phrase_len == "2" else top_phrases(analysis, int(phrase_len))
+
+        # HTML/CSS Visuals for Top Phrases
+        st.markdown("""
+        <style>
+        .phrase-tag {
+            display: inline-block;
+            padding: 6px 12px;
+            margin: 4px;
+            border-radius: 20px;
+            color: #fff;
+            font-size: 14px;
+            font-weight: 500;
+            backdrop-filter: blur(4px);
+            border: 1px solid rgba(255,255,255,0.1);
+            transition: transform 0.2s;
+        }
+        .phrase-tag:hover {
+            transform: scale(1.05);
+            border-color: #D4AF37;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+        if top_bigrams:
+            max_count = top_bigrams[0][1]
+            html = "<div style='text-align: center; padding: 20px;'>"
+            for phrase, count in top_bigrams:
+                # Opacity based on frequency
+                opacity = 0.3 + 0.7 * (count / max_count)
+                # Gold color with varying opacity
+                bg_color = f"rgba(212, 175, 55, {opacity})" 
+                html += f"<span class='phrase-tag' style='background: {bg_color};' title='Count: {count}'>{phrase}</span>"
+            html += "</div>"
+            st.markdown(html, unsafe_allow_html=True)
+        else:
+            st.info("💡 Not enough data to generate top phrases yet. Try adding more diverse prompts!")
 
-    if top_bigrams:
-        max_count = top_bigrams[0][1]
-        html = "<div style='text-align: center; padding: 20px;'>"
-        for phrase, count in top_bigrams:
-            # Opacity based on frequency
-            opacity = 0.3 + 0.7 * (count / max_count)
-            # Gold color with varying opacity
-            bg_color = f"rgba(212, 175, 55, {opacity})" 
-            html += f"<span class='phrase-tag' style='background: {bg_color};' title='Count: {count}'>{phrase}</span>"
-        html += "</div>"
-        st.markdown(html, unsafe_allow_html=True)
-    else:
-        st.info("💡 Not enough data to generate top phrases yet. Try adding more diverse prompts!")
+    PROFILER.checkpoint("render: insight")
 
-    # === Tab 1.5: 思维进化 (Time Travel) ===
+# === Tab 1.5: 思维进化 (Time Travel) ===
+if tab_evolution.open:
     with tab_evolution:
         st.subheader(t('evolution_header'))
         
         if has_time:
             # 1. 聚合数据 (按周)
-            df['date_week'] = df['time'].dt.to_period('W').dt.start_time
-            evolution_df = df.groupby('date_week').agg({
-                'prompt': 'count',
-                'complexity': 'mean'
-            }).reset_index().rename(columns={'prompt': 'count'})
+            evolution_df = analysis.evolution_df
             
             # 2. 双轴图表 (Quantity vs Quality)
             fig_evo = go.Figure()
@@ -1505,29 +1368,11 @@ with tab_insight:
             # 3. 类别进化堆叠图 (Category Evolution)
             st.markdown("### Category Evolution")
             
-            # 计算每周各类别占比
-            # 这种计算比较耗时，我们做简单处理：每周各类别关键词命中数
-            
-            # Helper to count categories per week
-            def get_week_categories(grp):
-                text = " ".join(grp['prompt'].tolist())
-                scores = {k: 0 for k in category_defs.keys()}
-                for w in process_tokens([text]): # Use cached tokenizer
-                    for cat_key, cat_data in category_defs.items():
-                        if w in cat_data['keywords']:
-                            scores[cat_key] += 1
-                return pd.Series(scores)
-
-            cat_evo_df = df.groupby('date_week').apply(get_week_categories).reset_index()
-            
-            # 归一化处理 (显示占比)
-            cat_cols = list(category_defs.keys())
-            cat_evo_df['total'] = cat_evo_df[cat_cols].sum(axis=1)
-            # Avoid division by zero
-            cat_evo_df = cat_evo_df[cat_evo_df['total'] > 0] 
-            
-            for c in cat_cols:
-                cat_evo_df[c] = cat_evo_df[c] / cat_evo_df['total']
+            # 各周期类别占比：每条 prompt 的类别命中矩阵按天 / 周 / 月分组求和
+            evo_freq = st.radio(t('evolution_period'), list(EVOLUTION_FREQS), index=EVOLUTION_FREQS.index("W"),
+                                horizontal=True, format_func=lambda f: t('period_' + f))
+            cat_evo_df = tab_memo(f"cat_evo:{evo_freq}", lambda: category_evolution(analysis, evo_freq))
+            cat_cols = list(CATEGORY_DEFS.keys())
                 
             # Plot Stacked Area
             fig_stack = go.Figure()
@@ -1535,9 +1380,9 @@ with tab_insight:
             
             for idx, cat in enumerate(cat_cols):
                 fig_stack.add_trace(go.Scatter(
-                    x=cat_evo_df['date_week'],
+                    x=cat_evo_df['date'],
                     y=cat_evo_df[cat],
-                    name=category_defs[cat][f'label_{st.session_state.lang}'],
+                    name=CATEGORY_DEFS[cat][f'label_{st.session_state.lang}'],
                     mode='lines',
                     stackgroup='one',
                     groupnorm='percent', # Normalize to 100%
@@ -1558,7 +1403,7 @@ with tab_insight:
         st.caption(t('golden_caption'))
         
         # Top 3 Complex Prompts
-        top_prompts = df.sort_values('complexity', ascending=False).head(3)
+        top_prompts = tab_memo('golden', lambda: df.sort_values('complexity', ascending=False).head(3))
         
         cols = st.columns(3)
         for i, (idx, row) in enumerate(top_prompts.iterrows()):
@@ -1582,88 +1427,16 @@ with tab_insight:
                 """, unsafe_allow_html=True)
 
 
-    # === Tab SoulPrint: AI 替身报告 ===
+    PROFILER.checkpoint("render: evolution")
+
+# === Tab SoulPrint: AI 替身报告 ===
+if tab_soul.open:
     with tab_soul:
         st.subheader("🔮 SoulPrint: AI Persona Mirror")
         st.progress(100, text="Completion: 100% (Luxury Edition)")
         
         st.caption("Based on Big Five, MBTI, Enneagram, Jungian, DISC, HEXACO & 16 Core Emotions")
         
-        # 定义关键词库 (Data Layer) - Full 6 Models + 16 Emotions
-        PSYCH_KEYWORDS = {
-            # 1. Big Five (OCEAN)
-            'Openness': ['imagine', 'create', 'new', 'idea', 'design', 'concept', 'art', 'style', 'music', 'story', 'novel', 'curious', 'explore', 'dream', 'fantasy', '创意', '设计', '想象', '风格', '好奇', '探索', '梦'],
-            'Conscientiousness': ['plan', 'structure', 'organize', 'schedule', 'goal', 'task', 'list', 'check', 'verify', 'rule', 'standard', 'discipline', 'focus', 'duty', 'order', '计划', '结构', '目标', '任务', '自律', '专注', '秩序'],
-            'Extraversion': ['team', 'share', 'talk', 'discuss', 'meet', 'social', 'party', 'group', 'friend', 'connect', 'communicate', 'express', 'active', 'energy', 'outgoing', '分享', '讨论', '社交', '沟通', '表达', '活跃', '外向'],
-            'Agreeableness': ['help', 'please', 'thanks', 'kind', 'care', 'love', 'support', 'agree', 'team', 'cooperate', 'empathy', 'trust', 'forgive', 'soft', 'gentle', '感谢', '请', '帮助', '支持', '合作', '共情', '信任'],
-            'Neuroticism': ['worry', 'fear', 'anxious', 'stress', 'fail', 'error', 'bug', 'crash', 'urgent', 'help', 'panic', 'broken', 'nervous', 'moody', 'upset', '焦虑', '担心', '错误', '紧急', '恐慌', '紧张', '情绪'],
-            
-            # 2. MBTI Dimensions
-            'MBTI_E': ['talk', 'discuss', 'group', 'social', 'meeting', 'speak', 'say', 'party', 'public', '讨论', '群', '社交', '会议', '说'],
-            'MBTI_I': ['think', 'read', 'write', 'alone', 'quiet', 'reflect', 'private', 'self', 'internal', '思考', '读', '写', '独自', '安静', '反思'],
-            'MBTI_S': ['fact', 'data', 'detail', 'real', 'practical', 'step', 'history', 'experience', 'sense', '事实', '数据', '细节', '现实', '实用', '步骤'],
-            'MBTI_N': ['idea', 'concept', 'future', 'theory', 'meaning', 'pattern', 'vision', 'possibility', 'abstract', '想法', '概念', '未来', '理论', '意义', '模式'],
-            'MBTI_T': ['logic', 'reason', 'analyze', 'critique', 'objective', 'principle', 'rule', 'justice', 'truth', '逻辑', '分析', '批判', '客观', '原则', '真相'],
-            'MBTI_F': ['feel', 'value', 'harmony', 'empathy', 'compassion', 'care', 'people', 'subjective', 'moral', '感受', '价值', '和谐', '同情', '关心', '人', '道德'],
-            'MBTI_J': ['plan', 'decide', 'close', 'finish', 'order', 'schedule', 'deadline', 'control', 'structure', '计划', '决定', '完成', '秩序', '日程', '截止'],
-            'MBTI_P': ['open', 'adapt', 'change', 'flow', 'option', 'flexible', 'spontaneous', 'wait', 'explore', '开放', '适应', '变化', '选项', '灵活', '等待'],
-
-            # 3. Enneagram (9 Types Triggers)
-            'Enneagram_1_Reformer': ['perfect', 'correct', 'right', 'improve', 'standard', 'error', 'fix', 'best', '完美', '正确', '改进', '标准', '错误', '修复'],
-            'Enneagram_2_Helper': ['help', 'give', 'care', 'support', 'need', 'love', 'service', 'friend', '帮助', '给予', '关心', '支持', '需要', '爱', '服务'],
-            'Enneagram_3_Achiever': ['success', 'goal', 'win', 'achieve', 'result', 'efficient', 'image', 'status', '成功', '目标', '赢', '成就', '结果', '效率'],
-            'Enneagram_4_Individualist': ['unique', 'special', 'feeling', 'express', 'deep', 'meaning', 'authentic', 'self', '独特', '特别', '感觉', '表达', '深', '意义'],
-            'Enneagram_5_Investigator': ['know', 'learn', 'understand', 'analyze', 'observe', 'knowledge', 'why', 'how', '知道', '学习', '理解', '分析', '观察', '知识'],
-            'Enneagram_6_Loyalist': ['safe', 'secure', 'trust', 'rule', 'plan', 'worry', 'prepare', 'guide', '安全', '信任', '规则', '计划', '担心', '准备'],
-            'Enneagram_7_Enthusiast': ['fun', 'happy', 'new', 'excited', 'experience', 'freedom', 'option', 'plan', '有趣', '快乐', '新', '兴奋', '体验', '自由'],
-            'Enneagram_8_Challenger': ['control', 'power', 'strong', 'lead', 'fight', 'protect', 'justice', 'direct', '控制', '力量', '强', '领导', '战斗', '保护'],
-            'Enneagram_9_Peacemaker': ['peace', 'calm', 'harmony', 'agree', 'relax', 'easy', 'avoid', 'quiet', '和平', '平静', '和谐', '同意', '放松', '简单'],
-
-            # 4. Jungian Archetypes
-            'Archetype_Hero': ['hero', 'save', 'win', 'brave', 'courage', 'fight', 'overcome', 'champion', '英雄', '拯救', '赢', '勇敢', '勇气', '战斗'],
-            'Archetype_Sage': ['truth', 'wisdom', 'knowledge', 'understand', 'teach', 'learn', 'expert', 'guide', '真理', '智慧', '知识', '理解', '教', '学'],
-            'Archetype_Lover': ['love', 'passion', 'beauty', 'desire', 'intimacy', 'connect', 'relationship', 'romance', '爱', '激情', '美', '渴望', '亲密', '关系'],
-            'Archetype_Creator': ['create', 'make', 'build', 'invent', 'design', 'vision', 'art', 'innovate', '创造', '制造', '建立', '发明', '设计', '愿景'],
-            'Archetype_Rebel': ['break', 'change', 'free', 'rule', 'disrupt', 'revolution', 'different', 'shock', '打破', '改变', '自由', '规则', '颠覆', '革命'],
-
-            # 5. DISC
-            'DISC_D': ['lead', 'control', 'power', 'win', 'result', 'goal', 'challenge', 'direct', 'fast', 'action', 'now', '领导', '控制', '结果', '挑战'],
-            'DISC_I': ['persuade', 'inspire', 'talk', 'fun', 'story', 'people', 'social', 'network', 'express', 'idea', '影响', '说服', '有趣', '故事'],
-            'DISC_S': ['stable', 'calm', 'support', 'listen', 'patient', 'team', 'loyal', 'process', 'step', 'slow', '稳定', '耐心', '支持', '流程'],
-            'DISC_C': ['rule', 'standard', 'detail', 'fact', 'data', 'analyze', 'check', 'correct', 'system', 'procedure', '规则', '细节', '数据', '准确'],
-            
-            # 6. HEXACO (Honesty-Humility)
-            'Honesty-Humility': ['truth', 'honest', 'fair', 'sincere', 'humble', 'modest', 'greed', 'cheat', 'fake', 'lie', 'moral', 'ethical', '诚实', '公平', '谦虚', '真相', '道德']
-        }
-
-        EMOTION_KEYWORDS = {
-            # A组：内耗类
-            'Shame': ['shame', 'embarrassed', 'humiliated', 'sorry', 'bad', 'stupid', 'hide', 'disgrace', '羞耻', '丢人', '不好意思', '笨', '躲', '耻辱'],
-            'Anxiety': ['anxious', 'worry', 'nervous', 'stress', 'tense', 'panic', 'urgent', 'deadline', 'afraid', 'uneasy', '焦虑', '紧张', '压力', '慌', '急'],
-            'Guilt': ['guilt', 'regret', 'sorry', 'fault', 'blame', 'mistake', 'wrong', 'apologize', 'remorse', 'bad', '内疚', '后悔', '对不起', '错', '怪我'],
-            'Fear': ['fear', 'scared', 'afraid', 'terrified', 'danger', 'threat', 'risk', 'safe', 'horror', 'dread', '恐惧', '害怕', '危险', '不敢', '恐怖'],
-            'Disgust': ['disgust', 'hate', 'gross', 'sick', 'nasty', 'ugly', 'awful', 'bad', 'repulsive', 'revolt', '讨厌', '恶心', '烂', '差', '反感'],
-            
-            # B组：外攻类
-            'Envy': ['envy', 'jealous', 'unfair', 'why him', 'wish', 'better', 'compare', 'covet', 'resent', 'rival', '嫉妒', '羡慕', '不公', '凭什么', '攀比'],
-            'Anger': ['angry', 'mad', 'furious', 'rage', 'hate', 'stupid', 'idiot', 'annoy', 'hostile', 'fight', '愤怒', '生气', '火大', '混蛋', '仇恨'],
-            'Frustration': ['frustrated', 'annoyed', 'stuck', 'hard', 'difficult', 'fail', 'slow', 'block', 'irritate', 'bother', '烦躁', '不爽', '卡住', '难', '烦'],
-            
-            # C组：情感回响类
-            'Nostalgia': ['remember', 'memory', 'past', 'old', 'time', 'miss', 'back', 'childhood', 'retro', 'recall', '怀旧', '回忆', '过去', '想念', '童年'],
-            'Moved': ['moved', 'touching', 'cry', 'tear', 'warm', 'heart', 'kind', 'sweet', 'inspire', 'emotion', '感动', '泪', '暖心', '温情', '触动'],
-            
-            # D组：平和稳定类
-            'Calm': ['calm', 'peace', 'relax', 'quiet', 'still', 'meditate', 'breath', 'zen', 'stable', 'balance', '平静', '安宁', '放松', '安静', '稳定'],
-            'Satisfaction': ['satisfy', 'content', 'good', 'enough', 'done', 'finish', 'complete', 'ok', 'fulfill', 'pleased', '满足', '够了', '完成', '舒服', '满意'],
-            
-            # E组：正向能量类
-            'Surprise': ['wow', 'surprise', 'amazing', 'shock', 'unexpected', 'sudden', 'boom', 'cool', 'wonder', 'astonish', '惊喜', '哇', '意外', '酷', '震惊'],
-            'Joy': ['happy', 'joy', 'fun', 'laugh', 'smile', 'glad', 'great', 'awesome', 'delight', 'cheer', '快乐', '开心', '笑', '棒', '喜悦'],
-            'Pride': ['proud', 'best', 'win', 'success', 'achieve', 'master', 'top', 'strong', 'confident', 'glory', '自豪', '骄傲', '成功', '强', '自信'],
-            'Love': ['love', 'like', 'care', 'adore', 'passion', 'heart', 'dear', 'friend', 'romance', 'affection', '爱', '喜欢', '关心', '情', '浪漫']
-        }
-
         # V-A-D Coordinates for 3D Chart
         EMOTION_COORDS = {
             'Shame': (-0.8, -0.2, -0.8), 'Anxiety': (-0.6, 0.8, -0.7), 'Guilt': (-0.7, 0.3, -0.6),
@@ -1673,78 +1446,7 @@ with tab_insight:
             'Surprise': (0.6, 0.8, 0.2), 'Joy': (0.9, 0.7, 0.6), 'Pride': (0.8, 0.6, 0.9), 'Love': (0.9, 0.5, 0.7)
         }
 
-        # 计算评分 (New Relative Dominance Algorithm)
-        @st.cache_data
-        def calculate_soul_metrics(text_list):
-            tokens = process_tokens(text_list) 
-            
-            # Raw Counts
-            psych_raw = {k: 0 for k in PSYCH_KEYWORDS.keys()}
-            emotion_raw = {k: 0 for k in EMOTION_KEYWORDS.keys()}
-            
-            for token in tokens:
-                for k, v in PSYCH_KEYWORDS.items():
-                    if token in v: psych_raw[k] += 1
-                for k, v in EMOTION_KEYWORDS.items():
-                    if token in v: emotion_raw[k] += 1
-            
-            # Helper to normalize within a group
-            def normalize_group(raw_dict, keys):
-                group_vals = [raw_dict[k] for k in keys]
-                max_val = max(group_vals) if group_vals else 0
-                if max_val == 0: return {k: 0 for k in keys}
-                # Scale: Max becomes 95, others proportional
-                return {k: int((raw_dict[k] / max_val) * 95) for k in keys}
-
-            # 1. Big Five Normalization
-            b5_keys = ['Openness', 'Conscientiousness', 'Extraversion', 'Agreeableness', 'Neuroticism']
-            b5_scores = normalize_group(psych_raw, b5_keys)
-            
-            # 2. MBTI Normalization (Per Pair)
-            mbti_pairs = [('MBTI_E', 'MBTI_I'), ('MBTI_S', 'MBTI_N'), ('MBTI_T', 'MBTI_F'), ('MBTI_J', 'MBTI_P')]
-            mbti_scores = {}
-            for k1, k2 in mbti_pairs:
-                raw1, raw2 = psych_raw[k1], psych_raw[k2]
-                total = raw1 + raw2
-                if total == 0:
-                    mbti_scores[k1] = 0
-                    mbti_scores[k2] = 0
-                else:
-                    # Difference scaling
-                    mbti_scores[k1] = int((raw1 / total) * 100)
-                    mbti_scores[k2] = int((raw2 / total) * 100)
-
-            # 3. Enneagram Normalization
-            ennea_keys = [k for k in PSYCH_KEYWORDS if k.startswith('Enneagram')]
-            ennea_scores = normalize_group(psych_raw, ennea_keys)
-
-            # 4. Archetype Normalization
-            arch_keys = [k for k in PSYCH_KEYWORDS if k.startswith('Archetype')]
-            arch_scores = normalize_group(psych_raw, arch_keys)
-            
-            # 5. DISC Normalization
-            disc_keys = ['DISC_D', 'DISC_I', 'DISC_S', 'DISC_C']
-            disc_scores = normalize_group(psych_raw, disc_keys)
-            
-            # 6. HEXACO (Just H) - Normalize against global max to see if it's significant
-            max_global = max(psych_raw.values()) if psych_raw.values() else 1
-            hex_score = int((psych_raw['Honesty-Humility'] / max_global) * 100)
-            
-            # Emotions
-            max_emo = max(emotion_raw.values()) if emotion_raw.values() else 1
-            emotion_scores = {k: int((v / max_emo) * 100) for k,v in emotion_raw.items()}
-
-            # Merge all psych scores
-            final_psych = {**b5_scores, **mbti_scores, **ennea_scores, **arch_scores, **disc_scores, 'Honesty-Humility': hex_score}
-            
-            return {
-                'psych': final_psych,
-                'emotion': emotion_scores,
-                'raw_psych': psych_raw,
-                'raw_emotion': emotion_raw
-            }
-
-        soul_data = calculate_soul_metrics(lines)
+        soul_data = analysis.soul
         p_scores = soul_data['psych']
         e_scores = soul_data['emotion']
         
@@ -2036,28 +1738,35 @@ with tab_insight:
         st.plotly_chart(fig_emo_bar, use_container_width=True)
 
 
-    # === Tab 2: 习惯追踪 ===
+    PROFILER.checkpoint("render: soulprint")
+
+# === Tab 2: 习惯追踪 ===
+if tab_habit.open:
     with tab_habit:
         if has_time:
             st.subheader(t('habit_heatmap_header'))
             
-            daily_counts = df['date'].value_counts().reset_index()
-            daily_counts.columns = ['date', 'count']
-            daily_counts['date'] = pd.to_datetime(daily_counts['date'])
+            def _daily_counts():
+                daily_counts = df['date'].value_counts().reset_index()
+                daily_counts.columns = ['date', 'count']
+                daily_counts['date'] = pd.to_datetime(daily_counts['date'])
+                return daily_counts.sort_values(by='date')
+
+            daily_counts = tab_memo('daily_counts', _daily_counts)
             
             c1, c2 = st.columns([2, 1])
             
             with c1:
                 st.caption(t('trend_caption'))
-                fig_trend = px.bar(daily_counts.sort_values(by='date'), x='date', y='count', 
+                fig_trend = px.bar(daily_counts, x='date', y='count', 
                                   color='count', color_continuous_scale='Blues', template="plotly_dark")
                 luxury_chart(fig_trend, title=t('trend_caption'))
                 st.plotly_chart(fig_trend, use_container_width=True)
                 
             with c2:
                 st.caption(t('hour_caption'))
-                hour_counts = df['hour'].value_counts().sort_index().reset_index()
-                hour_counts.columns = ['hour', 'count']
+                hour_counts = tab_memo('hour_counts', lambda: df['hour'].dropna().astype(int).value_counts().sort_index()
+                                       .rename_axis('hour').reset_index(name='count'))
                 
                 tab_bar, tab_line = st.tabs([t('tab_bar'), t('tab_line')])
                 
@@ -2080,7 +1789,10 @@ with tab_insight:
         else:
             st.warning(t('habit_warning'))
 
-    # === Tab 3: 原始数据 ===
+    PROFILER.checkpoint("render: habit")
+
+# === Tab 3: 原始数据 ===
+if tab_data.open:
     with tab_data:
         st.subheader(t('search_header'))
         
@@ -2090,33 +1802,52 @@ with tab_insight:
         with col_filter:
             min_score = st.slider(t('min_score_label'), 0, 100, 0)
         
-        filtered_df = df.copy()
-        if q:
-            filtered_df = filtered_df[filtered_df['prompt'].str.contains(q, case=False)]
-        filtered_df = filtered_df[filtered_df['complexity'] >= min_score]
-        
+        ranked = st.checkbox(t('search_ranked'), value=False, disabled=not BM25_AVAILABLE)
+
+        if ranked and q.strip():
+            # BM25 排序检索：权重矩阵每份分析只建一次，每次只排序当前页需要的前 k 条
+            bm25 = tab_memo('bm25', lambda: BM25Index(analysis.token_store))
+            page = st.number_input(t('search_page'), min_value=1, value=1, step=1) - 1
+            with PROFILER.stage("search (bm25)", items=len(df)) as rec:
+                mask = df['complexity'].to_numpy() >= min_score if min_score > 0 else None
+                rows, scores, total = bm25.search(q, page, SEARCH_PAGE_SIZE, mask)
+                rec['items'] = total
+            st.caption(t('search_hits').format(total, page + 1, max(1, -(-total // SEARCH_PAGE_SIZE))))
+            filtered_df = df.iloc[rows].assign(bm25=scores)
+            show_cols = ['bm25']
+        else:
+            # 倒排索引每份分析只建一次；结果行已按复杂度降序排好
+            search_index = tab_memo('search_index', lambda: SearchIndex(df['prompt'].tolist(), df['complexity'].to_numpy()))
+            with PROFILER.stage("search", items=len(df)) as rec:
+                rows = search_index.search(q, min_score)
+                rec['items'] = len(rows)
+            filtered_df = df.iloc[rows]
+            show_cols = []
+
         if has_time:
-            # Explicitly cast to datetime to satisfy linter
-            time_series = pd.to_datetime(filtered_df['time'])
-            filtered_df['time_str'] = pd.Series(time_series).apply(lambda x: x.strftime('%Y-%m-%d %H:%M') if pd.notnull(x) else '')
-            show_cols = ['time_str', 'prompt', 'complexity', 'len']
+            filtered_df = filtered_df.assign(time_str=time_strings().iloc[rows])
+            show_cols += ['time_str', 'prompt', 'complexity', 'len']
         else:
-            show_cols = ['prompt', 'complexity', 'len']
+            show_cols += ['prompt', 'complexity', 'len']
             
         st.dataframe(
-            pd.DataFrame(filtered_df[show_cols]).sort_values(by='complexity', ascending=False),
+            pd.DataFrame(filtered_df[show_cols]),
             column_config={
                 "prompt": st.column_config.TextColumn(t('col_content'), width="large"),
                 "complexity": st.column_config.ProgressColumn(t('col_score'), format="%d", min_value=0, max_value=100),
                 "len": st.column_config.NumberColumn(t('col_len')),
-                "time_str": st.column_config.TextColumn(t('col_time'))
+                "time_str": st.column_config.TextColumn(t('col_time')),
+                "bm25": st.column_config.NumberColumn("BM25", format="%.2f")
             },
             use_container_width=True,
             height=600,
             hide_index=True
         )
 
-    # === Tab 4: 数据管理 ===
+    PROFILER.checkpoint("render: data")
+
+# === Tab 4: 数据管理 ===
+if tab_manage.open:
     with tab_manage:
         st.subheader(t('manage_header'))
         
@@ -2125,16 +1856,29 @@ with tab_insight:
 
         manage_df = df.copy()
         if has_time:
-            manage_df['time_str'] = manage_df['time'].apply(lambda x: x.strftime('%Y-%m-%d %H:%M') if pd.notnull(x) else '')
+            manage_df['time_str'] = time_strings()
         else:
             manage_df['time_str'] = "N/A"
             
         manage_df['delete'] = False
+        manage_cols = ['delete', 'prompt', 'time_str', 'len']
+
+        if dedup_mode != "off":
+            # 近似重复簇 id = 簇内最早一条的行号；非簇首的行即重复项
+            clusters = tab_memo(f"dup_clusters:{dedup_threshold}",
+                                lambda: near_duplicate_clusters(df['prompt'].tolist(), dedup_threshold))
+            manage_df['dup_cluster'] = clusters
+            is_dup = clusters != np.arange(len(clusters))
+            st.caption(t('dedup_found').format(int(is_dup.sum()), int(len(np.unique(clusters[is_dup])))))
+            if st.checkbox(t('dedup_select'), value=False, disabled=not is_dup.any()):
+                manage_df['delete'] = is_dup
+            manage_cols.append('dup_cluster')
         
         edited_df = st.data_editor(
-            manage_df[['delete', 'prompt', 'time_str', 'len']],
+            manage_df[manage_cols],
             column_config={
                 "delete": st.column_config.CheckboxColumn("Select", width="small"),
+                "dup_cluster": st.column_config.NumberColumn(t('col_dup_cluster'), width="small"),
                 "prompt": st.column_config.TextColumn(t('col_content'), width="large"),
                 "time_str": st.column_config.TextColumn(t('col_time'), width="medium"),
                 "len": st.column_config.NumberColumn(t('col_len'), width="small")
@@ -2153,20 +1897,35 @@ with tab_insight:
                 delete_indices = set(pd.DataFrame(to_delete).index.tolist()) # type: ignore
                 
                 new_lines = []
-                new_timestamps = []
                 new_sources = []
                 
                 for i in range(len(lines)):
                     if i not in delete_indices:
                         new_lines.append(lines[i])
-                        if timestamps: new_timestamps.append(timestamps[i])
-                        if sources: new_sources.append(sources[i])
+                        if i < len(sources): new_sources.append(sources[i])
+                keep_mask = np.ones(len(lines), dtype=bool)
+                keep_mask[list(delete_indices)] = False
+                new_timestamps = np.asarray(timestamps)[keep_mask]
                 
                 # Update Cache
                 if st.session_state.cached_data:
                     st.session_state.cached_data['lines'] = new_lines
                     st.session_state.cached_data['timestamps'] = new_timestamps
                     st.session_state.cached_data['sources'] = new_sources
+                    # 增量更新：只减去被删 prompt 的贡献，不重新分词 / 打分
+                    # 数据已与上传文件不同，不写回该文件的磁盘缓存
+                    st.session_state.cached_data['analysis'] = remove_prompts(analysis, delete_indices)
+                    st.session_state.cached_data['cache_key'] = None
                 
                 st.success("Deleted successfully! Reloading...")
                 st.rerun()
+
+    PROFILER.checkpoint("render: manage")
+
+# --- Debug: 分阶段耗时面板 ---
+if show_profile:
+    with st.sidebar.expander(t('profile_header'), expanded=True):
+        prof_df = PROFILER.to_frame()
+        st.caption(f"Run `{PROFILER.run}` · {len(df)} prompts · {PROFILER.total_seconds():.2f}s this run")
+        st.dataframe(prof_df, hide_index=True, use_container_width=True,
+                     column_config={"seconds": st.column_config.NumberColumn(format="%.3f")})
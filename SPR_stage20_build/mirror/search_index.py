@@ -0,0 +1,219 @@
+"""
+原始数据全文检索 (Raw Data Search Index)
+每次分析结果只建一次倒排索引：中文按相邻两字 (bigram) 索引，词中间的片段也能命中
+(智能 -> 人工智能)；英文 / 数字按小写单词切分，查询词做前缀匹配 (pyth -> python)。
+多个查询词取交集，中文短语和带符号的查询词 (c++, node.js) 再在候选行上做字面校验；
+复杂度过滤靠预排序数组二分，不再逐行扫描。
+"""
+
+import re
+from bisect import bisect_left
+from typing import List, Tuple
+
+import numpy as np
+
+from analysis_engine import ZH_PATTERN
+
+# 英文 / 数字按小写单词索引 (比 token store 的英文规则宽：保留 2 字母以内的词和数字)
+LATIN_WORD = re.compile(r'[0-9a-z]+')
+
+# 与 ZH_PATTERN 相同的汉字区间
+CJK_FIRST, CJK_LAST = 0x4e00, 0x9fa5
+
+# 前缀区间的上界：任何以 term 开头的词都 < term + PREFIX_END
+PREFIX_END = '\U0010ffff'
+
+# 建索引时每批处理的 prompt 数 (码点数组按批分配，内存与语料总长无关)
+INDEX_CHUNK = 20000
+
+
+def cjk_bigrams(text: str) -> List[str]:
+    """Adjacent character pairs inside each CJK run ("人工智能" -> 人工, 工智, 智能)."""
+    return [run[i:i + 2] for run in ZH_PATTERN.findall(text) for i in range(len(run) - 1)]
+
+
+def query_terms(q: str) -> Tuple[List[str], List[str]]:
+    """
+    Split a search box query into (index terms, literal phrases).
+    Latin words are prefix terms; CJK runs become their character bigrams plus the
+    run itself as a phrase, checked literally on the candidate rows (single
+    characters have no bigram). A whitespace-separated chunk with symbols the term
+    split drops ("c++", "node.js") is a literal phrase too, so "c++" is not just "c".
+    """
+    q = q.lower()
+    terms = LATIN_WORD.findall(q) + cjk_bigrams(q)
+    phrases = ZH_PATTERN.findall(q)
+    for chunk in q.split():
+        if LATIN_WORD.sub('', ZH_PATTERN.sub('', chunk)):
+            phrases.append(chunk)
+    return list(dict.fromkeys(terms)), list(dict.fromkeys(phrases))
+
+
+def _cjk_bigram_postings(prompts):
+    """(bigram keys, rows) for every CJK character pair, key = code point pair packed in int64."""
+    keys, rows = [], []
+    for start in range(0, len(prompts), INDEX_CHUNK):
+        chunk = prompts[start:start + INDEX_CHUNK]
+        # NUL 分隔：分隔符不是汉字，bigram 不会跨行
+        cp = np.frombuffer('\0'.join(chunk).encode('utf-32-le'), dtype=np.uint32)
+        is_cjk = (cp >= CJK_FIRST) & (cp <= CJK_LAST)
+        pos = np.flatnonzero(is_cjk[:-1] & is_cjk[1:])
+        if not len(pos):
+            continue
+        starts = np.zeros(len(chunk), dtype=np.int64)
+        np.cumsum(np.fromiter((len(t) + 1 for t in chunk[:-1]), dtype=np.int64, count=len(chunk) - 1), out=starts[1:])
+        keys.append((cp[pos].astype(np.int64) << 21) | cp[pos + 1])
+        rows.append(np.searchsorted(starts, pos, side='right') - 1 + start)
+    if not keys:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(keys), np.concatenate(rows)
+
+
+class SearchIndex:
+    """
+    Inverted index from terms to prompt rows, stored as flat NumPy postings
+    (rows grouped by term, terms sorted) so a prefix query is one contiguous slice.
+    Rows are also pre-sorted by complexity (descending) for the min-score filter.
+    """
+
+    def __init__(self, prompts, complexity):
+        n = len(prompts)
+        self.prompts = prompts
+
+        # 1. 中文：相邻两字 bigram (jieba 词会把 "智能" 藏在 "人工智能" 里，bigram 不会)
+        cjk_keys, cjk_rows = _cjk_bigram_postings(prompts)
+        uniq_keys, cjk_codes = np.unique(cjk_keys, return_inverse=True)
+        cjk_terms = [chr(k >> 21) + chr(k & 0x1fffff) for k in uniq_keys.tolist()]
+
+        # 2. 英文 / 数字：小写单词
+        latin_words, latin_counts = [], []
+        for text in prompts:
+            words = LATIN_WORD.findall(text.lower())
+            latin_words.extend(words)
+            latin_counts.append(len(words))
+        latin_rows = np.repeat(np.arange(n, dtype=np.int64), latin_counts)
+
+        # 3. 合并成排序后的词表，postings = (term, row) 去重后按 term 分组
+        self.terms: List[str] = sorted(set(cjk_terms).union(latin_words))
+        term_index = {term: i for i, term in enumerate(self.terms)}
+        cjk_map = np.fromiter((term_index[t] for t in cjk_terms), dtype=np.int64, count=len(cjk_terms))
+        term_ids = np.concatenate([
+            cjk_map[cjk_codes.reshape(-1)],
+            np.fromiter((term_index[w] for w in latin_words), dtype=np.int64, count=len(latin_words)),
+        ])
+        pairs = np.unique(term_ids * max(n, 1) + np.concatenate([cjk_rows, latin_rows]))
+        self.rows = (pairs % max(n, 1)).astype(np.int32)
+        self.offsets = np.searchsorted(pairs // max(n, 1), np.arange(len(self.terms) + 1))
+
+        # 4. 复杂度降序 (稳定排序)，min_score 过滤 = 取前缀
+        complexity = np.asarray(complexity)
+        self.order = np.argsort(-complexity, kind='stable')
+        self.sorted_neg = -complexity[self.order]
+
+    def __len__(self):
+        return len(self.prompts)
+
+    def match(self, term):
+        """Boolean row mask of prompts containing a word that starts with `term`."""
+        lo = bisect_left(self.terms, term)
+        hi = bisect_left(self.terms, term + PREFIX_END, lo)
+        mask = np.zeros(len(self.prompts), dtype=bool)
+        mask[self.rows[self.offsets[lo]:self.offsets[hi]]] = True
+        return mask
+
+    def search(self, q, min_score=0):
+        """Row ids matching every query term with complexity >= min_score, highest complexity first."""
+        rows = self.order[:np.searchsorted(self.sorted_neg, -min_score, side='right')]
+        if not q or not q.strip():
+            return rows
+        terms, phrases = query_terms(q)
+        for term in terms:
+            rows = rows[self.match(term)[rows]]
+        # 中文短语 / 带符号的词只在候选行上做字面校验
+        prompts = self.prompts
+        for phrase in phrases:
+            rows = rows[np.fromiter((phrase in prompts[i].lower() for i in rows.tolist()), dtype=bool, count=len(rows))]
+        return rows
+
+
+# --- 排序检索 (BM25 Ranked Retrieval) ---
+try:
+    from scipy import sparse
+    BM25_AVAILABLE = True
+except ImportError:
+    sparse = None
+    BM25_AVAILABLE = False
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the shared token store. Per-(prompt, term) weights are computed
+    once into a sparse CSC matrix, so a query is a column slice times the query term
+    counts -- one sparse mat-vec, no Python loop over prompts.
+    """
+
+    def __init__(self, store, k1=1.5, b=0.75):
+        from analysis_engine import segment_prompt
+        self._segment = segment_prompt
+        self.store = store
+        vocab = store.vocab
+        n, v = len(store), len(vocab)
+        lengths = store.lengths()
+        rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+        # 重复的 (prompt, term) 在转换时自动累加成词频
+        tf = sparse.csc_matrix((np.ones(len(store.ids), dtype=np.float32), (rows, store.ids)), shape=(n, v))
+        tf.sum_duplicates()
+
+        doc_freq = np.diff(tf.indptr)
+        self.idf = np.log1p((n - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        avgdl = lengths.mean() if n else 1.0
+        dl = lengths[tf.indices].astype(np.float32)
+        cols = np.repeat(np.arange(v), doc_freq)
+        tf.data = self.idf[cols] * tf.data * (k1 + 1) / (tf.data + k1 * (1 - b + b * dl / max(avgdl, 1e-9)))
+        self.weights = tf
+        self.sorted_vocab = sorted(vocab.tokens)
+
+    def query_ids(self, q):
+        """Vocab ids for a query, segmented like the prompts. Unknown words expand to
+        every vocab entry they prefix ("pyth" -> python), stopwords are skipped."""
+        vocab = self.store.vocab
+        stop = vocab.stop_mask("word")
+        ids = []
+        for tok in self._segment(q):
+            i = vocab.index.get(tok)
+            if i is not None:
+                ids.append(i)
+                continue
+            lo = bisect_left(self.sorted_vocab, tok)
+            hi = bisect_left(self.sorted_vocab, tok + PREFIX_END, lo)
+            ids.extend(vocab.index[w] for w in self.sorted_vocab[lo:hi])
+        kept = [i for i in ids if not stop[i]]
+        return np.asarray(kept or ids, dtype=np.int64)
+
+    def scores(self, q):
+        """BM25 score of every prompt (0 = no query term)."""
+        ids = self.query_ids(q)
+        if not len(ids):
+            return np.zeros(len(self.store), dtype=np.float32)
+        uniq, qtf = np.unique(ids, return_counts=True)
+        return self.weights[:, uniq] @ qtf.astype(np.float32)
+
+    def search(self, q, page=0, page_size=50, mask=None):
+        """
+        One page of ranked results: (rows, scores, total_hits). Only the first
+        (page + 1) * page_size hits are ever sorted (partition threshold), ties by row order.
+        `mask` optionally restricts the candidates (e.g. complexity >= min_score).
+        """
+        scores = self.scores(q)
+        hit = scores > 0
+        if mask is not None:
+            hit &= mask
+        cand = np.flatnonzero(hit)
+        end = min((page + 1) * page_size, len(cand))
+        start = min(page * page_size, end)
+        if end < len(cand):
+            # 只保留 >= 第 end 名分数的候选 (含边界上的全部并列项)，保证分页顺序稳定
+            kth = -np.partition(-scores[cand], end - 1)[end - 1]
+            cand = cand[scores[cand] >= kth]
+        order = cand[np.lexsort((cand, -scores[cand]))][start:end]
+        return order, scores[order], int(hit.sum())
@@ -0,0 +1,62 @@
+"""
+score_complexity() 与逐条 calculate_complexity() 的一致性 (Parity Test)
+随机语料覆盖全部复杂度标记 (含大小写变体)、改变长度的大小写映射字符 (İ, ẞ, 连字) 和内嵌 NUL，
+在 pyahocorasick 与纯 Python 自动机两种后端上逐条比较分数。
+"""
+
+import os
+import random
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analysis_engine  # noqa: E402
+import keyword_matcher  # noqa: E402
+from analysis_engine import COMPLEXITY_GROUPS, calculate_complexity, score_complexity  # noqa: E402
+
+N_PROMPTS = 3000
+SPECIAL = ["İ", "ẞ", "ß", "ﬁ", "ﬀ", "ǅ", "Σ", "\0", "\n", "\r\n", " ", "\t", ">", "`", "-", "*", "1."]
+FILLER = ["the", "model", "代码", "人工智能", "hello", "x", "42", "——", "😀", "Ünïcödé"]
+
+
+def random_corpus(seed=0, n=N_PROMPTS):
+    rng = random.Random(seed)
+    markers = list(COMPLEXITY_GROUPS)
+    pieces = markers + [m.upper() for m in markers] + [m.title() for m in markers] + SPECIAL + FILLER
+    corpus = ["", "\0", "İ" * 300, "```" + "\0" + "```", "\n-\n*\n1.> "]
+    for _ in range(n):
+        k = rng.choice((1, 3, 10, 40, 120))
+        corpus.append("".join(rng.choice(pieces) + rng.choice(("", " ", "\n")) for _ in range(k)))
+    # 每个标记至少单独出现一次
+    corpus.extend(markers)
+    return corpus
+
+
+@pytest.fixture(params=["ahocorasick", "python"])
+def backend(request, monkeypatch):
+    if request.param == "ahocorasick":
+        if keyword_matcher.ahocorasick is None:
+            pytest.skip("pyahocorasick not installed")
+    else:
+        monkeypatch.setattr(keyword_matcher, "ahocorasick", None)
+    matcher = keyword_matcher.KeywordMatcher(COMPLEXITY_GROUPS)
+    assert (matcher._automaton is None) == (request.param == "python")
+    monkeypatch.setattr(analysis_engine, "COMPLEXITY_MATCHER", matcher)
+    return request.param
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_score_complexity_matches_calculate_complexity(backend, seed):
+    series = pd.Series(random_corpus(seed))
+    expected = series.apply(calculate_complexity)
+    got = score_complexity(series)
+    mismatch = (got != expected).to_numpy().nonzero()[0]
+    assert not len(mismatch), [(series[i], int(got[i]), int(expected[i])) for i in mismatch[:5]]
+    assert got.index.equals(series.index)
+
+
+def test_score_complexity_keeps_index(backend):
+    series = pd.Series(["act as a planner\n1. step by step", "hi"], index=[10, 3])
+    assert score_complexity(series).to_dict() == {10: calculate_complexity(series[10]), 3: calculate_complexity("hi")}
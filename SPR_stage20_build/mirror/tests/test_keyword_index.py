@@ -0,0 +1,41 @@
+"""
+关键词索引回归测试 (KeywordIndex)
+单个汉字 / 停用词关键词不能在其他中文词内部命中；多词、带符号的关键词要能命中原文。
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analysis_engine import (CATEGORY_INDEX, EMOTION_INDEX, PSYCH_INDEX, analyze,  # noqa: E402
+                             is_phrase_keyword)
+
+INDEXES = {"category": CATEGORY_INDEX, "psych": PSYCH_INDEX, "emotion": EMOTION_INDEX}
+
+
+def hits(text):
+    word_counts = analyze([text]).word_counts
+    return {name: {k: v for k, v in index.score(word_counts, [text]).items() if v}
+            for name, index in INDEXES.items()}
+
+
+@pytest.mark.parametrize("text", ["情况", "人工智能", "请求", "请帮我写一个人工智能的情况分析"])
+def test_single_cjk_keywords_do_not_match_inside_words(text):
+    assert hits(text) == {"category": {}, "psych": {}, "emotion": {}}
+
+
+def test_phrase_and_symbol_keywords_match():
+    assert hits("using k8s, c++ and js")["category"].get("coding") == 3
+    assert hits("帮我画一个思维导图")["category"] != {}
+
+
+@pytest.mark.parametrize("kw", ["情", "人", "请", "错", "新", "难", "爱", "强", "写一个", "是什么"])
+def test_token_path_keywords(kw):
+    assert not is_phrase_keyword(kw)
+
+
+@pytest.mark.parametrize("kw", ["c++", "ci/cd", "sci-fi", "unit test", "why him", "js", "k8s", "思维导图"])
+def test_phrase_keywords(kw):
+    assert is_phrase_keyword(kw)